@@ -0,0 +1,71 @@
+"""
+Benchmark: dense one-hot Ridge vs. sparse dummies (SparseRidge) vs. within transformation.
+
+Reports the memory of the LR design matrix and the fit time for panels with a growing
+number of entities (176 countries today; more with regions / sub-national data).
+
+Usage (from the repository root):
+    python benchmarks/bench_fixed_effects.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.linear_model import Ridge
+
+sys.path.append(os.path.abspath('src'))
+from fixed_effects import SparseRidge, WithinRegressor, design_matrix
+
+
+def make_panel(n_entities, n_years, n_features, rng):
+    """Synthetic (Entity, Year) panel with entity effects and standardized features."""
+    entities = np.repeat([f'E{i:05d}' for i in range(n_entities)], n_years)
+    X = rng.normal(size=(len(entities), n_features))
+    effects = np.repeat(rng.normal(scale=5.0, size=n_entities), n_years)
+    y = X @ rng.normal(size=n_features) + effects + rng.normal(size=len(entities))
+    df = pd.DataFrame(X, columns=[f'x{j}' for j in range(n_features)])
+    df['Entity'] = entities
+    return df, y
+
+
+def nbytes(X):
+    if sp.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def main(entity_counts=(176, 500, 1000), n_years=20, n_features=16, alpha=1.0):
+    rng = np.random.default_rng(42)
+    print(f"{'entities':>8} | {'dense MB':>8} | {'sparse MB':>9} | {'within MB':>9} | "
+          f"{'dense (s)':>9} | {'sparse (s)':>10} | {'within (s)':>10}")
+    print("-" * 84)
+    for n_entities in entity_counts:
+        df, y = make_panel(n_entities, n_years, n_features, rng)
+        encoded = pd.get_dummies(df, columns=['Entity'], drop_first=True, sparse=True)
+        features = list(encoded.columns)
+        numeric = [c for c in features if not c.startswith('Entity_')]
+
+        start = time.perf_counter()
+        X_dense = pd.get_dummies(df, columns=['Entity'], drop_first=True)[features].to_numpy(dtype=np.float64)
+        Ridge(alpha=alpha).fit(X_dense, y)
+        t_dense = time.perf_counter() - start
+
+        start = time.perf_counter()
+        X_sparse = design_matrix(encoded, features)
+        SparseRidge(alpha=alpha).fit(X_sparse, y)
+        t_sparse = time.perf_counter() - start
+
+        start = time.perf_counter()
+        WithinRegressor(SparseRidge(alpha=alpha)).fit(df, y)
+        t_within = time.perf_counter() - start
+        within_bytes = df[numeric].to_numpy(dtype=np.float64).nbytes
+
+        print(f"{n_entities:>8} | {nbytes(X_dense) / 1e6:>8.1f} | {nbytes(X_sparse) / 1e6:>9.2f} | "
+              f"{within_bytes / 1e6:>9.2f} | {t_dense:>9.3f} | {t_sparse:>10.3f} | {t_within:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: exact RBF SVR vs. kernel-approximated SVR (Nystroem / random Fourier features).
+
+Reports the fit time of every mode and its test R2 next to the exact SVR's on synthetic
+panels of 3k to 300k rows (3260 rows today), and the number of warnings (e.g.
+ConvergenceWarning) each fit raised. The exact SVR runs up to `max_exact` rows, past the
+point where the approximate modes become faster (at 3k rows the exact SVR is still the
+faster one; at 30k it takes minutes); above that its quadratic cost makes it impractical.
+
+Usage (from the repository root):
+    python benchmarks/bench_kernel_svr.py
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from sklearn.metrics import r2_score
+
+sys.path.append(os.path.abspath('src'))
+from kernel_svr import create_svr_model
+
+
+def make_panel(n_rows, n_features, rng):
+    """Synthetic standardized features with a smooth nonlinear target (train 80% / test 20%)."""
+    X = rng.normal(size=(n_rows, n_features))
+    y = np.sin(X[:, 0]) * 3 + X[:, 1] ** 2 + X[:, 2] * X[:, 3] + 0.5 * X[:, 4:].sum(axis=1)
+    y = y + rng.normal(scale=0.3, size=n_rows)
+    split = int(0.8 * n_rows)
+    return X[:split], y[:split], X[split:], y[split:]
+
+
+def main(row_counts=(3000, 10000, 30000, 300000), n_features=10, max_exact=30000,
+         modes=(('exact', 0), ('nystroem', 300), ('nystroem', 1000), ('rff', 1000))):
+    rng = np.random.default_rng(42)
+    print(f"{'rows':>7} | {'mode':>8} | {'components':>10} | {'solver':>10} | {'fit (s)':>8} | {'test R2':>7} | "
+          f"{'warnings':>8}")
+    print("-" * 76)
+    for n_rows in row_counts:
+        X_train, y_train, X_test, y_test = make_panel(n_rows, n_features, rng)
+        for mode, n_components in modes:
+            if mode == 'exact' and n_rows > max_exact:
+                continue
+            model = create_svr_model(mode, n_components=n_components)
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                start = time.perf_counter()
+                model.fit(X_train, y_train)
+                fit_time = time.perf_counter() - start
+            r2 = r2_score(y_test, model.predict(X_test))
+            solver = getattr(model.regressor_, 'solver_', 'libsvm')
+            print(f"{n_rows:>7} | {mode:>8} | {n_components or '-':>10} | {solver:>10} | "
+                  f"{fit_time:>8.2f} | {r2:>7.4f} | {len(caught):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Benchmark suite: time and peak memory of the preprocessing, training and forecasting hot
+paths on synthetic panels (see synthetic.py) of growing size.
+
+Cases:
+    basic_cleaning        preprocessing.basic_cleaning on the raw frame, text columns as object
+                          dtype (as read_csv returns them without pandas 3's str dtype)
+    handle_missing        preprocessing.handle_missing_values (global medians)
+    lag_transform         LagFeatureGenerator.transform (fitted on the same frame)
+    remove_outliers       preprocessing.remove_outliers (IQR, threshold 3.0, whitelist)
+    vif_fit               VIFSelector.fit on the lagged numeric features
+    hybrid_fit            HybridResidualRegressor.fit with the notebook 12 parameters on the
+                          standardized train years (numeric features only: one-hot Entity
+                          columns do not scale to 50k entities)
+    recursive_forecast    forecasting.recursive_forecast of the test years with the fitted hybrid
+
+Each case is timed `--repeat` times (best and median are kept; repeats stop early once a
+case has used `--max-seconds`), then run once more under tracemalloc for the peak of the
+Python / NumPy / pandas allocations it makes. Native buffers of XGBoost are not traced.
+Results go to a JSON file with the environment; `compare` (or `run --baseline`) flags the
+cases that got slower or hungrier than a baseline run, and exits with status 1 if any did.
+
+Usage (from the repository root):
+    python benchmarks/bench_suite.py run                                  # 176 .. 50k entities
+    python benchmarks/bench_suite.py run --entities 176 1000 --years 21 42 --extra 0 40
+    python benchmarks/bench_suite.py run --cases vif_fit lag_transform --baseline benchmarks/results/base.json
+    python benchmarks/bench_suite.py compare benchmarks/results/base.json benchmarks/results/new.json
+    python benchmarks/bench_suite.py list
+"""
+import argparse
+import contextlib
+import gc
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+sys.path.append(os.path.abspath('src'))
+sys.path.append(os.path.abspath(os.path.join('src', 'preprocessing')))
+from forecasting import recursive_forecast, to_panel_array
+from hybrid import HybridResidualRegressor
+from pipelines import LagFeatureGenerator, VIFSelector
+from preprocessing import (WHITELIST, basic_cleaning, create_lag_features, handle_missing_values,
+                           remove_outliers)
+from synthetic import DENSITY, load_profile, make_raw_panel
+
+TARGET = 'Value_co2_emissions_kt_by_country'
+LAG_COLS = [TARGET, 'gdp_growth']
+TEST_YEARS = 6  # 2015-2020 with the real 21 years
+# notebooks/12_Hybrid_Model.py, one thread so timings compare across machines
+HYBRID_PARAMS = dict(n_estimators=500, max_depth=3, learning_rate=0.1, subsample=0.7, colsample_bytree=0.7,
+                     random_state=42, n_jobs=1)
+RESULTS_DIR = 'benchmarks/results'
+KEY = ['case', 'entities', 'years', 'extra']
+
+
+class Workload:
+    """Inputs of the hot paths for one panel size; each is built on first use."""
+    def __init__(self, n_entities, n_years, n_extra, profile, seed=42):
+        self.n_entities = n_entities
+        self.n_years = n_years
+        self.n_extra = n_extra
+        self.profile = profile
+        self.seed = seed
+
+    @cached_property
+    def raw(self):
+        return make_raw_panel(self.n_entities, self.n_years, self.n_extra, self.seed, self.profile)
+
+    @cached_property
+    def numeric(self):
+        df = self.raw.copy()
+        df[DENSITY] = pd.to_numeric(df[DENSITY].str.replace(',', ''))
+        return df
+
+    @cached_property
+    def imputed(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return handle_missing_values(self.numeric)
+
+    @cached_property
+    def lagged(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return create_lag_features(self.imputed, TARGET, LAG_COLS)
+
+    @cached_property
+    def features(self):
+        return [c for c in self.lagged.select_dtypes(include=[np.number]).columns if c not in (TARGET, 'Year')]
+
+    @cached_property
+    def split_year(self):
+        return int(self.lagged['Year'].max()) - TEST_YEARS + 1
+
+    @cached_property
+    def train(self):
+        """Standardized training features (as lr_final_prep), target and the fitted scaler."""
+        train = self.lagged[self.lagged['Year'] < self.split_year]
+        scaler = StandardScaler().fit(train[self.features])
+        return scaler.transform(train[self.features]).astype(np.float32), train[TARGET].to_numpy(), scaler
+
+    @cached_property
+    def hybrid(self):
+        X, y, _ = self.train
+        return HybridResidualRegressor(alpha=10.0, xgb_params=HYBRID_PARAMS).fit(X, y)
+
+
+# --- Cases: each takes a Workload and returns (the call to measure, its input frame) ---
+
+def case_basic_cleaning(w):
+    # basic_cleaning only converts object columns: with str columns it would time a copy
+    raw = w.raw.astype({c: object for c in w.raw.columns if pd.api.types.is_string_dtype(w.raw[c])})
+    if not pd.api.types.is_numeric_dtype(basic_cleaning(raw)[DENSITY]):
+        raise AssertionError(f"basic_cleaning did not convert '{DENSITY}'")
+    return (lambda: basic_cleaning(raw)), raw
+
+
+def case_handle_missing(w):
+    return (lambda: handle_missing_values(w.numeric)), w.numeric
+
+
+def case_lag_transform(w):
+    generator = LagFeatureGenerator(lag_cols=LAG_COLS).fit(w.imputed)
+    return (lambda: generator.transform(w.imputed)), w.imputed
+
+
+def case_remove_outliers(w):
+    return (lambda: remove_outliers(w.lagged, threshold=3.0, whitelist_entities=WHITELIST)), w.lagged
+
+
+def case_vif_fit(w):
+    X = w.lagged[w.features]
+    return (lambda: VIFSelector(threshold=10.0).fit(X)), X
+
+
+def case_hybrid_fit(w):
+    X, y, _ = w.train
+    return (lambda: HybridResidualRegressor(alpha=10.0, xgb_params=HYBRID_PARAMS).fit(X, y)), X
+
+
+def case_recursive_forecast(w):
+    panel, present, _, years = to_panel_array(w.lagged, w.features)
+    mean, scale = w.train[2].mean_, w.train[2].scale_
+    panel = (panel - mean) / scale
+    start = int(np.searchsorted(years, w.split_year))
+    model = w.hybrid
+    slot = w.features.index(f'{TARGET}_lag1')
+    return (lambda: recursive_forecast(model, panel, len(years) - start, slot, start, present,
+                                       lag_transform=lambda p: (p - mean[slot]) / scale[slot])), w.lagged
+
+
+CASES = {
+    'basic_cleaning': case_basic_cleaning,
+    'handle_missing': case_handle_missing,
+    'lag_transform': case_lag_transform,
+    'remove_outliers': case_remove_outliers,
+    'vif_fit': case_vif_fit,
+    'hybrid_fit': case_hybrid_fit,
+    'recursive_forecast': case_recursive_forecast,
+}
+
+
+def measure(func, repeat=3, max_seconds=30.0, memory=True):
+    """
+    Returns:
+        dict: seconds (best), seconds_median, runs, peak_mb (tracemalloc peak, None if memory=False).
+    """
+    times = []
+    while len(times) < repeat and sum(times) < max_seconds:
+        gc.collect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func()
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return {'seconds': min(times), 'seconds_median': float(np.median(times)), 'runs': len(times),
+            'peak_mb': None if peak is None else round(peak, 2)}
+
+
+def environment():
+    """Machine and package versions stored with the results."""
+    import scipy
+    import sklearn
+    import xgboost
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'packages': {m.__name__: m.__version__ for m in (np, pd, scipy, sklearn, xgboost)},
+    }
+
+
+def run_suite(entities=(176, 1000, 10000, 50000), years=(21,), extra=(0,), cases=None, repeat=3,
+              max_seconds=30.0, memory=True, seed=42):
+    """
+    Runs the cases on every (entities, years, extra) panel size.
+
+    Returns:
+        dict: {'environment': ..., 'settings': ..., 'results': [one record per case and size]}
+    """
+    cases = list(cases or CASES)
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        raise KeyError(f"Unknown cases: {unknown}; available: {list(CASES)}")
+    profile = load_profile()
+    results = []
+    print(f"{'case':<20} | {'entities':>8} {'years':>5} {'extra':>5} | {'rows':>9} {'cols':>5} | "
+          f"{'best (s)':>9} {'median (s)':>10} | {'peak (MB)':>9}")
+    print("-" * 98)
+    for n_entities, n_years, n_extra in itertools.product(entities, years, extra):
+        workload = Workload(n_entities, n_years, n_extra, profile, seed)
+        for name in cases:
+            func, frame = CASES[name](workload)
+            record = {'case': name, 'entities': n_entities, 'years': n_years, 'extra': n_extra,
+                      'rows': len(frame), 'columns': frame.shape[1],
+                      **measure(func, repeat, max_seconds, memory)}
+            results.append(record)
+            peak = '-' if record['peak_mb'] is None else f"{record['peak_mb']:.1f}"
+            print(f"{name:<20} | {n_entities:>8} {n_years:>5} {n_extra:>5} | {record['rows']:>9} "
+                  f"{record['columns']:>5} | {record['seconds']:>9.4f} {record['seconds_median']:>10.4f} | {peak:>9}")
+        del workload
+        gc.collect()
+    settings = {'repeat': repeat, 'max_seconds': max_seconds, 'seed': seed, 'hybrid_params': HYBRID_PARAMS}
+    return {'environment': environment(), 'settings': settings, 'results': results}
+
+
+def save_results(report, path=None):
+    path = path or os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {path}")
+    return path
+
+
+def compare(baseline, current, tolerance=0.25, memory_tolerance=0.10, min_seconds=0.01, min_mb=1.0):
+    """
+    Matches two runs by (case, entities, years, extra) and flags regressions.
+
+    Args:
+        baseline, current: Reports (dicts from run_suite) or paths to their JSON files.
+        tolerance (float): Allowed relative slowdown of the best time.
+        memory_tolerance (float): Allowed relative growth of the peak memory.
+        min_seconds, min_mb: Absolute changes below these are noise, never regressions.
+
+    Returns:
+        pd.DataFrame: One row per case and size in both runs, with Time ratio, Memory ratio
+            and Regression (bool).
+    """
+    frames = []
+    for report in (baseline, current):
+        if isinstance(report, str):
+            with open(report) as f:
+                report = json.load(f)
+        frames.append(pd.DataFrame(report['results']).set_index(KEY)[['seconds', 'peak_mb']].astype(float))
+    table = frames[0].join(frames[1], lsuffix='_base', rsuffix='_new', how='inner')
+    table['time_ratio'] = table['seconds_new'] / table['seconds_base']
+    table['memory_ratio'] = table['peak_mb_new'] / table['peak_mb_base']
+    slower = ((table['seconds_new'] > table['seconds_base'] * (1 + tolerance))
+              & (table['seconds_new'] - table['seconds_base'] > min_seconds))
+    hungrier = ((table['peak_mb_new'] > table['peak_mb_base'] * (1 + memory_tolerance))
+                & (table['peak_mb_new'] - table['peak_mb_base'] > min_mb))
+    table['regression'] = slower | hungrier.fillna(False)
+    return table.round(4).reset_index()
+
+
+def report_comparison(table):
+    """Prints the comparison; returns True if any case regressed."""
+    print(table.to_string(index=False))
+    regressed = table[table['regression']]
+    if len(regressed):
+        print(f"\n{len(regressed)} regression(s):")
+        for _, row in regressed.iterrows():
+            print(f"  {row['case']} ({row['entities']} entities, {row['years']} years, +{row['extra']}): "
+                  f"time x{row['time_ratio']:.2f}, memory x{row['memory_ratio']:.2f}")
+    else:
+        print("\nNo regressions.")
+    return len(regressed) > 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark suite for the preprocessing, training and forecasting hot paths.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('run', help='run the suite and save the results as JSON')
+    p.add_argument('--entities', type=int, nargs='+', default=[176, 1000, 10000, 50000])
+    p.add_argument('--years', type=int, nargs='+', default=[21])
+    p.add_argument('--extra', type=int, nargs='+', default=[0], help='extra feature columns')
+    p.add_argument('--cases', nargs='+', choices=list(CASES))
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--max-seconds', type=float, default=30.0, help='stop repeating a case after this long')
+    p.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    p.add_argument('--output', help=f'JSON path (default: {RESULTS_DIR}/bench_<timestamp>.json)')
+    p.add_argument('--baseline', help='JSON of an earlier run to compare against')
+    p.add_argument('--tolerance', type=float, default=0.25)
+    p.add_argument('--memory-tolerance', type=float, default=0.10)
+
+    p = sub.add_parser('compare', help='compare two saved runs')
+    p.add_argument('baseline')
+    p.add_argument('current')
+    p.add_argument('--tolerance', type=float, default=0.25)
+    p.add_argument('--memory-tolerance', type=float, default=0.10)
+
+    sub.add_parser('list', help='list the cases')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name, case in CASES.items():
+            print(f"{name:<20} {case.__name__}")
+        return
+    if args.command == 'run':
+        report = run_suite(args.entities, args.years, args.extra, args.cases, args.repeat, args.max_seconds,
+                           not args.no_memory)
+        save_results(report, args.output)
+        if not args.baseline:
+            return
+        baseline, current = args.baseline, report
+    else:
+        baseline, current = args.baseline, args.current
+    if report_comparison(compare(baseline, current, args.tolerance, args.memory_tolerance)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
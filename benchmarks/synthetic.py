@@ -0,0 +1,180 @@
+"""
+Synthetic panels with the schema and missingness of global-data-on-sustainable-energy.csv,
+at any number of entities, years and feature columns.
+
+A profile of the real file is learned once:
+- the marginal distribution of every column (quantiles);
+- on normal scores: the between-entity share of variance, the year-to-year persistence
+  (AR(1) coefficient) of the within-entity part, and the correlations between columns of
+  both parts (they drive VIF and outlier behaviour);
+- missingness: share of entities missing a column entirely, per-year missing rate of the
+  others, and per-year row coverage (unbalanced panel).
+
+Panels are drawn from a Gaussian copula with that structure. Years beyond the real 21 are
+mapped onto the real year profile proportionally (so the last year keeps the 2020 gaps).
+The first 176 entities carry the real names (the outlier whitelist still applies), the
+rest are named 'Synthetic 00177', ... Extra feature columns are noisy copies of the real
+ones, with their marginals and missingness.
+
+Example:
+    raw = make_raw_panel(n_entities=10000, n_years=21, n_extra=20)  # as pd.read_csv returns it
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+from scipy.stats import rankdata
+
+RAW_PATH = 'data/raw/global-data-on-sustainable-energy.csv'
+DENSITY = 'Density\\n(P/Km2)'  # stored as comma-formatted text in the raw CSV
+
+
+def _nearest_correlation(corr):
+    """Symmetric PSD correlation matrix closest (by eigenvalue clipping) to a pairwise estimate."""
+    corr = np.nan_to_num((corr + corr.T) / 2)
+    np.fill_diagonal(corr, 1.0)
+    vals, vecs = np.linalg.eigh(corr)
+    corr = (vecs * np.clip(vals, 1e-6, None)) @ vecs.T
+    d = np.sqrt(np.diag(corr))
+    return corr / np.outer(d, d)
+
+
+def load_profile(path=RAW_PATH, n_quantiles=201):
+    """
+    Learns the generator's profile from the raw CSV.
+
+    Returns:
+        dict: columns, quantiles, between (variance share), phi, between_corr, within_corr,
+            entity_missing, year_missing (column x year), coverage (per year), entities.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; the synthetic panels are modelled on the raw dataset")
+    df = pd.read_csv(path, thousands=',').sort_values(['Entity', 'Year'], ignore_index=True)
+    columns = [c for c in df.columns if c not in ('Entity', 'Year')]
+    e_codes, entities = pd.factorize(df['Entity'], sort=True)
+    y_codes, years = pd.factorize(df['Year'], sort=True)
+    values = df[columns].to_numpy(dtype=np.float64)
+    missing = np.isnan(values)
+
+    # Normal scores of every column (ties share their mean rank)
+    z = np.full(values.shape, np.nan)
+    for j in range(len(columns)):
+        ok = ~missing[:, j]
+        z[ok, j] = ndtri((rankdata(values[ok, j]) - 0.5) / ok.sum())
+    zf = pd.DataFrame(z)
+    means = zf.groupby(e_codes).transform('mean').to_numpy()
+    within = z - means
+    between = np.clip(np.nanvar(means, axis=0) / np.nanvar(z, axis=0), 0.0, 1.0)
+
+    # Persistence: correlation of consecutive within-entity deviations
+    nxt = np.flatnonzero((e_codes[1:] == e_codes[:-1]) & (y_codes[1:] == y_codes[:-1] + 1))
+    phi = np.zeros(len(columns))
+    for j in range(len(columns)):
+        a, b = within[nxt, j], within[nxt + 1, j]
+        ok = ~np.isnan(a) & ~np.isnan(b)
+        if ok.sum() > 2 and a[ok].std() > 1e-9 and b[ok].std() > 1e-9:
+            phi[j] = np.clip(np.corrcoef(a[ok], b[ok])[0, 1], 0.0, 0.99)
+
+    entity_means = zf.groupby(e_codes).mean()
+    all_missing = pd.DataFrame(missing).groupby(e_codes).all().to_numpy()
+    partial = ~all_missing[e_codes]
+    year_missing = np.zeros((len(columns), len(years)))
+    for t in range(len(years)):
+        rows = y_codes == t
+        with np.errstate(invalid='ignore'):
+            year_missing[:, t] = np.nan_to_num((missing[rows] & partial[rows]).sum(axis=0) / partial[rows].sum(axis=0))
+
+    return {
+        'columns': columns,
+        'quantiles': np.nanquantile(values, np.linspace(0, 1, n_quantiles), axis=0).T,
+        'between': between,
+        'phi': phi,
+        'between_corr': _nearest_correlation(entity_means.corr().to_numpy()),
+        'within_corr': _nearest_correlation(pd.DataFrame(within).corr().to_numpy()),
+        'entity_missing': all_missing.mean(axis=0),
+        'year_missing': year_missing,
+        'coverage': np.bincount(y_codes, minlength=len(years)) / len(entities),
+        'entities': np.asarray(entities, dtype=object),
+    }
+
+
+def _latent(rng, n_entities, n_years, between, phi, between_corr, within_corr):
+    """(column x year x entity) normal scores: correlated entity effects + correlated AR(1) paths."""
+    k = len(between)
+    effects = rng.standard_normal((n_entities, k)) @ np.linalg.cholesky(between_corr).T
+    chol = np.linalg.cholesky(within_corr).T
+    z = np.empty((k, n_years, n_entities))
+    path = rng.standard_normal((n_entities, k)) @ chol
+    for t in range(n_years):
+        if t:
+            path = phi * path + np.sqrt(1 - phi ** 2) * (rng.standard_normal((n_entities, k)) @ chol)
+        z[:, t] = (np.sqrt(between) * effects + np.sqrt(1 - between) * path).T
+    return z
+
+
+def make_raw_panel(n_entities=176, n_years=21, n_extra=0, seed=42, profile=None, formatted=True,
+                   start_year=2000):
+    """
+    Synthetic panel in the raw schema.
+
+    Args:
+        n_entities (int): Number of entities (176 in the real data).
+        n_years (int): Number of years (21 in the real data).
+        n_extra (int): Extra feature columns ('Indicator 001', ...), noisy copies of real ones.
+        profile (dict): From load_profile (learned from RAW_PATH by default).
+        formatted (bool): Density as comma-formatted text, as pd.read_csv returns the raw file;
+            False gives it as float (as ingest / incremental read it).
+
+    Returns:
+        pd.DataFrame: Entity, Year, the raw columns, then the extra ones; sorted by (Entity, Year).
+    """
+    profile = profile or load_profile()
+    rng = np.random.default_rng(seed)
+    columns, quantiles = profile['columns'], profile['quantiles']
+    z = _latent(rng, n_entities, n_years, profile['between'], profile['phi'],
+                profile['between_corr'], profile['within_corr'])
+    source = np.arange(len(columns))
+    if n_extra:
+        # Each extra column follows a real one (its marginal and missingness) with correlation 0.3-0.9
+        base = rng.integers(0, len(columns), n_extra)
+        rho = rng.uniform(0.3, 0.9, n_extra)
+        noise = _latent(rng, n_entities, n_years, profile['between'][base], profile['phi'][base],
+                        np.eye(n_extra), np.eye(n_extra))
+        z = np.concatenate([z, rho[:, None, None] * z[base] + np.sqrt(1 - rho ** 2)[:, None, None] * noise])
+        source = np.r_[source, base]
+        columns = columns + [f'Indicator {j + 1:03d}' for j in range(n_extra)]
+
+    # Real year each synthetic year takes its missingness and coverage from
+    n_real = profile['year_missing'].shape[1]
+    real_year = np.round(np.arange(n_years) * (n_real - 1) / max(n_years - 1, 1)).astype(int)
+    present = rng.random((n_entities, n_years)) < profile['coverage'][real_year]
+    e_idx, y_idx = np.nonzero(present)
+    real = profile['entities']
+    # Sorted names: rows come out in (Entity, Year) order like the raw file
+    names = np.sort(np.concatenate([real[:n_entities],
+                                    [f'Synthetic {i + 1:05d}' for i in range(len(real), n_entities)]]))
+    data = {'Entity': names[e_idx], 'Year': (start_year + y_idx).astype(np.int64)}
+    grid = np.linspace(0, 1, quantiles.shape[1])
+    for j, src in enumerate(source):
+        col = np.interp(ndtr(z[j].T), grid, quantiles[src])
+        gone = rng.random(n_entities) < profile['entity_missing'][src]
+        holes = rng.random((n_entities, n_years)) < profile['year_missing'][src, real_year]
+        col[gone[:, None] | holes] = np.nan
+        data[columns[j]] = col[present]
+    df = pd.DataFrame(data)
+    if DENSITY in df.columns:
+        density = df[DENSITY].round()
+        if formatted:
+            density = pd.Series([f'{v:,.0f}' if v == v else np.nan for v in density], dtype='str')
+        df[DENSITY] = density
+    return df
+
+
+if __name__ == "__main__":
+    real = pd.read_csv(RAW_PATH)
+    fake = make_raw_panel()
+    print(f"real {real.shape}, synthetic {fake.shape}")
+    print(pd.DataFrame({'real missing': real.isna().mean(), 'synthetic missing': fake.isna().mean(),
+                        'real median': real.median(numeric_only=True),
+                        'synthetic median': fake.median(numeric_only=True)}).round(3).to_string())
@@ -15,13 +15,10 @@ VARIANTS:
 """
 
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.linear_model import Ridge
-from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 from sklearn.model_selection import TimeSeriesSplit, GridSearchCV
-from sklearn.metrics import r2_score, mean_squared_error
 from xgboost import XGBRegressor
 import sys
 import os
@@ -30,6 +27,14 @@ warnings.filterwarnings('ignore')
 
 sys.path.append(os.path.abspath('src'))
 from preprocessing import load_data
+from data_store import ROW_ID
+from tuning import save_best_params, tune_xgboost
+from hybrid import HybridResidualRegressor
+from cluster_ensemble import ClusterEnsembleRegressor
+from clustering import CLUSTER_COLS, country_profiles
+from evaluation import calculate_metrics  # R² and median per-country MAPE
+from registry import ModelRegistry
+from panel_frame import PanelFrame
 
 print("=" * 70)
 print("HYBRID MODEL: Linear Regression + XGBoost Residuals")
@@ -41,14 +46,19 @@ print("=" * 70)
 SPLIT_YEAR = 2015
 TARGET = 'Value_co2_emissions_kt_by_country'
 
-df_lr = pd.read_csv('data/processed/lr_final_prep.csv')
+df_lr = load_data('data/processed/lr_final_prep.csv')  # indexed by Row_ID (row of common_preprocessed)
 df_common = load_data('data/processed/common_preprocessed.csv')
-map_df = pd.read_csv('data/processed/recovered_index_map.csv')
+common = PanelFrame.from_frame(df_common)
 
-# Add Year and Entity back
-original_indices = map_df['Original_Index'].values
-df_lr['Year'] = df_common.loc[original_indices, 'Year'].values
-df_lr['Entity'] = df_common.loc[original_indices, 'Entity'].values
+# A stale lr_final_prep.csv (written without Row_ID) loads with a RangeIndex that would
+# silently join Entity/Year to the wrong rows: rerun notebook 2 to rewrite it
+if df_lr.index.name != ROW_ID:
+    raise ValueError(f"lr_final_prep.csv has no '{ROW_ID}' index; rerun notebook 2 to regenerate it")
+
+# Add Year and Entity back (row-ID lookup)
+keys = common.keys(df_lr.index)
+df_lr['Year'] = keys['Year'].to_numpy()
+df_lr['Entity'] = keys['Entity'].to_numpy()
 
 print(f"Data shape: {df_lr.shape}")
 print(f"Years: {df_lr['Year'].min()} - {df_lr['Year'].max()}")
@@ -72,32 +82,13 @@ print(f"\nTrain: {len(X_train)} samples")
 print(f"Test: {len(X_test)} samples")
 
 # ===========================
-# 3. HELPER FUNCTIONS
-# ===========================
-def calculate_metrics(y_true, y_pred, entities):
-    """Calculate R2 and Median MAPE"""
-    r2 = r2_score(y_true, y_pred)
-    
-    # Per-entity MAPE
-    df_temp = pd.DataFrame({
-        'Entity': entities.values,
-        'Actual': y_true.values,
-        'Pred': y_pred
-    })
-    df_temp['APE'] = np.abs(df_temp['Actual'] - df_temp['Pred']) / np.abs(df_temp['Actual'].replace(0, np.nan)) * 100
-    entity_mape = df_temp.groupby('Entity')['APE'].mean()
-    median_mape = entity_mape.median()
-    
-    return r2, median_mape
-
-# ===========================
-# 4. BASELINE MODELS
+# 3. BASELINE MODELS
 # ===========================
 print("\n" + "=" * 70)
 print("BASELINE MODELS")
 print("=" * 70)
 
-# 4.1 Standalone Ridge
+# 3.1 Standalone Ridge
 lr_model = Ridge(alpha=10.0)
 lr_model.fit(X_train, y_train)
 lr_preds_test = lr_model.predict(X_test)
@@ -105,7 +96,7 @@ r2_lr, mape_lr = calculate_metrics(y_test, lr_preds_test, test_entities)
 print(f"\n[Standalone Ridge LR]")
 print(f"  R² = {r2_lr:.4f}, Median MAPE = {mape_lr:.2f}%")
 
-# 4.2 Standalone XGBoost
+# 3.2 Standalone XGBoost
 xgb_model = XGBRegressor(n_estimators=500, max_depth=3, learning_rate=0.1, 
                           subsample=0.7, colsample_bytree=0.7, random_state=42, n_jobs=-1)
 xgb_model.fit(X_train, y_train)
@@ -115,37 +106,37 @@ print(f"\n[Standalone XGBoost]")
 print(f"  R² = {r2_xgb:.4f}, Median MAPE = {mape_xgb:.2f}%")
 
 # ===========================
-# 5. HYBRID MODEL (GLOBAL)
+# 4. HYBRID MODEL (GLOBAL)
 # ===========================
 print("\n" + "=" * 70)
 print("HYBRID MODEL: LR + XGBoost on Residuals")
 print("=" * 70)
 
-# 5.1 Train LR and get residuals on training set
-lr_preds_train = lr_model.predict(X_train)
-residuals_train = y_train - lr_preds_train
+# 4.1 Train LR and get residuals on training set
+# One float32 matrix / XGBoost QuantileDMatrix is shared by both stages (src/hybrid.py)
+hybrid_model = HybridResidualRegressor(alpha=10.0, xgb_params=dict(
+    n_estimators=500, max_depth=3, learning_rate=0.1, subsample=0.7, colsample_bytree=0.7,
+    random_state=42, n_jobs=-1))
+hybrid_model.fit_backbone(X_train, y_train)
+residuals_train = pd.Series(hybrid_model.residuals_, index=X_train.index)
 
 print(f"\nTrain Residuals Stats:")
 print(f"  Mean: {residuals_train.mean():.2f}")
 print(f"  Std: {residuals_train.std():.2f}")
 print(f"  Min: {residuals_train.min():.2f}, Max: {residuals_train.max():.2f}")
 
-# 5.2 Train XGBoost on residuals
-xgb_residual_model = XGBRegressor(n_estimators=500, max_depth=3, learning_rate=0.1,
-                                   subsample=0.7, colsample_bytree=0.7, random_state=42, n_jobs=-1)
-xgb_residual_model.fit(X_train, residuals_train)
+# 4.2 Train XGBoost on residuals
+hybrid_model.refit_residual()
 
-# 5.3 Predict: Hybrid = LR + XGBoost(residual)
-lr_preds_test = lr_model.predict(X_test)
-residual_preds_test = xgb_residual_model.predict(X_test)
-hybrid_preds_test = lr_preds_test + residual_preds_test
+# 4.3 Predict: Hybrid = LR + XGBoost(residual)
+hybrid_preds_test = hybrid_model.predict(X_test)
 
 r2_hybrid, mape_hybrid = calculate_metrics(y_test, hybrid_preds_test, test_entities)
 print(f"\n[Hybrid Global (LR + XGB Residuals)]")
 print(f"  R² = {r2_hybrid:.4f}, Median MAPE = {mape_hybrid:.2f}%")
 
 # ===========================
-# 6. HYBRID MODEL + HYPERPARAMETER TUNING
+# 5. HYBRID MODEL + HYPERPARAMETER TUNING
 # ===========================
 print("\n" + "=" * 70)
 print("HYBRID MODEL + HYPERPARAMETER TUNING")
@@ -156,7 +147,7 @@ train_data = df_lr[train_mask].sort_values('Year')
 X_train_sorted = train_data[feature_cols]
 y_train_sorted = train_data[TARGET]
 
-# 6.1 Tune LR alpha
+# 5.1 Tune LR alpha
 print("\nTuning Ridge alpha...")
 tscv = TimeSeriesSplit(n_splits=3)
 lr_params = {'alpha': [0.1, 1.0, 10.0, 50.0, 100.0]}
@@ -165,63 +156,57 @@ lr_search.fit(X_train_sorted, y_train_sorted)
 best_lr_alpha = lr_search.best_params_['alpha']
 print(f"  Best LR alpha: {best_lr_alpha}")
 
-# 6.2 Re-train LR with best alpha
-lr_tuned = Ridge(alpha=best_lr_alpha)
-lr_tuned.fit(X_train, y_train)
-lr_preds_train_tuned = lr_tuned.predict(X_train)
-residuals_train_tuned = y_train - lr_preds_train_tuned
+# 5.2 Re-train LR with best alpha
+hybrid_tuned = HybridResidualRegressor(alpha=best_lr_alpha)
+hybrid_tuned.fit_backbone(X_train, y_train)
+residuals_train_tuned = pd.Series(hybrid_tuned.residuals_, index=X_train.index)
 
-# 6.3 Tune XGBoost for residuals
+# 5.3 Tune XGBoost for residuals
 print("\nTuning XGBoost for residuals...")
 xgb_params = {
     'n_estimators': [100, 300, 500],
     'max_depth': [2, 3, 5],
     'learning_rate': [0.01, 0.05, 0.1]
 }
-xgb_search = GridSearchCV(XGBRegressor(subsample=0.7, colsample_bytree=0.7, random_state=42, n_jobs=-1),
-                           xgb_params, cv=tscv, scoring='r2', n_jobs=-1)
-xgb_search.fit(X_train_sorted, residuals_train_tuned.loc[X_train_sorted.index])
-best_xgb_params = xgb_search.best_params_
+# Successive halving across folds; each config is boosted once to 500 rounds and
+# the 100/300 prefixes are scored from the same model (see src/tuning.py)
+xgb_search = tune_xgboost(X_train_sorted, residuals_train_tuned.loc[X_train_sorted.index], xgb_params, cv=tscv,
+                          base_params=dict(subsample=0.7, colsample_bytree=0.7, random_state=42))
+best_xgb_params = xgb_search['best_params']
 print(f"  Best XGB params: {best_xgb_params}")
 
-# 6.4 Train tuned XGBoost on residuals
-xgb_residual_tuned = XGBRegressor(**best_xgb_params, subsample=0.7, colsample_bytree=0.7, 
-                                   random_state=42, n_jobs=-1)
-xgb_residual_tuned.fit(X_train, residuals_train_tuned)
+# 5.4 Train tuned XGBoost on residuals (residual stage only; backbone and matrices reused)
+hybrid_tuned.refit_residual(**best_xgb_params, subsample=0.7, colsample_bytree=0.7,
+                            random_state=42, n_jobs=-1)
+hybrid_tuned.save('data/results/hybrid_tuned.joblib')
+# Same JSON format as before: {'Ridge': {'alpha'}, 'XGBoost': {...}}
+save_best_params('data/results/best_hyperparameters.json', 'Ridge', {'alpha': best_lr_alpha})
+save_best_params('data/results/best_hyperparameters.json', 'XGBoost',
+                 {**best_xgb_params, 'subsample': 0.7, 'colsample_bytree': 0.7})
+# Next version in the model registry, served by `python src/serving.py serve`
+ModelRegistry('models').register('hybrid', hybrid_tuned, metadata={'features': list(feature_cols)})
 
-# 6.5 Predict with tuned hybrid
-lr_preds_test_tuned = lr_tuned.predict(X_test)
-residual_preds_test_tuned = xgb_residual_tuned.predict(X_test)
-hybrid_tuned_preds_test = lr_preds_test_tuned + residual_preds_test_tuned
+# 5.5 Predict with tuned hybrid
+hybrid_tuned_preds_test = hybrid_tuned.predict(X_test)
 
 r2_hybrid_tuned, mape_hybrid_tuned = calculate_metrics(y_test, hybrid_tuned_preds_test, test_entities)
 print(f"\n[Hybrid Tuned (LR α={best_lr_alpha} + XGB {best_xgb_params})]")
 print(f"  R² = {r2_hybrid_tuned:.4f}, Median MAPE = {mape_hybrid_tuned:.2f}%")
 
 # ===========================
-# 7. HYBRID MODEL + K-MEANS CLUSTERING
+# 6. HYBRID MODEL + K-MEANS CLUSTERING
 # ===========================
 print("\n" + "=" * 70)
 print("HYBRID MODEL + K-MEANS CLUSTERING")
 print("=" * 70)
 
-# 7.1 Create country profiles for clustering (train data only)
-cluster_cols = [
-    'gdp_per_capita',
-    'Access to electricity (% of population)',
-    'Renewable energy share in the total final energy consumption (%)',
-    'Primary energy consumption per capita (kWh/person)'
-]
-
+# 6.1 Create country profiles for clustering (train data only)
 # Check if columns exist in df_common
-available_cluster_cols = [c for c in cluster_cols if c in df_common.columns]
+available_cluster_cols = [c for c in CLUSTER_COLS if c in df_common.columns]
 print(f"Using cluster columns: {available_cluster_cols}")
 
-df_profile = df_common[df_common['Year'] < SPLIT_YEAR].groupby('Entity')[available_cluster_cols].mean().dropna()
-
-# Scale and cluster
-scaler_cluster = StandardScaler()
-X_cluster = scaler_cluster.fit_transform(df_profile)
+# Scale and cluster (profiles built once, see src/clustering.py)
+df_profile, X_cluster, scaler_cluster = country_profiles(df_common, available_cluster_cols, end_year=SPLIT_YEAR)
 kmeans = KMeans(n_clusters=3, random_state=42)
 df_profile['Cluster'] = kmeans.fit_predict(X_cluster)
 
@@ -233,65 +218,50 @@ df_lr_clustered['Cluster'] = df_lr_clustered['Cluster'].astype(int)
 print(f"\nClustered data shape: {df_lr_clustered.shape}")
 print(f"Cluster distribution:\n{df_lr_clustered.groupby('Cluster').size()}")
 
-# 7.2 Train cluster-specific hybrid models
-hybrid_cluster_models = {}
-all_cluster_predictions = []
+# 6.2 Train cluster-specific hybrid models
+# Data is partitioned once by cluster and the models train in parallel with a fixed
+# thread budget per worker (src/cluster_ensemble.py)
+train_clu = df_lr_clustered[df_lr_clustered['Year'] < SPLIT_YEAR]
+test_clu = df_lr_clustered[(df_lr_clustered['Year'] >= SPLIT_YEAR) & (df_lr_clustered['Year'] <= 2019)]
+test_counts = test_clu['Cluster'].value_counts()
+for c in sorted(test_counts[test_counts < 5].index):
+    print(f"  Cluster {c}: Not enough data, skipping")
+test_clu = test_clu[test_clu['Cluster'].map(test_counts) >= 5]
+
+cluster_ensemble = ClusterEnsembleRegressor(
+    HybridResidualRegressor(alpha=best_lr_alpha, xgb_params=dict(
+        **best_xgb_params, subsample=0.7, colsample_bytree=0.7, random_state=42)),
+    min_samples=20)
+cluster_ensemble.fit(train_clu[feature_cols], train_clu[TARGET], clusters=train_clu['Cluster'])
+hybrid_cluster_models = cluster_ensemble.models_
+
+# Every test row is routed to its cluster model in one call
+cluster_preds = pd.DataFrame({
+    'Cluster': test_clu['Cluster'].values,
+    'Entity': test_clu['Entity'].values,
+    'Actual': test_clu[TARGET].values,
+    'Pred': cluster_ensemble.predict(test_clu[feature_cols], clusters=test_clu['Cluster']),
+}).dropna(subset=['Pred'])
 
-for c in sorted(df_lr_clustered['Cluster'].unique()):
-    cluster_data = df_lr_clustered[df_lr_clustered['Cluster'] == c]
-    
-    train_c = cluster_data[cluster_data['Year'] < SPLIT_YEAR]
-    test_c = cluster_data[(cluster_data['Year'] >= SPLIT_YEAR) & (cluster_data['Year'] <= 2019)]
-    
-    if len(train_c) < 20 or len(test_c) < 5:
-        print(f"  Cluster {c}: Not enough data, skipping")
-        continue
-    
-    X_train_c = train_c[feature_cols]
-    y_train_c = train_c[TARGET]
-    X_test_c = test_c[feature_cols]
-    y_test_c = test_c[TARGET]
-    test_entities_c = test_c['Entity']
-    
-    # Train LR
-    lr_c = Ridge(alpha=best_lr_alpha)
-    lr_c.fit(X_train_c, y_train_c)
-    
-    # Get residuals and train XGBoost
-    residuals_c = y_train_c - lr_c.predict(X_train_c)
-    xgb_c = XGBRegressor(**best_xgb_params, subsample=0.7, colsample_bytree=0.7, 
-                          random_state=42, n_jobs=-1)
-    xgb_c.fit(X_train_c, residuals_c)
-    
-    # Predict
-    lr_pred_c = lr_c.predict(X_test_c)
-    xgb_pred_c = xgb_c.predict(X_test_c)
-    hybrid_pred_c = lr_pred_c + xgb_pred_c
-    
-    r2_c, mape_c = calculate_metrics(y_test_c, hybrid_pred_c, test_entities_c)
-    print(f"  Cluster {c}: R² = {r2_c:.4f}, Median MAPE = {mape_c:.2f}%, N = {len(test_c)}")
+all_cluster_predictions = []
+for c, preds_c in cluster_preds.groupby('Cluster'):
+    r2_c, mape_c = calculate_metrics(preds_c['Actual'], preds_c['Pred'].values, preds_c['Entity'])
+    print(f"  Cluster {c}: R² = {r2_c:.4f}, Median MAPE = {mape_c:.2f}%, N = {len(preds_c)}")
     
     # Store predictions for overall calculation
-    all_cluster_predictions.append(pd.DataFrame({
-        'Entity': test_entities_c.values,
-        'Actual': y_test_c.values,
-        'Pred': hybrid_pred_c
-    }))
+    all_cluster_predictions.append(preds_c[['Entity', 'Actual', 'Pred']])
 
-# 7.3 Calculate overall cluster-based metrics
+# 6.3 Calculate overall cluster-based metrics
 if all_cluster_predictions:
     all_preds_df = pd.concat(all_cluster_predictions, ignore_index=True)
-    r2_cluster_hybrid = r2_score(all_preds_df['Actual'], all_preds_df['Pred'])
-    
-    all_preds_df['APE'] = np.abs(all_preds_df['Actual'] - all_preds_df['Pred']) / np.abs(all_preds_df['Actual'].replace(0, np.nan)) * 100
-    entity_mape = all_preds_df.groupby('Entity')['APE'].mean()
-    mape_cluster_hybrid = entity_mape.median()
+    r2_cluster_hybrid, mape_cluster_hybrid = calculate_metrics(
+        all_preds_df['Actual'], all_preds_df['Pred'].values, all_preds_df['Entity'])
     
     print(f"\n[Hybrid + K-Means (Cluster-Specific)]")
     print(f"  R² = {r2_cluster_hybrid:.4f}, Median MAPE = {mape_cluster_hybrid:.2f}%")
 
 # ===========================
-# 8. SUMMARY COMPARISON
+# 7. SUMMARY COMPARISON
 # ===========================
 print("\n" + "=" * 70)
 print("FINAL COMPARISON")
@@ -317,7 +287,7 @@ results.to_csv('data/results/hybrid_model_comparison.csv', index=False)
 print("\n✅ Results saved to data/results/hybrid_model_comparison.csv")
 
 # ===========================
-# 9. VISUALIZATION
+# 8. VISUALIZATION
 # ===========================
 print("\n" + "=" * 70)
 print("GENERATING COMPARISON PLOT")
@@ -325,7 +295,7 @@ print("=" * 70)
 
 fig, axes = plt.subplots(1, 2, figsize=(14, 5))
 
-# 9.1 R² Comparison
+# 8.1 R² Comparison
 ax1 = axes[0]
 colors = ['#3498db', '#e74c3c', '#27ae60', '#9b59b6', '#f39c12']
 bars = ax1.barh(results['Model'], results['R²'], color=colors[:len(results)])
@@ -335,7 +305,7 @@ ax1.set_xlim(0, 1.05)
 for bar, val in zip(bars, results['R²']):
     ax1.text(val + 0.01, bar.get_y() + bar.get_height()/2, f'{val:.4f}', va='center')
 
-# 9.2 MAPE Comparison
+# 8.2 MAPE Comparison
 ax2 = axes[1]
 bars2 = ax2.barh(results['Model'], results['Median MAPE (%)'], color=colors[:len(results)])
 ax2.set_xlabel('Median MAPE (%)')
@@ -0,0 +1,200 @@
+"""
+Rolling-origin backtesting on a (Entity, Year) panel.
+
+The panel is sorted by year once, so the training set of every origin is a prefix (or,
+with a sliding window, a contiguous slice) of the same arrays and the test set is the
+block of the origin year. No masks or feature frames are rebuilt per origin.
+
+- Ridge (sklearn Ridge or SparseRidge, scalar alpha, positive=False): X'X, X'y and the
+  column sums are computed once per year block and accumulated, so every origin costs one
+  (p x p) solve. A sliding window subtracts the blocks that leave it.
+- Any other estimator (XGBoost, SVR, Ridge(positive=True)...) is cloned and fit once per
+  origin; the origins run in parallel under the tuning.cpu_budget thread budget.
+"""
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy import linalg
+from sklearn.base import clone
+from sklearn.linear_model import Ridge
+
+from cluster_ensemble import _with_threads
+from evaluation import PanelScorer
+from fixed_effects import SparseRidge
+from tuning import cpu_budget
+
+
+def _fit_predict(estimator, X_train, y_train, X_test):
+    return estimator.fit(X_train, y_train).predict(X_test)
+
+
+def _closed_form(estimator):
+    """Whether the normal equations reproduce the estimator's fit (unconstrained Ridge, one alpha)."""
+    if not isinstance(estimator, (Ridge, SparseRidge)):
+        return False
+    params = estimator.get_params()
+    return np.ndim(params['alpha']) == 0 and not params.get('positive', False)
+
+
+class RollingBacktest:
+    """
+    Expanding- (or sliding-) window backtest: for each origin year, train on the years
+    before it and predict the origin year.
+
+    Args:
+        df (pd.DataFrame): Panel with features, target and time column.
+        feature_cols (list): Model features.
+        target_col (str): Target column.
+        time_col (str): Year column.
+        entity_col (str): Entity column used for per-entity MAPE (optional).
+
+    Example:
+        bt = RollingBacktest(df_model, feature_cols, TARGET)
+        results = bt.run({'Ridge': Ridge(alpha=1.0), 'XGBoost': XGBRegressor()}, origins=range(2000, 2020))
+    """
+    def __init__(self, df, feature_cols, target_col, time_col='Year', entity_col='Entity'):
+        years = df[time_col].to_numpy()
+        order = np.argsort(years, kind='stable')
+        self.feature_cols = list(feature_cols)
+        self.X = np.ascontiguousarray(df[self.feature_cols].to_numpy(dtype=np.float64)[order])
+        self.y = df[target_col].to_numpy(dtype=np.float64)[order]
+        self.years = years[order]
+        self.entities = df[entity_col].to_numpy()[order] if entity_col in df.columns else None
+        self.index = df.index[order]
+
+        # Row range of every year in the sorted arrays
+        self.unique_years = np.unique(self.years)
+        self.starts = np.searchsorted(self.years, self.unique_years, side='left')
+        self.ends = np.searchsorted(self.years, self.unique_years, side='right')
+        self._moments = None
+
+    def splits(self, origins, window=None):
+        """
+        (origin, train_start, train_end, test_start, test_end) row ranges per origin.
+
+        Origins without test rows or training rows are skipped.
+        """
+        for origin in origins:
+            pos = np.searchsorted(self.unique_years, origin)
+            if pos >= len(self.unique_years) or self.unique_years[pos] != origin or pos == 0:
+                continue
+            first = 0 if window is None else max(0, pos - window)
+            yield origin, self.starts[first], self.starts[pos], self.starts[pos], self.ends[pos]
+
+    def _year_moments(self):
+        """
+        Cumulative per-year Gram matrices, X'y, column sums, target sums and counts.
+
+        X and y are shifted by their overall means first, which keeps the centered Gram
+        matrix (X'X - n mean mean') accurate for large-valued features.
+        """
+        if self._moments is None:
+            x_shift, y_shift = self.X.mean(axis=0), self.y.mean()
+            p = self.X.shape[1]
+            n_years = len(self.unique_years)
+            gram = np.zeros((n_years + 1, p, p))
+            xty = np.zeros((n_years + 1, p))
+            x_sum = np.zeros((n_years + 1, p))
+            y_sum = np.zeros(n_years + 1)
+            for i, (s, e) in enumerate(zip(self.starts, self.ends)):
+                Xb = self.X[s:e] - x_shift
+                yb = self.y[s:e] - y_shift
+                gram[i + 1] = gram[i] + Xb.T @ Xb
+                xty[i + 1] = xty[i] + Xb.T @ yb
+                x_sum[i + 1] = x_sum[i] + Xb.sum(axis=0)
+                y_sum[i + 1] = y_sum[i] + yb.sum()
+            counts = np.concatenate([[0], np.cumsum(self.ends - self.starts)])
+            self._moments = (gram, xty, x_sum, y_sum, counts, x_shift, y_shift)
+        return self._moments
+
+    def ridge_coefs(self, alpha, train_start, train_end, fit_intercept=True):
+        """Ridge coefficients and intercept on rows [train_start, train_end) (year boundaries)."""
+        gram, xty, x_sum, y_sum, counts, x_shift, y_shift = self._year_moments()
+        first = np.searchsorted(counts, train_start)
+        last = np.searchsorted(counts, train_end)
+        n = counts[last] - counts[first]
+        G = gram[last] - gram[first]
+        b = xty[last] - xty[first]
+        x_mean = (x_sum[last] - x_sum[first]) / n
+        y_mean = (y_sum[last] - y_sum[first]) / n
+        if fit_intercept:
+            G = G - n * np.outer(x_mean, x_mean)
+            b = b - n * x_mean * y_mean
+        else:  # undo the shift: moments of the raw X and y
+            G = G + np.outer(x_shift, x_sum[last] - x_sum[first]) + np.outer(x_sum[last] - x_sum[first], x_shift) \
+                + n * np.outer(x_shift, x_shift)
+            b = b + x_shift * (y_sum[last] - y_sum[first]) + y_shift * (x_sum[last] - x_sum[first]) \
+                + n * x_shift * y_shift
+        G[np.diag_indices_from(G)] += alpha
+        try:
+            coef = linalg.solve(G, b, assume_a='pos')
+        except linalg.LinAlgError:  # alpha=0 with collinear columns
+            coef = linalg.lstsq(G, b)[0]
+        intercept = y_shift + y_mean - (x_shift + x_mean) @ coef if fit_intercept else 0.0
+        return coef, intercept
+
+    def _ridge_predictions(self, estimator, splits):
+        params = estimator.get_params()
+        preds = []
+        for _, tr_s, tr_e, te_s, te_e in splits:
+            coef, intercept = self.ridge_coefs(params['alpha'], tr_s, tr_e, params.get('fit_intercept', True))
+            preds.append(self.X[te_s:te_e] @ coef + intercept)
+        return preds
+
+    def _parallel_predictions(self, estimator, splits, n_jobs):
+        outer, inner = cpu_budget(len(splits), n_jobs)
+        return Parallel(n_jobs=outer)(
+            delayed(_fit_predict)(_with_threads(clone(estimator), inner),
+                                  self.X[tr_s:tr_e], self.y[tr_s:tr_e], self.X[te_s:te_e])
+            for _, tr_s, tr_e, te_s, te_e in splits
+        )
+
+    def run(self, models, origins, window=None, n_jobs=None, verbose=True):
+        """
+        Backtests every model over the origins.
+
+        Args:
+            models (dict): {name: estimator}. Ridge/SparseRidge with a scalar alpha (and no
+                positive constraint) use the incremental normal equations; other estimators
+                are refit per origin in parallel.
+            origins (iterable): Test years.
+            window (int): Training years per origin (None = expanding window).
+            n_jobs (int): CPU budget for the per-origin refits.
+
+        Returns:
+            pd.DataFrame: One row per (Model, Year) with R2, RMSE, MAE, Median MAPE and sizes.
+            The test predictions are kept in `predictions_` (one column per model).
+        """
+        splits = list(self.splits(origins, window))
+        predictions = {}
+        for name, estimator in models.items():
+            if _closed_form(estimator):
+                predictions[name] = self._ridge_predictions(estimator, splits)
+            else:
+                predictions[name] = self._parallel_predictions(estimator, splits, n_jobs)
+
+        rows, frames = [], []
+        for i, (origin, tr_s, tr_e, te_s, te_e) in enumerate(splits):
+            entities = None if self.entities is None else self.entities[te_s:te_e]
+            scores = PanelScorer(self.y[te_s:te_e], entities).score({name: preds[i] for name, preds in predictions.items()})
+            for name, score in scores.iterrows():
+                rows.append({'Model': name, 'Year': origin, **score.to_dict(),
+                             'n_train': tr_e - tr_s, 'n_test': te_e - te_s})
+                if verbose:
+                    print(f" {name} | {origin}: R2 = {score['R2']:.4f}, RMSE = {score['RMSE']:,.0f}")
+            frame = pd.DataFrame({'Year': origin, 'Actual': self.y[te_s:te_e]}, index=self.index[te_s:te_e])
+            if entities is not None:
+                frame.insert(0, 'Entity', entities)
+            for name, preds in predictions.items():
+                frame[name] = preds[i]
+            frames.append(frame)
+
+        self.predictions_ = pd.concat(frames) if frames else pd.DataFrame()
+        return pd.DataFrame(rows)
+
+
+def rolling_backtest(df, feature_cols, target_col, models, origins, window=None, n_jobs=None,
+                     time_col='Year', entity_col='Entity', verbose=True):
+    """One-call version of RollingBacktest(...).run(...)."""
+    return RollingBacktest(df, feature_cols, target_col, time_col, entity_col).run(
+        models, origins, window=window, n_jobs=n_jobs, verbose=verbose)
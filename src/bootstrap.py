@@ -0,0 +1,181 @@
+"""
+Entity-block bootstrap prediction intervals.
+
+Each replicate resamples whole entities (countries) with replacement, so the serial
+dependence within a country stays intact, refits the model and predicts the forecast rows.
+With interval='prediction' every replicate prediction also gets a residual drawn from the
+out-of-bag entities (those not sampled), so the interval covers the model uncertainty and
+the noise of a new observation; interval='confidence' gives the interval of the fit alone.
+
+Replicates run in a joblib process pool. The training matrix is memory-mapped (in
+/dev/shm where available) and the workers open it by reference instead of receiving a
+pickled copy. Each worker streams its predictions into a RowQuantileSketch; the sketches
+are merged at the end, so the (rows x replicates) prediction matrix is never stored (a
+sketch keeps at most about 2k values per row, k well below the number of replicates).
+"""
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+
+from cluster_ensemble import _with_threads
+from tuning import cpu_budget
+
+
+class RowQuantileSketch:
+    """
+    One streaming quantile sketch per row (e.g. per forecast), vectorized over rows.
+
+    Same compactor hierarchy as ingest.QuantileSketch: level h holds items of weight 2**h
+    and a full level (k items per row) is sorted and every other item promoted. All rows
+    receive the same number of values, so every level is a (rows x items) array and one
+    sort compacts all rows. Exact while a row has seen at most k values.
+    """
+    def __init__(self, n_rows, k=1024, seed=0):
+        self.k = k
+        self.levels = [np.empty((n_rows, 0))]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Adds values of shape (rows,) or (rows, m)."""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+        self.count += values.shape[1]
+        self.levels[0] = np.hstack([self.levels[0], values])
+        self._compact()
+        return self
+
+    def merge(self, other):
+        """Merges another sketch over the same rows into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty((self.levels[0].shape[0], 0)))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.hstack([self.levels[h], items])
+        self.count += other.count
+        self._compact()
+        return self
+
+    def _compact(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if items.shape[1] >= self.k:
+                items = np.sort(items, axis=1)
+                if items.shape[1] % 2:  # odd count: keep one item per row at this level
+                    keep, items = items[:, -1:], items[:, :-1]
+                else:
+                    keep = items[:, :0]
+                promoted = items[:, self._rng.integers(2)::2]
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(items[:, :0])
+                self.levels[h + 1] = np.hstack([self.levels[h + 1], promoted])
+            h += 1
+
+    def quantile(self, q):
+        """Approximate q-quantile of every row (exact, with linear interpolation, while uncompacted)."""
+        if self.count == 0:
+            return np.full(self.levels[0].shape[0], np.nan)
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], q, axis=1)
+        items = np.hstack(self.levels)
+        weights = np.concatenate([np.full(lv.shape[1], 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, axis=1)
+        cum = np.cumsum(weights[order], axis=1)
+        pos = (cum < q * cum[:, -1:]).sum(axis=1)
+        return np.take_along_axis(items, order, axis=1)[np.arange(len(items)), pos]
+
+
+def entity_blocks(entities):
+    """Row order grouping rows by entity, with the start and length of every entity block."""
+    codes, _ = pd.factorize(np.asarray(entities), sort=True)
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes)
+    return order, np.cumsum(counts) - counts, counts
+
+
+def _block_rows(chosen, starts, counts):
+    """Row indices of the chosen entity blocks, concatenated (blocks may repeat)."""
+    lengths = counts[chosen]
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts[chosen] - (ends - lengths), lengths)
+
+
+def _bootstrap_batch(estimator, X, y, starts, counts, X_pred, seeds, interval, k):
+    """Fits the replicates of one batch; returns (sketch, prediction sum)."""
+    sketch = RowQuantileSketch(len(X_pred), k=k, seed=int(seeds[0].generate_state(1)[0]))
+    total = np.zeros(len(X_pred))
+    n_entities = len(starts)
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        chosen = rng.integers(n_entities, size=n_entities)
+        rows = _block_rows(chosen, starts, counts)
+        model = clone(estimator).fit(X[rows], y[rows])
+        preds = np.asarray(model.predict(X_pred), dtype=np.float64)
+        total += preds
+        if interval == 'prediction':
+            oob = np.setdiff1d(np.arange(n_entities), chosen)
+            resid_rows = _block_rows(oob, starts, counts) if len(oob) else rows
+            residuals = y[resid_rows] - model.predict(X[resid_rows])
+            preds = preds + rng.choice(residuals, size=len(preds))
+        sketch.update(preds)
+    return sketch, total
+
+
+def bootstrap_intervals(estimator, X, y, entities, X_pred, n_boot=500, level=0.9, interval='prediction',
+                        n_jobs=None, k=128, random_state=42, verbose=True):
+    """
+    Entity-block bootstrap interval for every row of X_pred.
+
+    Args:
+        estimator: Unfitted model (Ridge, XGBRegressor, HybridResidualRegressor...), cloned per replicate.
+        X, y: Training features and target.
+        entities: Entity of every training row (the resampled blocks).
+        X_pred: Rows to forecast (same columns as X).
+        n_boot (int): Bootstrap replicates.
+        level (float): Interval coverage (0.9 -> 5% and 95% quantiles).
+        interval (str): 'prediction' (adds out-of-bag residuals) or 'confidence'.
+        n_jobs (int): Total CPU budget (workers x model threads).
+        k (int): Sketch size per row; quantiles are exact up to k replicates. Beyond that they
+            are approximate (rank error of order 1/k) and, since each batch of replicates is
+            compacted separately, depend slightly on the worker/batch split (n_jobs).
+
+    Returns:
+        pd.DataFrame: Pred (fit on all data), Boot_Mean, Lower, Upper, indexed like X_pred.
+    """
+    if interval not in ('prediction', 'confidence'):
+        raise ValueError(f"interval must be 'prediction' or 'confidence', got {interval!r}")
+    index = X_pred.index if isinstance(X_pred, (pd.DataFrame, pd.Series)) else pd.RangeIndex(len(X_pred))
+    order, starts, counts = entity_blocks(entities)
+    X_sorted = np.ascontiguousarray(np.asarray(X, dtype=np.float64)[order])
+    y_sorted = np.asarray(y, dtype=np.float64)[order]
+    X_pred = np.ascontiguousarray(np.asarray(X_pred, dtype=np.float64))
+
+    seeds = np.random.SeedSequence(random_state).spawn(n_boot)
+    outer, inner = cpu_budget(n_boot, n_jobs)
+    batches = np.array_split(np.arange(n_boot), min(n_boot, 4 * outer))
+    model = _with_threads(clone(estimator), inner)
+    if verbose:
+        print(f"Bootstrap: {n_boot} replicates over {len(starts)} entity blocks ({outer} workers x {inner} threads)")
+
+    # max_nbytes=0: every array argument is memory-mapped once and shared by reference
+    results = Parallel(n_jobs=outer, max_nbytes=0, mmap_mode='r')(
+        delayed(_bootstrap_batch)(model, X_sorted, y_sorted, starts, counts, X_pred,
+                                  [seeds[i] for i in batch], interval, k)
+        for batch in batches if len(batch)
+    )
+    sketch, total = results[0]
+    for other, other_total in results[1:]:
+        sketch.merge(other)
+        total = total + other_total
+
+    alpha = (1 - level) / 2
+    full_fit = clone(estimator).fit(X_sorted, y_sorted)
+    return pd.DataFrame({
+        'Pred': np.asarray(full_fit.predict(X_pred), dtype=np.float64),
+        'Boot_Mean': total / n_boot,
+        'Lower': sketch.quantile(alpha),
+        'Upper': sketch.quantile(1 - alpha),
+    }, index=index)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+
+from tuning import cpu_budget
+
+
+def cluster_offsets(clusters):
+    """
+    Groups rows by cluster with one stable sort.
+
+    Returns:
+        tuple: (labels, order, starts, ends); rows order[starts[i]:ends[i]] belong to labels[i].
+    """
+    codes, labels = pd.factorize(np.asarray(clusters), sort=True)
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=len(labels))
+    ends = np.cumsum(counts)
+    return np.asarray(labels), order, ends - counts, ends
+
+
+def _take(X, idx):
+    return X.iloc[idx] if isinstance(X, (pd.DataFrame, pd.Series)) else X[idx]
+
+
+def _slice(X, start, end):
+    return X.iloc[start:end] if isinstance(X, (pd.DataFrame, pd.Series)) else X[start:end]
+
+
+def _with_threads(estimator, n_threads):
+    """Caps the threads an estimator may use (n_jobs, or xgb_params['n_jobs'] for the hybrid)."""
+    params = estimator.get_params(deep=False)
+    if 'xgb_params' in params:
+        estimator.set_params(xgb_params={**(params['xgb_params'] or {}), 'n_jobs': n_threads})
+    elif 'n_jobs' in params:
+        estimator.set_params(n_jobs=n_threads)
+    return estimator
+
+
+def _fit_one(estimator, X, y):
+    return estimator.fit(X, y)
+
+
+class ClusterEnsembleRegressor(BaseEstimator, RegressorMixin):
+    """
+    One model per cluster, trained concurrently.
+
+    Rows are partitioned once by cluster (stable sort + group offsets) and every cluster
+    model is fit on its contiguous slice in a process pool. The CPU budget is split with
+    tuning.cpu_budget, so workers x threads per model never exceeds n_jobs (instead of every
+    XGBoost model claiming all cores). predict routes rows to their cluster model with one
+    sort and scatters the results back in the original order.
+
+    Args:
+        estimator: Model cloned for each cluster (e.g. HybridResidualRegressor).
+        min_samples (int): Clusters with fewer training rows get no model (NaN predictions).
+        n_jobs (int): Total CPU budget (default: all cores).
+
+    Example:
+        ens = ClusterEnsembleRegressor(HybridResidualRegressor(alpha=10.0, xgb_params=params))
+        ens.fit(X_train, y_train, clusters=train['Cluster'])
+        preds = ens.predict(X_test, clusters=test['Cluster'])
+    """
+    def __init__(self, estimator, min_samples=20, n_jobs=None, verbose=True):
+        self.estimator = estimator
+        self.min_samples = min_samples
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+
+    def fit(self, X, y, clusters):
+        labels, order, starts, ends = cluster_offsets(clusters)
+        labels = labels.tolist()
+        X_sorted, y_sorted = _take(X, order), _take(y, order)
+
+        tasks = [(label, s, e) for label, s, e in zip(labels, starts, ends) if e - s >= self.min_samples]
+        skipped = [label for label, s, e in zip(labels, starts, ends) if e - s < self.min_samples]
+        outer, inner = cpu_budget(len(tasks), self.n_jobs)
+        if self.verbose:
+            print(f"Training {len(tasks)} cluster models ({outer} workers x {inner} threads)"
+                  + (f", skipped {skipped} (< {self.min_samples} rows)" if skipped else ""))
+
+        models = Parallel(n_jobs=outer)(
+            delayed(_fit_one)(_with_threads(clone(self.estimator), inner), _slice(X_sorted, s, e), _slice(y_sorted, s, e))
+            for _, s, e in tasks
+        )
+        self.models_ = {label: model for (label, _, _), model in zip(tasks, models)}
+        self.clusters_ = np.array(list(self.models_))
+        return self
+
+    def predict(self, X, clusters):
+        """Predictions in the row order of X; NaN for clusters without a model."""
+        labels, order, starts, ends = cluster_offsets(clusters)
+        X_sorted = _take(X, order)
+        sorted_preds = np.full(len(order), np.nan)
+        for label, s, e in zip(labels, starts, ends):
+            model = self.models_.get(label)
+            if model is not None:
+                sorted_preds[s:e] = model.predict(_slice(X_sorted, s, e))
+        preds = np.empty_like(sorted_preds)
+        preds[order] = sorted_preds
+        return preds
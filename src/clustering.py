@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.preprocessing import StandardScaler
+
+# Country profile features used by the clustering notebooks
+CLUSTER_COLS = [
+    'gdp_per_capita',
+    'Access to electricity (% of population)',
+    'Renewable energy share in the total final energy consumption (%)',
+    'Primary energy consumption per capita (kWh/person)'
+]
+
+
+def country_profiles(df, cols=CLUSTER_COLS, end_year=None, group_col='Entity', time_col='Year'):
+    """
+    Mean profile vector per entity (years < end_year), computed once for a whole k-sweep.
+
+    Entities with a missing mean are dropped, as in the notebooks.
+
+    Returns:
+        tuple: (profile DataFrame indexed by entity, standardized profile array, fitted scaler)
+    """
+    cols = [c for c in cols if c in df.columns]
+    data = df if end_year is None else df[df[time_col] < end_year]
+    profile = data.groupby(group_col)[cols].mean().dropna()
+    scaler = StandardScaler()
+    return profile, scaler.fit_transform(profile), scaler
+
+
+def _add_center(X, sq_norms, centers, rng):
+    """k-means++ step: samples a new center with probability proportional to D(x)^2."""
+    d2 = sq_norms[:, None] - 2 * X @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    d2 = np.maximum(d2.min(axis=1), 0)
+    total = d2.sum()
+    idx = rng.choice(len(X), p=d2 / total) if total > 0 else rng.integers(len(X))
+    return np.vstack([centers, X[idx]])
+
+
+def silhouette_from_distances(D, labels, n_clusters):
+    """
+    Mean silhouette coefficient from a precomputed distance matrix (same as
+    sklearn.metrics.silhouette_score(metric='precomputed')).
+
+    The per-cluster distance sums of all points come from one (n x n) @ (n x k) product.
+    """
+    n = len(labels)
+    onehot = np.zeros((n, n_clusters))
+    onehot[np.arange(n), labels] = 1.0
+    sums = D @ onehot
+    sizes = onehot.sum(axis=0)
+    own = sizes[labels]
+
+    a = sums[np.arange(n), labels] / np.maximum(own - 1, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        other = np.where(sizes > 0, sums / sizes, np.inf)
+    other[np.arange(n), labels] = np.inf
+    b = other.min(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = (b - a) / np.maximum(a, b)
+    s[(own <= 1) | ~np.isfinite(s)] = 0.0  # singletons score 0
+    return float(s.mean())
+
+
+def kmeans_sweep(X, k_values=range(2, 31), minibatch=None, batch_size=1024, silhouette_sample=2000,
+                 cold_starts=1, random_state=42, verbose=True):
+    """
+    Fits K-Means for every k, warm-starting each k from the previous solution.
+
+    The centers of k-1 plus one k-means++ sampled center initialize k, so each fit needs
+    only a few iterations. A warm start can stay in a local minimum (two blobs sharing a
+    center), so each k is also fit from `cold_starts` k-means++ initializations and the
+    lowest inertia is kept and carried to k+1. Silhouette scores of every k reuse one distance matrix
+    (on a random sample of `silhouette_sample` rows for large inputs).
+
+    Args:
+        X (np.ndarray): Standardized profiles (see country_profiles).
+        minibatch (bool): Use MiniBatchKMeans; default when X has more than batch_size rows.
+        cold_starts (int): k-means++ initializations compared with the warm start (0: warm only).
+
+    Returns:
+        tuple: (DataFrame with k, inertia, silhouette, n_iter, warm (the warm start won);
+            {k: fitted model})
+    """
+    X = np.asarray(X, dtype=np.float64)
+    rng = np.random.default_rng(random_state)
+    if minibatch is None:
+        minibatch = len(X) > batch_size
+    sq_norms = (X ** 2).sum(axis=1)
+    sample = np.sort(rng.choice(len(X), silhouette_sample, replace=False)) if len(X) > silhouette_sample else np.arange(len(X))
+    D = euclidean_distances(X[sample], squared=False)
+
+    start = time.perf_counter()
+    rows, models, centers = [], {}, None
+    for k in sorted(k_values):
+        if k > len(X):
+            break
+        inits, warm = [], centers is not None
+        if warm:
+            init = centers
+            while len(init) < k:
+                init = _add_center(X, sq_norms, init, rng)
+            inits.append((init, 1))
+        if not warm or cold_starts > 0:
+            inits.append(('k-means++', max(cold_starts, 1)))
+        fits = []
+        for init, n_init in inits:
+            if minibatch:
+                model = MiniBatchKMeans(n_clusters=k, init=init, n_init=n_init, batch_size=batch_size,
+                                        random_state=random_state)
+            else:
+                model = KMeans(n_clusters=k, init=init, n_init=n_init, random_state=random_state)
+            fits.append(model.fit(X))
+        model = min(fits, key=lambda m: m.inertia_)
+        warm = warm and model is fits[0]
+        centers = model.cluster_centers_
+        models[k] = model
+        labels = model.labels_[sample]
+        silhouette = silhouette_from_distances(D, labels, k) if k < len(sample) else np.nan
+        rows.append({'k': k, 'inertia': model.inertia_, 'silhouette': silhouette, 'n_iter': model.n_iter_,
+                     'warm': warm})
+
+    results = pd.DataFrame(rows)
+    if verbose:
+        best = results.loc[results['silhouette'].idxmax()]
+        print(f"K-Means sweep k={results['k'].min()}..{results['k'].max()} in {time.perf_counter() - start:.2f}s "
+              f"({'mini-batch' if minibatch else 'full'}), best silhouette at k={int(best['k'])}: {best['silhouette']:.3f}")
+    return results, models
@@ -0,0 +1,165 @@
+"""
+Typed columnar store for processed datasets.
+
+Every `<name>.csv` artifact can be mirrored by a `<name>.store/` directory holding one
+binary file per column plus a small `manifest.json` (schema, row count, source hash).
+Numeric columns are saved as .npy files and memory-mapped on load, so reading a stage
+costs milliseconds instead of re-parsing floats and re-inferring dtypes. String columns
+(e.g. Entity) are saved as int32 codes with their dictionary in the manifest.
+When pyarrow is installed, fmt='feather' stores the frame as one Feather file instead.
+
+Usage (from the repository root), to build stores for existing CSV artifacts:
+    python src/data_store.py data/processed/common_preprocessed.csv data/processed/xgb_final_prep.csv
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = 'manifest.json'
+STORE_VERSION = 1
+# Stable row identifier column of processed datasets (see panel_frame)
+ROW_ID = 'Row_ID'
+
+
+def store_path(path):
+    """Returns the store directory mirroring a CSV path (`x.csv` -> `x.store`)."""
+    root, ext = os.path.splitext(path)
+    return (root if ext.lower() == '.csv' else path) + '.store'
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_info(path):
+    """Size, mtime and hash of the CSV a store mirrors (None if there is no such file)."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {'path': os.path.basename(path), 'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': file_hash(path)}
+
+
+def _is_fresh(source, path):
+    """True if the CSV at path is still the one the store was built from."""
+    if not os.path.exists(path):
+        return True  # store-only dataset
+    if source is None:
+        return False
+    stat = os.stat(path)
+    if stat.st_size == source['size'] and stat.st_mtime == source['mtime']:
+        return True
+    return stat.st_size == source['size'] and file_hash(path) == source['sha256']
+
+
+def save_dataset(df, path, fmt='npy'):
+    """
+    Saves df as a columnar store next to `path` (the CSV it mirrors).
+
+    Call it after writing the CSV so the manifest records the CSV's hash; a store whose
+    CSV has changed since is ignored by load_dataset.
+
+    Args:
+        fmt (str): 'npy' (memory-mapped NumPy columns) or 'feather' (requires pyarrow,
+            falls back to 'npy' when it is not installed).
+    """
+    target = store_path(path)
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    if fmt == 'feather':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("pyarrow not installed, saving store as npy")
+            fmt = 'npy'
+
+    columns = []
+    if fmt == 'feather':
+        df.reset_index(drop=True).to_feather(os.path.join(tmp, 'data.feather'))
+        columns = [{'name': str(c), 'dtype': str(df[c].dtype)} for c in df.columns]
+    else:
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            meta = {'name': str(col), 'dtype': str(series.dtype), 'file': f'c{i:04d}.npy'}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                meta['kind'] = 'category'
+                meta['categories'] = series.cat.categories.tolist()
+                values = series.cat.codes.to_numpy(dtype=np.int32)
+            elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+                codes, uniques = pd.factorize(series)
+                meta['kind'] = 'string'
+                meta['categories'] = [str(u) for u in uniques]
+                values = codes.astype(np.int32)
+            else:
+                meta['kind'] = 'numeric'
+                values = series.to_numpy()
+            np.save(os.path.join(tmp, meta['file']), values, allow_pickle=False)
+            columns.append(meta)
+
+    manifest = {
+        'version': STORE_VERSION,
+        'format': fmt,
+        'rows': len(df),
+        'columns': columns,
+        'source': _source_info(path),
+    }
+    with open(os.path.join(tmp, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.rename(tmp, target)
+    return target
+
+
+def load_dataset(path):
+    """
+    Loads the store mirroring `path`, or returns None if it is missing or stale.
+
+    Numeric columns are memory-mapped copy-on-write: no bytes are copied or parsed until
+    they are touched, and in-place edits never reach the file.
+    """
+    target = store_path(path)
+    manifest_file = os.path.join(target, MANIFEST)
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != STORE_VERSION or not _is_fresh(manifest.get('source'), path):
+        return None
+
+    if manifest['format'] == 'feather':
+        from pyarrow import feather
+        return feather.read_table(os.path.join(target, 'data.feather'), memory_map=True).to_pandas()
+
+    data = {}
+    for meta in manifest['columns']:
+        # Plain ndarray view of the mapping: still zero-copy, but no memmap subclass in pandas
+        values = np.load(os.path.join(target, meta['file']), mmap_mode='c', allow_pickle=False).view(np.ndarray)
+        if meta['kind'] == 'category':
+            data[meta['name']] = pd.Categorical.from_codes(values, categories=meta['categories'])
+        elif meta['kind'] == 'string':
+            lookup = np.array(meta['categories'] + [np.nan], dtype=object)  # code -1 -> NaN
+            data[meta['name']] = lookup[values]
+        else:
+            data[meta['name']] = values
+    df = pd.DataFrame(data, copy=False)
+    if len(df) != manifest['rows']:
+        return None
+    return df
+
+
+if __name__ == "__main__":
+    for csv_path in sys.argv[1:]:
+        frame = pd.read_csv(csv_path)
+        print(f"Saved {save_dataset(frame, csv_path)}: {frame.shape}")
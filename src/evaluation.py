@@ -1,18 +1,119 @@
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+
+
+def _prediction_matrix(y_pred, names=None):
+    """(n, m) float64 prediction matrix and its column names from an array, DataFrame or dict."""
+    if isinstance(y_pred, dict):
+        names = list(y_pred) if names is None else names
+        y_pred = np.column_stack([np.asarray(v, dtype=np.float64) for v in y_pred.values()])
+    elif isinstance(y_pred, pd.DataFrame):
+        names = list(y_pred.columns) if names is None else names
+        y_pred = y_pred.to_numpy(dtype=np.float64)
+    P = np.asarray(y_pred, dtype=np.float64)
+    if P.ndim == 1:
+        P = P[:, None]
+    if names is None:
+        names = ['Model'] if P.shape[1] == 1 else [f'Model {j}' for j in range(P.shape[1])]
+    return P, list(names)
+
+
+class PanelScorer:
+    """
+    RMSE, MAE, R², per-entity MAPE and median MAPE of many predictions in one NumPy pass.
+
+    Everything that depends only on the actuals (entity codes, the entity indicator matrix,
+    |y| with zeros masked, the total sum of squares) is computed once; score() then needs
+    one residual matrix for all prediction columns. Per-entity MAPE sums come from one
+    sparse (entities x rows) product, the same reduction as bincount for every column at
+    once. Results match sklearn's metrics and the notebooks'
+    groupby('Entity')['APE'].mean().median() (zero actuals and NaN predictions skipped).
+
+    Example:
+        scorer = PanelScorer(y_test, test_df['Entity'])
+        scorer.score({'Ridge': lr_preds, 'Hybrid': hybrid_preds})
+    """
+    def __init__(self, y_true, entities=None):
+        self.y_true = np.asarray(y_true, dtype=np.float64)
+        n = len(self.y_true)
+        if entities is None:
+            codes, self.entities_ = np.zeros(n, dtype=np.intp), np.array(['All'], dtype=object)
+        else:
+            codes, self.entities_ = pd.factorize(np.asarray(entities), sort=True)
+        self.codes_ = codes
+        self._indicator = sp.csr_matrix((np.ones(n), (codes, np.arange(n))), shape=(len(self.entities_), n))
+
+        abs_y = np.abs(self.y_true)
+        self._abs_y = np.where(abs_y == 0, np.nan, abs_y)
+        self._ss_tot = float(((self.y_true - self.y_true.mean()) ** 2).sum())
+
+    def entity_mape(self, y_pred, names=None):
+        """Mean APE per entity (rows) and prediction column (columns)."""
+        P, names = _prediction_matrix(y_pred, names)
+        ape = np.abs(self.y_true[:, None] - P) / self._abs_y[:, None] * 100
+        return pd.DataFrame(self._entity_mape(ape), index=pd.Index(self.entities_, name='Entity'), columns=names)
+
+    def _entity_mape(self, ape):
+        valid = np.isfinite(ape)
+        sums = self._indicator @ np.where(valid, ape, 0.0)
+        counts = self._indicator @ valid.astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+    def score(self, y_pred, names=None):
+        """
+        Scores every prediction column.
+
+        Args:
+            y_pred: (n,) or (n, m) array, DataFrame or {name: predictions}.
+
+        Returns:
+            pd.DataFrame: One row per prediction column with RMSE, MAE, R2 and Median MAPE.
+        """
+        P, names = _prediction_matrix(y_pred, names)
+        residuals = self.y_true[:, None] - P
+        sq_sum = (residuals ** 2).sum(axis=0)
+        n = len(self.y_true)
+
+        if self._ss_tot > 0:
+            r2 = 1 - sq_sum / self._ss_tot
+        else:  # constant actuals: sklearn's force_finite convention
+            r2 = np.where(sq_sum == 0, 1.0, 0.0)
+        entity_mape = self._entity_mape(np.abs(residuals) / self._abs_y[:, None] * 100)
+        median_mape = np.full(P.shape[1], np.nan)
+        scored = ~np.isnan(entity_mape).all(axis=0)  # columns with at least one entity MAPE
+        median_mape[scored] = np.nanmedian(entity_mape[:, scored], axis=0)
+
+        return pd.DataFrame({
+            'RMSE': np.sqrt(sq_sum / n),
+            'MAE': np.abs(residuals).sum(axis=0) / n,
+            'R2': r2,
+            'Median MAPE': median_mape,
+        }, index=pd.Index(names, name='Model'))
+
+
+def panel_metrics(y_true, y_pred, entities=None, names=None):
+    """One-call version of PanelScorer(y_true, entities).score(y_pred, names)."""
+    return PanelScorer(y_true, entities).score(y_pred, names)
+
+
+def calculate_metrics(y_true, y_pred, entities):
+    """Calculate R2 and Median MAPE (per-entity mean APE, median across entities)."""
+    row = panel_metrics(y_true, y_pred, entities).iloc[0]
+    return row['R2'], row['Median MAPE']
+
 
 def evaluate_model(y_true, y_pred, model_name="Model"):
     """Calculates RMSE, MAE, R2 for a model."""
-    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-    mae = mean_absolute_error(y_true, y_pred)
-    r2 = r2_score(y_true, y_pred)
-    
+    row = panel_metrics(y_true, y_pred, names=[model_name]).iloc[0]
+    rmse, mae, r2 = row['RMSE'], row['MAE'], row['R2']
+
     print(f"--- {model_name} Performance ---")
     print(f"RMSE: {rmse:.4f}")
     print(f"MAE:  {mae:.4f}")
     print(f"R2:   {r2:.4f}")
-    
+
     return {"Model": model_name, "RMSE": rmse, "MAE": mae, "R2": r2}
 
 def compare_models(results_list):
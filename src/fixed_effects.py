@@ -0,0 +1,172 @@
+"""
+Entity fixed effects without dense dummy matrices.
+
+Two ways to fit the linear model with one effect per Entity:
+- Sparse: the Entity dummies stay a scipy CSR block (design_matrix) and SparseRidge
+  solves Ridge exactly from the (p x p) normal equations, never densifying X.
+- Within: WithinRegressor demeans X and y per entity and fits the slopes only; no dummy
+  columns at all. The slopes are identical to a regression on the dummies whose entity
+  effects are not penalized (e.g. LinearRegression on X + dummies).
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy import linalg
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.linear_model import LinearRegression
+
+from outliers import ENTITY_PREFIX, entity_labels
+
+
+def entity_dummies(entities, drop_first=True, categories=None):
+    """
+    Sparse one-hot block of an Entity array (same columns as pd.get_dummies(prefix='Entity')).
+
+    Returns:
+        tuple: (CSR matrix, column names, categories)
+    """
+    entities = np.asarray(entities, dtype=object)
+    if categories is None:
+        categories = np.array(sorted(set(entities)), dtype=object)
+    codes = pd.Index(categories).get_indexer(entities)
+    first = 1 if drop_first else 0
+    keep = codes >= first  # unseen entities (-1) and the reference one get no column
+    block = sp.csr_matrix(
+        (np.ones(keep.sum()), (np.flatnonzero(keep), codes[keep] - first)),
+        shape=(len(entities), len(categories) - first),
+    )
+    names = [f'{ENTITY_PREFIX}{c}' for c in categories[first:]]
+    return block, names, categories
+
+
+def design_matrix(df, feature_cols):
+    """
+    CSR design matrix of df[feature_cols]; Entity_* indicator columns (dense, bool or
+    pandas sparse from encode_features(sparse=True)) are converted without densifying.
+    """
+    blocks = []
+    for col in feature_cols:
+        series = df[col]
+        if isinstance(series.dtype, pd.SparseDtype) and not series.sparse.fill_value:
+            array = series.array
+            rows = array.sp_index.indices
+            blocks.append(sp.csc_matrix((array.sp_values.astype(np.float64), (rows, np.zeros(len(rows), dtype=np.intp))),
+                                        shape=(len(df), 1)))
+        else:
+            # Zeros (e.g. dense bool indicators) are not stored
+            blocks.append(sp.csc_matrix(series.to_numpy(dtype=np.float64)[:, None]))
+    return sp.hstack(blocks, format='csr')
+
+
+def _dense_moments(X, y, block=65536):
+    """X'X, X'y and column sums in float64, over row blocks (X may be float32)."""
+    p = X.shape[1]
+    gram, xty, x_sum = np.zeros((p, p)), np.zeros(p), np.zeros(p)
+    for start in range(0, len(X), block):
+        part = X[start:start + block].astype(np.float64, copy=False)
+        gram += part.T @ part
+        xty += part.T @ y[start:start + block]
+        x_sum += part.sum(axis=0)
+    return gram, xty, x_sum
+
+
+class SparseRidge(BaseEstimator, RegressorMixin):
+    """
+    Ridge regression for sparse (or dense) X, solved exactly from the normal equations.
+
+    Gives the same coefficients as Ridge(solver='cholesky') on the dense matrix; the
+    intercept is handled by centering the Gram matrix (X'X - n * mean mean'), so X is
+    never centered or densified. sklearn's sparse solvers (sparse_cg, lsqr) are
+    iterative and can stop far from the solution on unscaled targets. Dense float32 X is
+    accumulated in float64 without a float64 copy.
+    """
+    def __init__(self, alpha=1.0, fit_intercept=True):
+        self.alpha = alpha
+        self.fit_intercept = fit_intercept
+
+    def fit(self, X, y):
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+            X = X.to_numpy(dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        n, p = X.shape
+        self.n_features_in_ = p
+
+        if sp.issparse(X):
+            gram = (X.T @ X).toarray()
+            xty = np.asarray(X.T @ y).ravel()
+            x_sum = np.asarray(X.sum(axis=0)).ravel()
+        else:
+            gram, xty, x_sum = _dense_moments(np.asarray(X), y)
+        if self.fit_intercept:
+            x_mean = x_sum / n
+            y_mean = y.mean()
+            gram = gram - n * np.outer(x_mean, x_mean)
+            xty = xty - n * x_mean * y_mean
+        gram[np.diag_indices(p)] += self.alpha
+        try:
+            self.coef_ = linalg.solve(gram, xty, assume_a='pos')
+        except linalg.LinAlgError:  # alpha=0 with collinear columns
+            self.coef_ = linalg.lstsq(gram, xty)[0]
+        self.intercept_ = float(y_mean - x_mean @ self.coef_) if self.fit_intercept else 0.0
+        return self
+
+    def predict(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X.to_numpy(dtype=np.float64)
+        if sp.issparse(X):
+            return np.asarray(X @ self.coef_).ravel() + self.intercept_
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+def _group_means(values, codes, n_groups):
+    """Per-group column means via bincount (values: rows x columns)."""
+    counts = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    sums = np.stack([np.bincount(codes, weights=values[:, j], minlength=n_groups)
+                     for j in range(values.shape[1])], axis=1)
+    return sums / counts[:, None]
+
+
+class WithinRegressor(BaseEstimator, RegressorMixin):
+    """
+    Entity fixed effects by the within transformation (entity demeaning).
+
+    X and y are demeaned per entity and `estimator` is fit on the demeaned features only,
+    so no dummy columns are built. The entity effects are recovered afterwards as
+    mean(y_e) - mean(X_e) @ coef_ and added back in predict; unseen entities get the
+    average effect. Entities are read from `group_col` or from Entity_* indicator columns
+    (which are dropped from the features).
+
+    With LinearRegression (the default) the coefficients equal those of OLS on X plus the
+    entity dummies (Frisch-Waugh-Lovell); with Ridge or SparseRidge they equal a Ridge
+    fit that penalizes the slopes but not the entity effects.
+    """
+    def __init__(self, estimator=None, group_col='Entity'):
+        self.estimator = estimator
+        self.group_col = group_col
+
+    def _features(self, X):
+        return [c for c in X.columns if c != self.group_col and not str(c).startswith(ENTITY_PREFIX)]
+
+    def fit(self, X, y):
+        labels = entity_labels(X, self.group_col)
+        self.feature_names_in_ = np.asarray(self._features(X), dtype=object)
+        values = X[list(self.feature_names_in_)].to_numpy(dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        codes, self.entities_ = pd.factorize(pd.Series(labels), use_na_sentinel=False)
+        means = _group_means(np.column_stack([values, y]), codes, len(self.entities_))
+        demeaned = np.column_stack([values, y]) - means[codes]
+
+        estimator = clone(self.estimator) if self.estimator is not None else LinearRegression()
+        self.estimator_ = estimator.fit(demeaned[:, :-1], demeaned[:, -1])
+        self.coef_ = np.asarray(self.estimator_.coef_).ravel()
+        self.entity_effects_ = means[:, -1] - means[:, :-1] @ self.coef_
+        self.intercept_ = float(np.mean(self.entity_effects_))
+        return self
+
+    def predict(self, X):
+        values = X[list(self.feature_names_in_)].to_numpy(dtype=np.float64)
+        idx = pd.Index(self.entities_).get_indexer(entity_labels(X, self.group_col))
+        effects = np.where(idx >= 0, self.entity_effects_[idx], self.intercept_)
+        return values @ self.coef_ + effects
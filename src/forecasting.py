@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+
+def to_panel_array(df, feature_cols, group_col='Entity', time_col='Year', dtype=np.float64):
+    """
+    Pivots a long (Entity, Year) frame into an (entity x year x feature) array.
+
+    Missing entity-years are left as all-NaN rows and flagged in `present`.
+
+    Returns:
+        tuple: (panel, present, entities, years)
+    """
+    e_codes, entities = pd.factorize(df[group_col], sort=True)
+    y_codes, years = pd.factorize(df[time_col], sort=True)
+    panel = np.full((len(entities), len(years), len(feature_cols)), np.nan, dtype=dtype)
+    panel[e_codes, y_codes] = df[list(feature_cols)].to_numpy(dtype=dtype)
+    present = np.zeros((len(entities), len(years)), dtype=bool)
+    present[e_codes, y_codes] = True
+    return panel, present, np.asarray(entities), np.asarray(years)
+
+
+def panel_to_frame(values, entities, years, name='Pred', group_col='Entity', time_col='Year'):
+    """Flattens an (entity x year) array of forecasts back to a long frame, dropping NaNs."""
+    e_idx, y_idx = np.nonzero(~np.isnan(values))
+    return pd.DataFrame({
+        group_col: entities[e_idx],
+        time_col: years[y_idx],
+        name: values[e_idx, y_idx],
+    })
+
+
+def _predict(model, X):
+    """Predicts with an estimator, a callable, or a (backbone, corrector, ...) tuple whose outputs add up."""
+    if isinstance(model, (list, tuple)):
+        return sum(np.asarray(m.predict(X), dtype=np.float64) for m in model)
+    if hasattr(model, 'predict'):
+        return np.asarray(model.predict(X), dtype=np.float64)
+    return np.asarray(model(X), dtype=np.float64)
+
+
+def recursive_forecast(model, panel, horizon, lag_slot, start=0, present=None, lag_transform=None,
+                       clip_min=0.0, copy=True):
+    """
+    Recursive multi-year forecast over a whole panel (and any number of scenarios) at once.
+
+    Each year, the rows of every entity in every scenario are predicted in one call and the
+    predictions are written straight into the lag slot of the following year(s), replacing
+    the observed lag (as the notebook 08 loop did through a dict/map round trip).
+
+    Args:
+        model: Fitted estimator (Ridge, XGBRegressor, pipeline...), a callable, or a tuple of
+            estimators whose predictions are summed (hybrid: backbone + residual corrector).
+        panel (np.ndarray): (entity x year x feature) array, optionally with leading scenario
+            axes, e.g. (scenario x entity x year x feature). Years must be consecutive.
+        horizon (int): Number of years to forecast.
+        lag_slot (int or dict): Feature index of the target lag1, or {k: index of lag k}.
+        start (int): Index of the first forecast year on the year axis.
+        present (np.ndarray): Boolean (.. x entity x year) mask of existing rows; absent rows are
+            not predicted. Defaults to rows that are not all-NaN.
+        lag_transform (callable): Maps predictions to the lag feature's scale,
+            e.g. lambda p: (p - mean) / std.
+        clip_min (float): Lower bound for predictions (emissions are non-negative); None to disable.
+        copy (bool): Work on a copy so the caller's panel is not modified.
+
+    Returns:
+        np.ndarray: Predictions of shape (..., entity, horizon); NaN for absent rows.
+    """
+    panel = np.array(panel, copy=copy)
+    *lead_shape, n_years, n_features = panel.shape
+    lead_shape = tuple(lead_shape)
+    if start + horizon > n_years:
+        raise ValueError(f"Forecast window {start}+{horizon} exceeds the {n_years} years in the panel")
+
+    lag_slots = lag_slot if isinstance(lag_slot, dict) else {1: lag_slot}
+    if present is None:
+        present = ~np.all(np.isnan(panel), axis=-1)
+    else:
+        present = np.broadcast_to(present, panel.shape[:-1])
+
+    end = start + horizon
+    preds = np.full(lead_shape + (horizon,), np.nan)
+    for h, t in enumerate(range(start, end)):
+        X = panel[..., t, :].reshape(-1, n_features)
+        rows = present[..., t].reshape(-1)
+        pred = np.full(len(rows), np.nan)
+        if rows.any():
+            pred[rows] = _predict(model, X[rows])
+        if clip_min is not None:
+            pred = np.maximum(pred, clip_min)
+        pred = pred.reshape(lead_shape)
+        preds[..., h] = pred
+
+        lag_values = lag_transform(pred) if lag_transform is not None else pred
+        has_pred = ~np.isnan(lag_values)
+        for k, slot in lag_slots.items():
+            if t + k < end:
+                # Basic indexing gives a view: the next year's lag is updated in place
+                np.copyto(panel[..., t + k, slot], lag_values, where=has_pred)
+
+    return preds
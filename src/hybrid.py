@@ -0,0 +1,126 @@
+"""
+Hybrid model: Ridge backbone (trend) + XGBoost on its residuals (non-linear part).
+
+The feature frame is converted once to a float32 array and one XGBoost QuantileDMatrix;
+the backbone, the residual fit and later residual refits all reuse them. Prediction goes
+through `Booster.inplace_predict`, so scoring one country-year builds no DMatrix.
+"""
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.base import BaseEstimator, RegressorMixin
+
+from fixed_effects import SparseRidge
+
+
+def _train_params(xgb_params):
+    """XGBRegressor-style parameters -> (xgb.train params, boosting rounds)."""
+    params = {'objective': 'reg:squarederror', **(xgb_params or {})}
+    rounds = params.pop('n_estimators', 100)
+    if 'random_state' in params:
+        params['seed'] = params.pop('random_state')
+    if 'n_jobs' in params:
+        n_jobs = params.pop('n_jobs')
+        if n_jobs is not None:
+            params['nthread'] = n_jobs
+    return params, rounds
+
+
+class HybridResidualRegressor(BaseEstimator, RegressorMixin):
+    """
+    Ridge + XGBoost-on-residuals estimator: predict(X) = ridge(X) + xgb(X).
+
+    Args:
+        alpha (float): Ridge regularization of the backbone (exact solve, see SparseRidge).
+        xgb_params (dict): XGBRegressor parameters of the residual stage
+            (n_estimators, max_depth, learning_rate, subsample, random_state, n_jobs...).
+
+    Example:
+        hybrid = HybridResidualRegressor(alpha=10.0, xgb_params={'n_estimators': 500}).fit(X_train, y_train)
+        hybrid.refit_residual(max_depth=5)  # backbone and data matrices are reused
+        hybrid.save('models/hybrid.joblib')
+    """
+    def __init__(self, alpha=1.0, xgb_params=None):
+        self.alpha = alpha
+        self.xgb_params = xgb_params
+
+    def _as_matrix(self, X):
+        """Float32 C-contiguous feature array (columns in the training order)."""
+        if isinstance(X, pd.DataFrame):
+            if hasattr(self, 'feature_names_in_') and not X.columns.equals(pd.Index(self.feature_names_in_)):
+                X = X[list(self.feature_names_in_)]
+            X = X.to_numpy(dtype=np.float32)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def fit(self, X, y):
+        """Fits the backbone, then the residual stage, on one shared float32 matrix."""
+        self.fit_backbone(X, y)
+        return self.refit_residual()
+
+    def fit_backbone(self, X, y):
+        """Fits the Ridge backbone only; keeps the training matrix and residuals_."""
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self._X = self._as_matrix(X)
+        self._y = np.asarray(y, dtype=np.float64)
+        self._dmatrix = None
+        self.n_features_in_ = self._X.shape[1]
+        self.backbone_ = SparseRidge(alpha=self.alpha).fit(self._X, self._y)
+        self.residuals_ = self._y - self.backbone_.predict(self._X)
+        self.booster_ = None
+        return self
+
+    def refit_residual(self, X=None, y=None, **xgb_params):
+        """
+        Refits only the XGBoost residual stage, keeping the backbone.
+
+        Without X/y the cached training matrix (and its quantile sketch) is reused;
+        keyword arguments update xgb_params (e.g. the tuned ones).
+        """
+        if xgb_params:
+            self.xgb_params = {**(self.xgb_params or {}), **xgb_params}
+        params, rounds = _train_params(self.xgb_params)
+        max_bin = params.get('max_bin', 256)
+        if X is not None:
+            X = self._as_matrix(X)
+            residuals = np.asarray(y, dtype=np.float64) - self.backbone_.predict(X)
+            dtrain = xgb.QuantileDMatrix(X, label=residuals, max_bin=max_bin)
+        else:
+            if getattr(self, '_X', None) is None:
+                raise ValueError("No cached training data (model was loaded); pass X and y to refit_residual")
+            # The quantile sketch is built for one max_bin; a new max_bin needs a new matrix
+            if getattr(self, '_dmatrix', None) is None or self._dmatrix_max_bin != max_bin:
+                self._dmatrix = xgb.QuantileDMatrix(self._X, label=self.residuals_, max_bin=max_bin)
+                self._dmatrix_max_bin = max_bin
+            dtrain = self._dmatrix
+        self.booster_ = xgb.train(params, dtrain, num_boost_round=rounds)
+        return self
+
+    def predict_components(self, X):
+        """Returns (backbone prediction, residual prediction)."""
+        X = self._as_matrix(X)
+        base = self.backbone_.predict(X)
+        if self.booster_ is None:
+            return base, np.zeros(len(X))
+        return base, self.booster_.inplace_predict(X).astype(np.float64)
+
+    def predict(self, X):
+        base, residual = self.predict_components(X)
+        return base + residual
+
+    def __getstate__(self):
+        # The training data and DMatrix are fit-time caches, not part of the model
+        state = self.__dict__.copy()
+        for key in ('_X', '_y', '_dmatrix', '_dmatrix_max_bin'):
+            state.pop(key, None)
+        return state
+
+    def save(self, path):
+        """Saves backbone, booster and parameters as one joblib artifact."""
+        joblib.dump(self, path)
+        return path
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
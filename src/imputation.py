@@ -0,0 +1,309 @@
+"""
+Exact median imputation, in memory and out-of-core.
+
+- column_medians: medians of all columns at once (one partitioned selection).
+- chunked_medians: exact medians of a dataset read in chunks (histogram + refinement passes).
+- group_medians: per-group medians of all columns from one sort and group offsets
+  (sort_by_group).
+- MedianImputer: drop-in for SimpleImputer(strategy='median'), with optional per-Entity or
+  per-Year-group medians.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+_SIGN = np.uint64(1 << 63)
+
+
+def _middle_ranks(counts):
+    """Ranks of the lower and upper middle value for columns with `counts` values."""
+    return (counts - 1) // 2, counts // 2
+
+
+def column_medians(X):
+    """
+    Exact NaN-ignoring median of every column of a 2D array (NaN for empty columns).
+
+    All middle ranks are selected by a single np.partition call (NaNs are placed last),
+    instead of one median per column. Matches DataFrame.median().
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    counts = (~np.isnan(X)).sum(axis=0)
+    medians = np.full(X.shape[1], np.nan)
+    has = counts > 0
+    if not has.any():
+        return medians
+    lo, hi = _middle_ranks(counts[has])
+    part = np.partition(X[:, has], np.unique(np.concatenate([lo, hi])), axis=0)
+    cols = np.arange(part.shape[1])
+    medians[has] = (part[lo, cols] + part[hi, cols]) / 2
+    return medians
+
+
+def sort_by_group(X, codes, n_groups=None):
+    """
+    Sorts the values of every column within groups, for all columns at once.
+
+    Rows are sorted by value (NaNs last), then stably by group, so each group is a
+    contiguous, value-sorted block of every column.
+
+    Args:
+        X (np.ndarray): (rows x columns) values.
+        codes (np.ndarray): Group code (0..n_groups-1) of every row.
+
+    Returns:
+        tuple: (sorted_values, starts, counts); the non-missing values of group g in column
+        j are sorted_values[starts[g]:starts[g] + counts[g, j], j].
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    codes = np.asarray(codes, dtype=np.intp)
+    n_groups = int(codes.max()) + 1 if n_groups is None else n_groups
+    by_value = np.argsort(X, axis=0, kind='stable')
+    by_group = np.argsort(codes[by_value], axis=0, kind='stable')
+    sorted_values = np.take_along_axis(X, np.take_along_axis(by_value, by_group, axis=0), axis=0)
+
+    sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    valid = np.vstack([np.zeros((1, X.shape[1]), dtype=np.intp), np.cumsum(~np.isnan(sorted_values), axis=0)])
+    counts = valid[starts + sizes] - valid[starts]
+    return sorted_values, starts, counts
+
+
+def group_medians(X, codes, n_groups=None):
+    """
+    Exact NaN-ignoring median of every column within every group (see sort_by_group).
+
+    Returns:
+        np.ndarray: (n_groups x columns) medians, NaN where a group has no value.
+    """
+    sorted_values, starts, counts = sort_by_group(X, codes, n_groups)
+    lo, hi = _middle_ranks(counts)
+    empty = counts == 0
+    cols = np.arange(sorted_values.shape[1])
+    lo_idx = np.where(empty, 0, starts[:, None] + lo)
+    hi_idx = np.where(empty, 0, starts[:, None] + hi)
+    medians = (sorted_values[lo_idx, cols] + sorted_values[hi_idx, cols]) / 2
+    medians[empty] = np.nan
+    return medians
+
+
+def _sortable_keys(values):
+    """Maps float64 values (no NaNs) to uint64 keys in the same order."""
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    return np.where(bits & _SIGN, ~bits, bits | _SIGN)
+
+
+def _key_value(key):
+    """Inverse of _sortable_keys for one key."""
+    key = np.uint64(key)
+    bits = key ^ _SIGN if key & _SIGN else ~key
+    return float(np.array([bits], dtype=np.uint64).view(np.float64)[0])
+
+
+def _chunk_keys(chunk, columns, wanted):
+    """Sortable keys of the non-missing values of the wanted column indices of a chunk."""
+    keys = {}
+    for j in wanted:
+        values = chunk[columns[j]].to_numpy(dtype=np.float64)
+        keys[j] = _sortable_keys(values[~np.isnan(values)])
+    return keys
+
+
+def chunked_medians(make_chunks, columns=None, bucket_bits=16, max_buffer=1 << 20):
+    """
+    Exact medians of the columns of a dataset read in chunks, in bounded memory.
+
+    Values are mapped to order-preserving 64-bit keys. Pass 1 counts every column into
+    2**bucket_bits buckets (top bits of the key); the buckets holding the middle ranks are
+    then refined on the next bits until they hold at most `max_buffer` values, which are
+    gathered and selected exactly. Usually two passes in total.
+
+    Args:
+        make_chunks (callable): Returns a new iterator of DataFrame chunks on every call,
+            e.g. lambda: pd.read_csv(path, chunksize=100_000).
+        columns (list): Columns to use (default: numeric columns of the first chunk).
+
+    Returns:
+        dict: {column: median}, NaN for columns without values.
+    """
+    n_buckets = 1 << bucket_bits
+    top = np.uint64(64 - bucket_bits)
+
+    # Pass 1: one histogram over all columns (column offset + top bits of the key)
+    hist = None
+    for chunk in make_chunks():
+        if columns is None:
+            columns = list(chunk.select_dtypes(include=[np.number]).columns)
+        if hist is None:
+            hist = np.zeros(len(columns) * n_buckets, dtype=np.int64)
+        X = chunk[columns].to_numpy(dtype=np.float64)
+        rows, cols = np.nonzero(~np.isnan(X))
+        buckets = (_sortable_keys(X[rows, cols]) >> top).astype(np.intp)
+        hist += np.bincount(cols * n_buckets + buckets, minlength=len(hist))
+    if columns is None:
+        return {}
+    hist = hist.reshape(len(columns), n_buckets)
+    counts = hist.sum(axis=1)
+
+    # A target is one middle rank of one column, narrowed to a key prefix of `shift` free bits
+    pending = {}
+    for j, n in enumerate(counts):
+        for rank in set(_middle_ranks(n)) if n else ():
+            cum = np.cumsum(hist[j])
+            b = int(np.searchsorted(cum, rank, side='right'))
+            below = int(cum[b - 1]) if b else 0
+            pending[(j, rank)] = (64 - bucket_bits, b, rank - below, int(hist[j, b]))
+
+    found = {}
+    while pending:
+        refine, gather = {}, {}
+        for (j, rank), (shift, prefix, rank_in, count) in list(pending.items()):
+            if shift == 0:  # the prefix is the full key
+                found[(j, rank)] = _key_value(prefix)
+                del pending[(j, rank)]
+            elif count <= max_buffer:
+                gather[(j, shift, prefix)] = []
+            else:
+                refine[(j, shift, prefix)] = np.zeros(1 << min(bucket_bits, shift), dtype=np.int64)
+        if not pending:
+            break
+
+        for chunk in make_chunks():
+            keys = _chunk_keys(chunk, columns, {j for j, _, _ in list(refine) + list(gather)})
+            for (j, shift, prefix), parts in gather.items():
+                k = keys[j]
+                parts.append(k[(k >> np.uint64(shift)) == np.uint64(prefix)])
+            for (j, shift, prefix), sub in refine.items():
+                k = keys[j]
+                k = k[(k >> np.uint64(shift)) == np.uint64(prefix)]
+                bits = min(bucket_bits, shift)
+                sub += np.bincount(((k >> np.uint64(shift - bits)) & np.uint64(len(sub) - 1)).astype(np.intp),
+                                   minlength=len(sub))
+
+        for (j, rank), (shift, prefix, rank_in, count) in list(pending.items()):
+            if (j, shift, prefix) in gather:
+                k = np.concatenate(gather[(j, shift, prefix)])
+                found[(j, rank)] = _key_value(np.partition(k, rank_in)[rank_in])
+                del pending[(j, rank)]
+            else:
+                sub = refine[(j, shift, prefix)]
+                bits = min(bucket_bits, shift)
+                cum = np.cumsum(sub)
+                b = int(np.searchsorted(cum, rank_in, side='right'))
+                below = int(cum[b - 1]) if b else 0
+                pending[(j, rank)] = (shift - bits, (prefix << bits) | b, rank_in - below, int(sub[b]))
+
+    medians = {}
+    for j, col in enumerate(columns):
+        if counts[j]:
+            lo, hi = _middle_ranks(counts[j])
+            medians[col] = (found[(j, lo)] + found[(j, hi)]) / 2
+        else:
+            medians[col] = np.nan
+    return medians
+
+
+class MedianImputer(BaseEstimator, TransformerMixin):
+    """
+    Exact median imputation; drop-in replacement for SimpleImputer(strategy='median').
+
+    With group_cols (e.g. 'Entity', or 'Year' with year_bin=5 for five-year groups), a
+    missing value is filled with the median of its group, falling back to the column
+    median when the group has no value or was not seen in fit. The group columns must be
+    in X (a DataFrame) and are not part of the output.
+
+    Like SimpleImputer, columns without any value in fit are dropped from the output
+    (or filled with 0 when keep_empty_features=True).
+    """
+    def __init__(self, group_cols=None, year_bin=None, time_col='Year', keep_empty_features=False):
+        self.group_cols = group_cols
+        self.year_bin = year_bin
+        self.time_col = time_col
+        self.keep_empty_features = keep_empty_features
+
+    def _group_list(self):
+        if self.group_cols is None:
+            return []
+        return [self.group_cols] if isinstance(self.group_cols, str) else list(self.group_cols)
+
+    def _split(self, X):
+        """Values to impute and the group keys (MultiIndex) of every row."""
+        groups = self._group_list()
+        if not groups:
+            values = X.to_numpy(dtype=np.float64) if isinstance(X, pd.DataFrame) else np.asarray(X, dtype=np.float64)
+            return values, None
+        if not isinstance(X, pd.DataFrame):
+            raise ValueError("MedianImputer with group_cols needs a DataFrame input")
+        keys = X[groups]
+        if self.year_bin and self.time_col in groups:
+            keys = keys.assign(**{self.time_col: keys[self.time_col] // self.year_bin * self.year_bin})
+        values = X.drop(columns=groups).to_numpy(dtype=np.float64)
+        return values, pd.MultiIndex.from_frame(keys)
+
+    def fit(self, X, y=None):
+        groups = self._group_list()
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+            self.value_names_ = np.asarray([c for c in X.columns if c not in groups], dtype=object)
+        values, keys = self._split(X)
+        self.n_features_in_ = X.shape[1]
+
+        self.statistics_ = column_medians(values)
+        self.empty_ = np.isnan(self.statistics_)
+        if keys is not None:
+            codes, self.groups_ = keys.factorize()
+            group_stats = group_medians(values, codes, len(self.groups_))
+            self.group_statistics_ = np.where(np.isnan(group_stats), self.statistics_, group_stats)
+        return self
+
+    def _fill(self, values, keys):
+        missing = np.isnan(values)
+        if keys is None:
+            return np.where(missing, self.statistics_, values)
+        idx = self.groups_.get_indexer(keys)
+        fill = np.where((idx >= 0)[:, None], self.group_statistics_[idx], self.statistics_)
+        return np.where(missing, fill, values)
+
+    def transform(self, X):
+        values, keys = self._split(X)
+        out = self._fill(values, keys)
+        if self.keep_empty_features:
+            out[:, self.empty_] = 0.0
+            return out
+        return out[:, ~self.empty_]
+
+    def get_feature_names_out(self, input_features=None):
+        if hasattr(self, 'value_names_'):
+            names = self.value_names_
+        elif input_features is not None:
+            names = np.asarray(input_features, dtype=object)
+        else:
+            names = np.asarray([f'x{i}' for i in range(len(self.statistics_))], dtype=object)
+        return names if self.keep_empty_features else names[~self.empty_]
+
+
+def impute_medians(df, columns, group_cols=None, year_bin=None):
+    """
+    Fills the missing values of `columns` with their (group) medians in one assignment.
+
+    Returns:
+        tuple: (DataFrame copy, {column: global median} for the columns that had NaNs).
+    """
+    groups = MedianImputer(group_cols)._group_list()
+    columns = [c for c in columns if c not in groups]
+    imputer = MedianImputer(group_cols, year_bin=year_bin, keep_empty_features=True)
+    frame = df[groups + columns]
+    imputer.fit(frame)
+    values, keys = imputer._split(frame)
+    filled = imputer._fill(values, keys)
+
+    has_nan = np.isnan(values).any(axis=0)
+    nan_cols = [c for c, flag in zip(columns, has_nan) if flag]
+    df = df.copy()
+    if nan_cols:
+        df[nan_cols] = filled[:, has_nan]
+    return df, {c: m for c, m, flag in zip(columns, imputer.statistics_, has_nan) if flag}
@@ -0,0 +1,323 @@
+"""
+Incremental yearly updates: append a new year of raw data without reprocessing the history.
+
+PanelUpdater runs the common preprocessing (median imputation, then lag features, then
+dropping rows without a target lag; the same steps that produce common_preprocessed.csv).
+It also keeps what is needed to process later rows alone:
+- a mergeable QuantileSketch per numeric column, whose medians impute the new rows;
+- a StandardScaler updated with partial_fit (running means and variances);
+- the last rows of every entity (tails), so the new rows' lags need no history;
+- the medians, means and scales of the last full run, for drift checks.
+
+When the updated statistics drift more than `drift_threshold` reference standard deviations
+from those of the last full run, `needs_refresh` is set: the history was imputed with stale
+medians and the frozen model preprocessing is off, so everything should be rebuilt.
+
+The models update from the new rows alone:
+- IncrementalRidge keeps Ridge's sufficient statistics (X'X, X'y, sums);
+- add_boosting_rounds continues an XGBoost model (XGBRegressor or the residual stage of
+  HybridResidualRegressor) with extra rounds fit on the new rows.
+
+Usage (from the repository root):
+    python src/incremental.py init data/raw/global-data-on-sustainable-energy.csv
+    python src/incremental.py update data/raw/new_year.csv --raw data/raw/global-data-on-sustainable-energy.csv
+"""
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import xgboost as xgb
+from scipy import linalg
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.preprocessing import StandardScaler
+
+from data_store import save_dataset, store_path
+from fixed_effects import _dense_moments
+from hybrid import HybridResidualRegressor, _train_params
+from imputation import column_medians
+from ingest import RAW_DTYPES, QuantileSketch
+from panel_features import build_panel_features, panel_feature_names
+
+TARGET = 'Value_co2_emissions_kt_by_country'
+LAG_COLS = [TARGET, 'gdp_per_capita', 'Primary energy consumption per capita (kWh/person)']
+PROCESSED_PATH = 'data/processed/common_preprocessed.csv'
+STATE_PATH = 'data/processed/common_update_state.joblib'
+
+
+def read_raw(path):
+    """Raw sustainable-energy CSV, typed and with comma-formatted numbers parsed."""
+    return pd.read_csv(path, dtype=RAW_DTYPES, thousands=',')
+
+
+class PanelUpdater:
+    """
+    Args:
+        lag_cols (list): Columns to lag (default: target, GDP and energy per capita).
+        lags (tuple): Lags built for every lag column.
+        required_col (str): Rows where this is NaN are dropped (default: first lag of the
+            first lag column; the first year of every entity).
+        drift_threshold (float): Drift (in reference standard deviations) that triggers a
+            full refresh.
+        k (int): Sketch size; medians are exact up to k values per column.
+    """
+    def __init__(self, lag_cols=None, lags=(1,), required_col=None, drift_threshold=0.1, group_col='Entity',
+                 time_col='Year', k=4096):
+        self.lag_cols = list(LAG_COLS if lag_cols is None else lag_cols)
+        self.lags = tuple(lags)
+        self.required_col = required_col or panel_feature_names(self.lag_cols[:1], self.lags[:1])[0]
+        self.drift_threshold = drift_threshold
+        self.group_col = group_col
+        self.time_col = time_col
+        self.k = k
+
+    def _lagged(self, df, history=None):
+        """df with the lag columns added, from df alone or after the stored `history` rows."""
+        keys = [self.group_col, self.time_col]
+        source = df[keys + self.lag_cols]
+        if history is not None:
+            source = pd.concat([history, source], ignore_index=True)
+        block, names, order = build_panel_features(source, self.lag_cols, lags=self.lags, group_col=self.group_col,
+                                                   time_col=self.time_col, dtype=np.float64)
+        lagged = np.empty_like(block)
+        lagged[order] = block  # back to source row order
+        lagged = lagged[len(source) - len(df):]
+        out = pd.concat([df.drop(columns=names, errors='ignore'),
+                         pd.DataFrame(lagged, index=df.index, columns=names)], axis=1)
+        return out[out[self.required_col].notna()]
+
+    def _keep_tails(self, rows):
+        depth = max(self.lags)
+        rows = rows.sort_values([self.group_col, self.time_col], kind='stable')
+        self.tails_ = rows.groupby(self.group_col, sort=False).tail(depth).reset_index(drop=True)
+
+    def fit(self, raw):
+        """
+        Full run over the whole history; saves the statistics and tails.
+
+        Returns:
+            pd.DataFrame: The processed panel (index: raw row number, a stable row ID).
+        """
+        self.columns_ = [c for c in raw.select_dtypes(include=[np.number]).columns if c != self.time_col]
+        values = raw[self.columns_].to_numpy(dtype=np.float64)
+        self.sketches_ = {c: QuantileSketch(self.k).update(values[:, j]) for j, c in enumerate(self.columns_)}
+        self.medians_ = pd.Series(column_medians(values), index=self.columns_)
+        df = self._lagged(raw.fillna(self.medians_))
+
+        self.features_ = [c for c in df.select_dtypes(include=[np.number]).columns if c != self.time_col]
+        self.scaler_ = StandardScaler().fit(df[self.features_].to_numpy(dtype=np.float64))
+        self.reference_ = {'medians': self.medians_.copy(), 'mean': self.scaler_.mean_.copy(),
+                           'scale': self.scaler_.scale_.copy()}
+        self._keep_tails(raw.fillna(self.medians_)[[self.group_col, self.time_col] + self.lag_cols])
+        self.last_year_ = raw[self.time_col].max()
+        self.next_row_id_ = len(raw)
+        self.drift_ = 0.0
+        return df
+
+    def append(self, raw_new):
+        """
+        Processes only the new rows (years after the last one seen) and updates the statistics.
+
+        Returns:
+            pd.DataFrame: The processed new rows, indexed by new row IDs.
+        """
+        new = raw_new[raw_new[self.time_col] > self.last_year_]
+        if len(new) < len(raw_new):
+            print(f"Skipped {len(raw_new) - len(new)} rows from years already processed (<= {self.last_year_:g})")
+        if new.empty:
+            names = panel_feature_names(self.lag_cols, lags=self.lags)
+            return new.drop(columns=names, errors='ignore').reindex(columns=list(new.columns) + names)
+        new = new.set_axis(pd.RangeIndex(self.next_row_id_, self.next_row_id_ + len(new)))
+
+        values = new[self.columns_].to_numpy(dtype=np.float64)
+        for j, col in enumerate(self.columns_):
+            self.sketches_[col].update(values[:, j])
+        self.medians_ = pd.Series([self.sketches_[c].quantile(0.5) for c in self.columns_], index=self.columns_)
+        new = new.fillna(self.medians_)
+        df = self._lagged(new, history=self.tails_)
+
+        if len(df):
+            self.scaler_.partial_fit(df[self.features_].to_numpy(dtype=np.float64))
+        self._keep_tails(pd.concat([self.tails_, new[[self.group_col, self.time_col] + self.lag_cols]],
+                                   ignore_index=True))
+        self.last_year_ = new[self.time_col].max()
+        self.next_row_id_ += len(new)
+        self.drift_ = float(self.drift().max())
+        return df
+
+    def drift(self):
+        """
+        Drift of every column since the last full run: the larger shift of its median or
+        mean, in reference standard deviations.
+        """
+        ref = self.reference_
+        scale = pd.Series(ref['scale'], index=self.features_)
+        median_shift = (self.medians_ - ref['medians']).abs() / scale.reindex(self.columns_)
+        mean_shift = pd.Series(np.abs(self.scaler_.mean_ - ref['mean']), index=self.features_) / scale
+        return pd.concat([median_shift, mean_shift], axis=1).max(axis=1).fillna(0.0).sort_values(ascending=False)
+
+    @property
+    def needs_refresh(self):
+        return self.drift_ > self.drift_threshold
+
+    def save(self, path):
+        joblib.dump(self, path)
+        return path
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+
+class IncrementalRidge(BaseEstimator, RegressorMixin):
+    """
+    Ridge regression updated from its sufficient statistics.
+
+    partial_fit adds a batch's X'X, X'y and column sums (of X shifted by the first batch's
+    means, so the sums do not cancel for large-valued features) and re-solves the normal
+    equations, a (p x p) system. After any sequence of batches the coefficients equal
+    Ridge(solver='cholesky') / SparseRidge fit on all rows at once.
+    """
+    def __init__(self, alpha=1.0, fit_intercept=True):
+        self.alpha = alpha
+        self.fit_intercept = fit_intercept
+
+    def fit(self, X, y):
+        for attr in ('n_samples_seen_', 'gram_'):
+            self.__dict__.pop(attr, None)
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y):
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+            X = X.to_numpy(dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if getattr(self, 'gram_', None) is None:
+            p = X.shape[1]
+            self.n_features_in_ = p
+            self.n_samples_seen_ = 0
+            self.gram_, self.xty_, self.x_sum_, self.y_sum_ = np.zeros((p, p)), np.zeros(p), np.zeros(p), 0.0
+            # Sparse X is accumulated unshifted (shifting would densify it)
+            self.x_shift_ = np.zeros(p) if sp.issparse(X) else np.asarray(X, dtype=np.float64).mean(axis=0)
+            self.y_shift_ = float(y.mean())
+        y = y - self.y_shift_
+        if sp.issparse(X):
+            gram, xty, x_sum = (X.T @ X).toarray(), np.asarray(X.T @ y).ravel(), np.asarray(X.sum(axis=0)).ravel()
+        else:
+            gram, xty, x_sum = _dense_moments(np.asarray(X, dtype=np.float64) - self.x_shift_, y)
+        self.gram_ += gram
+        self.xty_ += xty
+        self.x_sum_ += x_sum
+        self.y_sum_ += y.sum()
+        self.n_samples_seen_ += len(y)
+        return self._solve()
+
+    def _solve(self):
+        n = self.n_samples_seen_
+        G, b = self.gram_.copy(), self.xty_.copy()
+        x_mean, y_mean = self.x_sum_ / n, self.y_sum_ / n
+        if self.fit_intercept:
+            G -= n * np.outer(x_mean, x_mean)
+            b -= n * x_mean * y_mean
+        else:  # moments of the unshifted X and y
+            G += np.outer(self.x_shift_, self.x_sum_) + np.outer(self.x_sum_, self.x_shift_) \
+                + n * np.outer(self.x_shift_, self.x_shift_)
+            b += self.x_shift_ * self.y_sum_ + self.y_shift_ * self.x_sum_ + n * self.x_shift_ * self.y_shift_
+        G[np.diag_indices_from(G)] += self.alpha
+        try:
+            self.coef_ = linalg.solve(G, b, assume_a='pos')
+        except linalg.LinAlgError:  # alpha=0 with collinear columns
+            self.coef_ = linalg.lstsq(G, b)[0]
+        if self.fit_intercept:
+            self.intercept_ = float(self.y_shift_ + y_mean - (self.x_shift_ + x_mean) @ self.coef_)
+        else:
+            self.intercept_ = 0.0
+        return self
+
+    def predict(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X.to_numpy(dtype=np.float64)
+        if sp.issparse(X):
+            return np.asarray(X @ self.coef_).ravel() + self.intercept_
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+def add_boosting_rounds(model, X, y, n_rounds=50):
+    """
+    Continues a fitted XGBoost model with `n_rounds` trees fit on new rows; the existing trees
+    are kept, so the new trees fit the old model's errors on the new data.
+
+    Args:
+        model: Fitted XGBRegressor, or HybridResidualRegressor (its residual stage is
+            continued on the residuals of the unchanged backbone).
+
+    Returns:
+        The updated model (a new XGBRegressor, or the hybrid updated in place).
+    """
+    if isinstance(model, HybridResidualRegressor):
+        params, _ = _train_params(model.xgb_params)
+        X = model._as_matrix(X)
+        residuals = np.asarray(y, dtype=np.float64) - model.backbone_.predict(X)
+        dtrain = xgb.DMatrix(X, label=residuals)
+        model.booster_ = xgb.train(params, dtrain, num_boost_round=n_rounds, xgb_model=model.booster_)
+        return model
+    previous = model.get_booster()
+    updated = clone(model).set_params(n_estimators=n_rounds)
+    return updated.fit(X, y, xgb_model=previous)
+
+
+def _write_processed(df, path):
+    df.to_csv(path, index=False)
+    save_dataset(df, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incremental yearly update of the common preprocessed panel.')
+    parser.add_argument('--processed', default=PROCESSED_PATH)
+    parser.add_argument('--state', default=STATE_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('init', help='full run; saves the update state')
+    p.add_argument('raw')
+    p.add_argument('--drift-threshold', type=float, default=0.1)
+    p = sub.add_parser('update', help='append the years after the last processed one')
+    p.add_argument('new_raw')
+    p.add_argument('--raw', help='raw history, merged with new_raw for a full refresh when the statistics drift')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == 'init':
+        updater = PanelUpdater(drift_threshold=args.drift_threshold)
+        df = updater.fit(read_raw(args.raw))
+        _write_processed(df, args.processed)
+        print(f"Processed {len(df)} rows up to {updater.last_year_:g} into {args.processed}")
+    else:
+        updater = PanelUpdater.load(args.state)
+        new_rows = updater.append(read_raw(args.new_raw))
+        print(f"Drift since last full run: {updater.drift_:.3f} (threshold {updater.drift_threshold})")
+        if updater.needs_refresh:
+            if not args.raw:
+                raise SystemExit("Statistics drifted past the threshold: rerun with --raw for a full refresh")
+            print("Drift above threshold: full refresh")
+            updater = PanelUpdater(updater.lag_cols, updater.lags, updater.required_col, updater.drift_threshold)
+            # The new year is part of the refresh; rows in both files take the new file's values,
+            # and (Entity, Year) order gives the row IDs a full run on the merged file would
+            raw = pd.concat([read_raw(args.raw), read_raw(args.new_raw)], ignore_index=True)
+            raw = raw.drop_duplicates(['Entity', 'Year'], keep='last').sort_values(['Entity', 'Year'], ignore_index=True)
+            df = updater.fit(raw)
+            _write_processed(df, args.processed)
+            print(f"Reprocessed {len(df)} rows up to {updater.last_year_:g} into {args.processed}")
+        else:
+            columns = list(pd.read_csv(args.processed, nrows=0).columns)
+            new_rows[columns].to_csv(args.processed, mode='a', header=False, index=False)
+            if os.path.isdir(store_path(args.processed)):
+                save_dataset(pd.read_csv(args.processed), args.processed)
+            print(f"Appended {len(new_rows)} rows up to {updater.last_year_:g} to {args.processed}")
+    updater.save(args.state)
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Streaming ingestion for the raw sustainable-energy CSV (and larger files with its schema).
+
+The file is read in fixed-size chunks with a declared dtype map; comma-formatted numbers
+(e.g. "1,234" in Density) are parsed by the CSV reader via `thousands=','` instead of
+trial-and-error casting. Median-imputation statistics come from mergeable quantile
+sketches, and the cleaned output is written chunk by chunk, so peak memory depends on
+the chunk size, not the file size.
+
+Usage (from the repository root):
+    python src/ingest.py data/raw/global-data-on-sustainable-energy.csv data/processed/global-data-clean.csv
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from imputation import chunked_medians
+
+TARGET = 'Value_co2_emissions_kt_by_country'
+
+# Declared schema of global-data-on-sustainable-energy.csv
+RAW_DTYPES = {
+    'Entity': 'str',
+    'Year': 'int64',
+    'Access to electricity (% of population)': 'float64',
+    'Access to clean fuels for cooking': 'float64',
+    'Renewable-electricity-generating-capacity-per-capita': 'float64',
+    'Financial flows to developing countries (US $)': 'float64',
+    'Renewable energy share in the total final energy consumption (%)': 'float64',
+    'Electricity from fossil fuels (TWh)': 'float64',
+    'Electricity from nuclear (TWh)': 'float64',
+    'Electricity from renewables (TWh)': 'float64',
+    'Low-carbon electricity (% electricity)': 'float64',
+    'Primary energy consumption per capita (kWh/person)': 'float64',
+    'Energy intensity level of primary energy (MJ/$2017 PPP GDP)': 'float64',
+    TARGET: 'float64',
+    'Renewables (% equivalent primary energy)': 'float64',
+    'gdp_growth': 'float64',
+    'gdp_per_capita': 'float64',
+    r'Density\n(P/Km2)': 'float64',
+    'Land Area(Km2)': 'float64',
+    'Latitude': 'float64',
+    'Longitude': 'float64',
+}
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch (KLL-style compactor hierarchy).
+
+    Level h holds items of weight 2**h. When a level reaches k items it is sorted and every
+    other item (random offset) is promoted to the next level. Memory is O(k log(n/k)) and
+    the rank error is O(log(n/k) / k); with at most k values the result is exact.
+    Sketches built on different chunks or files can be combined with merge().
+    """
+    def __init__(self, k=4096, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Adds an array of values (NaNs are ignored)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+        return self
+
+    def merge(self, other):
+        """Merges another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self._compact()
+        return self
+
+    def _compact(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) >= self.k:
+                items = np.sort(items)
+                if len(items) % 2:  # odd count: keep one item at this level
+                    keep, items = items[-1:], items[:-1]
+                else:
+                    keep = np.empty(0)
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def quantile(self, q):
+        """Approximate q-quantile (exact, with linear interpolation, while uncompacted)."""
+        if self.count == 0:
+            return np.nan
+        if len(self.levels) == 1:
+            return float(np.quantile(self.levels[0], q))
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items)
+        cum = np.cumsum(weights[order])
+        return float(items[order][np.searchsorted(cum, q * cum[-1])])
+
+
+def iter_raw_chunks(path, chunksize=100_000, dtypes=None):
+    """Yields typed chunks of a raw CSV; comma-formatted numbers are parsed on read."""
+    dtypes = RAW_DTYPES if dtypes is None else dtypes
+    yield from pd.read_csv(path, dtype=dtypes, thousands=',', chunksize=chunksize)
+
+
+def compute_median_sketches(path, chunksize=100_000, dtypes=None, k=4096):
+    """First pass: one quantile sketch and a missing count per numeric column."""
+    sketches, missing = {}, {}
+    for chunk in iter_raw_chunks(path, chunksize, dtypes):
+        for col in chunk.select_dtypes(include=[np.number]).columns:
+            values = chunk[col].to_numpy(dtype=np.float64)
+            sketches.setdefault(col, QuantileSketch(k)).update(values)
+            missing[col] = missing.get(col, 0) + int(np.isnan(values).sum())
+    return sketches, missing
+
+
+def stream_clean(input_path, output_path, chunksize=100_000, dtypes=None, k=4096, exact=False):
+    """
+    Cleans and median-imputes a raw CSV in two streaming passes.
+
+    Equivalent to basic_cleaning + handle_missing_values(strategy='median') on the whole
+    file, with medians from QuantileSketch (exact up to k non-missing values per column),
+    or, with exact=True, exact medians from chunked_medians (one extra pass or two).
+
+    Returns:
+        dict: The imputed median per column that had missing values.
+    """
+    sketches, missing = compute_median_sketches(input_path, chunksize, dtypes, k)
+    if exact:
+        columns = [col for col in sketches if missing[col] > 0]
+        medians = chunked_medians(lambda: iter_raw_chunks(input_path, chunksize, dtypes), columns)
+    else:
+        medians = {col: sketch.quantile(0.5) for col, sketch in sketches.items() if missing[col] > 0}
+    print(f"Computed medians for {len(medians)} columns with missing values")
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    rows = 0
+    for i, chunk in enumerate(iter_raw_chunks(input_path, chunksize, dtypes)):
+        chunk = chunk.fillna(medians)
+        chunk.to_csv(output_path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+        rows += len(chunk)
+    print(f"Cleaned data saved to {output_path}: {rows} rows")
+    return medians
+
+
+if __name__ == "__main__":
+    INPUT_PATH = sys.argv[1] if len(sys.argv) > 1 else 'data/raw/global-data-on-sustainable-energy.csv'
+    OUTPUT_PATH = sys.argv[2] if len(sys.argv) > 2 else 'data/processed/global-data-clean.csv'
+    stream_clean(INPUT_PATH, OUTPUT_PATH)
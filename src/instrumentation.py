@@ -0,0 +1,457 @@
+"""
+Tracing of the preprocessing stages, pipeline transformers and models, without editing them.
+
+A Tracer patches, while it is active:
+- the preprocessing stage functions (STAGES: load_data, handle_missing_values,
+  create_lag_features, remove_outliers, remove_high_vif, ...), in their module and in every
+  module that imported them by name;
+- fit / fit_transform / transform / predict / partial_fit of every estimator class used by
+  the create_*_pipeline functions and preprocessing.py (sklearn's included) and of the
+  project's models (MODELS).
+
+Each call becomes a span with its duration (and self time, without nested spans), rows and
+columns in / out, change in resident memory (RSS) and the process's peak RSS. Spans are
+written as JSON lines as they finish and summarized in a table (slowest self time first).
+Opt-in per stage: `memory=True` traces allocations (tracemalloc: bytes allocated and the
+allocation peak of every span), `profile` runs cProfile on the named spans and keeps the
+hotspots (and a .prof file for snakeviz / pstats).
+
+Example:
+    with Tracer('data/cache/trace.jsonl', profile=['remove_high_vif']) as tracer:
+        df = remove_high_vif(handle_missing_values(load_data(path)), TARGET)
+        with tracer.span('hybrid'):  # ad-hoc blocks
+            model.fit(X_train, y_train)
+    tracer.report()
+
+Usage (from the repository root):
+    python src/instrumentation.py trace notebooks/12_Hybrid_Model.py
+    python src/instrumentation.py trace --memory --profile VIFSelector.fit src/workflow.py run --jobs 1
+    python src/instrumentation.py summary data/cache/trace.jsonl
+
+Stage workers forked by the workflow runner append their spans to the same trace file;
+`summary` reads them all back.
+"""
+import argparse
+import contextlib
+import cProfile
+import functools
+import importlib
+import inspect
+import itertools
+import json
+import os
+import pstats
+import runpy
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not on Linux / macOS
+    resource = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preprocessing'))
+
+TRACE_PATH = 'data/cache/trace.jsonl'
+STAGES = (
+    'preprocessing.load_data',
+    'preprocessing.basic_cleaning',
+    'preprocessing.handle_missing_values',
+    'preprocessing.create_lag_features',
+    'preprocessing.encode_features',
+    'preprocessing.remove_outliers',
+    'preprocessing.remove_high_vif',
+    'preprocess.preprocess_data',
+    'forecasting.recursive_forecast',
+)
+# Estimator classes found in these modules (the create_*_pipeline steps and their sklearn parts)
+PIPELINE_MODULES = ('pipelines', 'preprocessing')
+MODELS = (
+    'sklearn.linear_model.Ridge',
+    'sklearn.linear_model.LinearRegression',
+    'sklearn.svm.SVR',
+    'sklearn.compose.TransformedTargetRegressor',
+    'sklearn.cluster.KMeans',
+    'xgboost.XGBRegressor',
+    'fixed_effects.SparseRidge',
+    'fixed_effects.WithinRegressor',
+    'hybrid.HybridResidualRegressor',
+    'kernel_svr.ApproxKernelSVR',
+    'incremental.IncrementalRidge',
+    'cluster_ensemble.ClusterEnsembleRegressor',
+)
+METHODS = ('fit', 'fit_transform', 'transform', 'predict', 'partial_fit')
+_PAGE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _rss():
+    """Current resident memory in bytes (None where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _peak_rss():
+    """Peak resident memory of the process so far, in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _shape(obj):
+    """(rows, columns) of a DataFrame / Series / array / sparse matrix, (None, None) otherwise."""
+    shape = getattr(obj, 'shape', None)
+    if not isinstance(shape, tuple) or not shape:
+        return None, None
+    return int(shape[0]), (int(shape[1]) if len(shape) > 1 else None)
+
+
+def _resolve(dotted):
+    module, _, name = dotted.rpartition('.')
+    return importlib.import_module(module), name
+
+
+def _estimator_classes(modules=PIPELINE_MODULES, models=MODELS):
+    """Estimator classes to trace; modules or models that cannot be imported are skipped."""
+    from sklearn.base import BaseEstimator
+
+    classes = []
+    for name in modules:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        classes += [obj for obj in vars(module).values()
+                    if inspect.isclass(obj) and issubclass(obj, BaseEstimator) and obj is not BaseEstimator]
+    for dotted in models:
+        try:
+            module, name = _resolve(dotted)
+            classes.append(getattr(module, name))
+        except (ImportError, AttributeError):
+            continue
+    return list(dict.fromkeys(classes))
+
+
+class _TracedMethod:
+    """
+    Class attribute standing in for a method (or an sklearn `available_if` descriptor): the
+    original is bound as usual and the bound call is traced.
+    """
+    def __init__(self, tracer, original, name, kind):
+        self.tracer = tracer
+        self.original = original
+        self.name = name
+        self.kind = kind
+
+    def __get__(self, obj, owner=None):
+        bound = self.original.__get__(obj, owner)
+        if obj is None:
+            return bound
+
+        @functools.wraps(bound)
+        def call(*args, **kwargs):
+            return self.tracer.call(self.name, self.kind, bound, args, kwargs)
+        return call
+
+
+class Tracer:
+    """
+    Args:
+        path (str): JSON-lines trace file (rewritten on start); None keeps spans in memory only.
+        profile: cProfile the spans with these names (list), or every outermost span (True).
+        memory (bool): Trace allocations (tracemalloc) for allocated bytes / peak per span.
+            Slows allocation-heavy code down.
+        profile_dir (str): Where the .prof files go (default: 'profiles' next to the trace).
+        stages (tuple): 'module.function' stage functions to trace.
+        classes (list): Estimator classes to trace (default: pipeline steps and MODELS).
+        top (int): Hotspots kept per profiled span.
+    """
+    def __init__(self, path=TRACE_PATH, profile=False, memory=False, profile_dir=None, stages=STAGES,
+                 classes=None, top=5):
+        self.path = path
+        self.profile = profile
+        self.memory = memory
+        self.profile_dir = profile_dir or os.path.join(os.path.dirname(path or TRACE_PATH) or '.', 'profiles')
+        self.stages = stages
+        self.classes = classes
+        self.top = top
+        self.spans = []
+        self._stack = []
+        self._ids = itertools.count(1)
+        self._file = None
+        self._patches = []
+        self._profiling = False
+        self._started_tracemalloc = False
+
+    # --- Spans ---
+
+    @contextlib.contextmanager
+    def span(self, name, kind='block', rows_in=None, cols_in=None):
+        """
+        Times a block as a span; the yielded record can be annotated (e.g. record['rows_out']).
+        """
+        parent = self._stack[-1] if self._stack else None
+        record = {'span_id': next(self._ids), 'parent_id': parent['span_id'] if parent else None,
+                  'pid': os.getpid(), 'name': name, 'kind': kind, 'start': time.time(),
+                  'rows_in': rows_in, 'cols_in': cols_in, 'rows_out': None, 'cols_out': None,
+                  '_children': 0.0}
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent['_peak'] = max(parent['_peak'], peak)  # the parent's peak so far survives the reset
+            tracemalloc.reset_peak()
+            record['_alloc_start'] = record['_peak'] = current
+        profiler = None
+        if self._should_profile(name):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self._profiling = True
+            except ValueError:  # another profiler is active
+                profiler = None
+        rss = _rss()
+        self._stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            self._stack.pop()
+            record['self_seconds'] = record['seconds'] - record.pop('_children')
+            if parent is not None:
+                parent['_children'] += record['seconds']
+            end_rss = _rss()
+            record['rss_delta'] = None if rss is None or end_rss is None else end_rss - rss
+            record['peak_rss'] = _peak_rss()
+            if '_alloc_start' in record:
+                current, peak = tracemalloc.get_traced_memory()
+                span_peak = max(record.pop('_peak'), peak)
+                record['alloc_bytes'] = current - record['_alloc_start']
+                record['alloc_peak'] = span_peak - record.pop('_alloc_start')
+                if parent is not None and '_peak' in parent:
+                    parent['_peak'] = max(parent['_peak'], span_peak)
+            if profiler is not None:
+                self._save_profile(profiler, record)
+            self._emit(record)
+
+    def call(self, name, kind, func, args, kwargs):
+        """Runs func(*args, **kwargs) in a span, with the rows / columns of the first array-like argument and of the result."""
+        rows_in, cols_in = next((s for s in map(_shape, args) if s[0] is not None), (None, None))
+        with self.span(name, kind, rows_in, cols_in) as record:
+            result = func(*args, **kwargs)
+            out = result[0] if isinstance(result, tuple) and result else result
+            record['rows_out'], record['cols_out'] = _shape(out)
+        return result
+
+    def _should_profile(self, name):
+        if not self.profile or self._profiling:
+            return False
+        return self.profile is True or name in self.profile
+
+    def _save_profile(self, profiler, record):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{record['pid']}_{record['span_id']:05d}_{record['name']}.prof")
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler).stats
+        hot = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        record['profile'] = path
+        record['hotspots'] = [f"{func} ({os.path.basename(file)}:{line}) {tt:.4f}s self, {ct:.4f}s cumulative"
+                              for (file, line, func), (_, _, tt, ct, _) in hot]
+
+    def _emit(self, record):
+        self.spans.append(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record, default=str) + '\n')
+
+    # --- Patching ---
+
+    def _wrap_function(self, func, name):
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            return self.call(name, 'stage', func, args, kwargs)
+        return traced
+
+    def instrument(self):
+        """Patches the stage functions and estimator methods (see `restore`)."""
+        if self._patches:
+            return self
+        for dotted in self.stages:
+            try:
+                module, name = _resolve(dotted)
+                func = getattr(module, name)
+            except (ImportError, AttributeError):
+                continue
+            traced = self._wrap_function(func, name)
+            # Also rebind `from module import func` copies (notebooks, stages.py...)
+            for owner in list(sys.modules.values()):
+                if getattr(owner, '__dict__', {}).get(name) is func:
+                    self._patch(owner, name, traced)
+
+        classes = self.classes if self.classes is not None else _estimator_classes()
+        # Originals are collected first, so a subclass wraps its base's method, not its wrapper
+        originals = [(cls, method, inspect.getattr_static(cls, method))
+                     for cls in classes for method in METHODS if hasattr(cls, method)]
+        for cls, method, original in originals:
+            if hasattr(original, '__get__'):
+                self._patch(cls, method, _TracedMethod(self, original, f'{cls.__name__}.{method}', method))
+        return self
+
+    def _patch(self, owner, name, value):
+        self._patches.append((owner, name, owner.__dict__.get(name, _MISSING)))
+        setattr(owner, name, value)
+
+    def restore(self):
+        """Undoes `instrument`."""
+        for owner, name, original in reversed(self._patches):
+            if original is _MISSING:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._patches = []
+
+    def __enter__(self):
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            open(self.path, 'w').close()
+            # Append mode: forked workers write whole lines to the same file
+            self._file = open(self.path, 'a', buffering=1)
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self.instrument()
+
+    def __exit__(self, *exc):
+        self.restore()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return False
+
+    # --- Reports ---
+
+    def summary(self):
+        return summarize(self.spans)
+
+    def report(self, csv_path=None):
+        """Prints the summary table (and the profiled hotspots); optionally saves it as CSV."""
+        return report(self.spans, csv_path)
+
+
+class _Missing:
+    pass
+
+
+_MISSING = _Missing()
+
+
+def read_trace(path=TRACE_PATH):
+    """Spans of a JSON-lines trace file."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(spans):
+    """
+    One row per span name, largest total self time first.
+
+    Returns:
+        pd.DataFrame: Span, Kind, Calls, Seconds, Self seconds, Mean / Max seconds, Max rows
+            in / out, Max RSS delta (MB), Peak RSS (MB), Alloc peak (MB) (with memory=True), Errors.
+    """
+    if not spans:
+        return pd.DataFrame()
+    df = pd.DataFrame(spans)
+    for col in ('rows_in', 'rows_out', 'rss_delta', 'peak_rss', 'alloc_peak', 'error'):
+        if col not in df.columns:
+            df[col] = None
+    df[['rows_in', 'rows_out', 'rss_delta', 'peak_rss', 'alloc_peak']] = (
+        df[['rows_in', 'rows_out', 'rss_delta', 'peak_rss', 'alloc_peak']].apply(pd.to_numeric))
+    grouped = df.groupby('name', sort=False)
+    mb = 2 ** 20
+    table = pd.DataFrame({
+        'Kind': grouped['kind'].first(),
+        'Calls': grouped.size(),
+        'Seconds': grouped['seconds'].sum(),
+        'Self seconds': grouped['self_seconds'].sum(),
+        'Mean seconds': grouped['seconds'].mean(),
+        'Max seconds': grouped['seconds'].max(),
+        'Max rows in': grouped['rows_in'].max(),
+        'Max rows out': grouped['rows_out'].max(),
+        'Max RSS delta (MB)': grouped['rss_delta'].max() / mb,
+        'Peak RSS (MB)': grouped['peak_rss'].max() / mb,
+        'Alloc peak (MB)': grouped['alloc_peak'].max() / mb,
+        'Errors': grouped['error'].count(),
+    })
+    table[['Max rows in', 'Max rows out']] = table[['Max rows in', 'Max rows out']].astype('Int64')
+    table = table.dropna(axis=1, how='all').sort_values('Self seconds', ascending=False)
+    table.index.name = 'Span'
+    return table.reset_index().round(4)
+
+
+def report(spans, csv_path=None):
+    """Prints the summary of `spans` and the hotspots of the profiled ones."""
+    table = summarize(spans)
+    if table.empty:
+        print("No spans recorded.")
+        return table
+    print(table.to_string(index=False))
+    for record in spans:
+        if record.get('hotspots'):
+            print(f"\n{record['name']} ({record['seconds']:.3f}s, {record['profile']}):")
+            for line in record['hotspots']:
+                print(f"  {line}")
+    if csv_path:
+        table.to_csv(csv_path, index=False)
+        print(f"Summary saved to {csv_path}")
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Trace the preprocessing stages, pipelines and models.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('trace', help='run a Python script with tracing on')
+    p.add_argument('--out', default=TRACE_PATH, help='JSON-lines trace file')
+    p.add_argument('--summary', help='also save the summary table as CSV')
+    p.add_argument('--memory', action='store_true', help='tracemalloc allocation tracking')
+    p.add_argument('--profile', help="cProfile these spans (comma-separated names, or 'all')")
+    p.add_argument('script')
+    p.add_argument('args', nargs=argparse.REMAINDER)
+    p = sub.add_parser('summary', help='summarize a trace file')
+    p.add_argument('trace', nargs='?', default=TRACE_PATH)
+    p.add_argument('--summary', help='also save the summary table as CSV')
+    args = parser.parse_args(argv)
+
+    if args.command == 'summary':
+        report(read_trace(args.trace), args.summary)
+        return
+    profile = False
+    if args.profile:
+        profile = True if args.profile == 'all' else args.profile.split(',')
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    try:
+        with Tracer(args.out, profile=profile, memory=args.memory):
+            runpy.run_path(args.script, run_name='__main__')
+    finally:
+        # From the file, not this process's spans: stages may have run in forked workers
+        print(f"\nTrace saved to {args.out}")
+        report(read_trace(args.out), args.summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Exact and kernel-approximated RBF SVR.
+
+The exact SVR solves a dual problem over all training rows (quadratic to cubic in rows).
+The approximate modes map the features to `n_components` explicit RBF features, Nystroem
+(kernel columns of a random subset of rows) or random Fourier features, and fit a linear
+epsilon-insensitive SVR on them, which is linear in rows.
+
+Benchmark: benchmarks/bench_kernel_svr.py
+
+Example:
+    model = create_svr_model(mode='nystroem', n_components=1000)  # drop-in for the notebooks' SVR
+    model.fit(X_train, y_train)
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin, TransformerMixin
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVR, LinearSVR
+
+SVR_MODES = ('exact', 'nystroem', 'rff')
+
+
+class RBFFeatures(BaseEstimator, TransformerMixin):
+    """
+    Explicit approximate RBF kernel features (inner products ~ exp(-gamma ||x - x'||^2)).
+
+    Args:
+        method (str): 'nystroem' (more accurate per component) or 'rff' (random Fourier
+            features; no fit cost, any number of rows).
+        n_components (int): Feature dimension; accuracy grows and speed drops with it.
+        gamma: Kernel width, or 'scale' = 1 / (n_features * X.var()) as in sklearn's SVR.
+    """
+    def __init__(self, method='nystroem', n_components=1000, gamma='scale', random_state=42):
+        self.method = method
+        self.n_components = n_components
+        self.gamma = gamma
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=np.float64)
+        if self.gamma == 'scale':
+            var = X.var()
+            self.gamma_ = 1.0 / (X.shape[1] * var) if var > 0 else 1.0
+        else:
+            self.gamma_ = float(self.gamma)
+        if self.method == 'nystroem':
+            self.mapper_ = Nystroem(kernel='rbf', gamma=self.gamma_, random_state=self.random_state,
+                                    n_components=min(self.n_components, len(X)))
+        elif self.method == 'rff':
+            self.mapper_ = RBFSampler(gamma=self.gamma_, n_components=self.n_components,
+                                      random_state=self.random_state)
+        else:
+            raise ValueError(f"method must be 'nystroem' or 'rff', got {self.method!r}")
+        self.mapper_.fit(X)
+        return self
+
+    def transform(self, X):
+        return self.mapper_.transform(np.asarray(X, dtype=np.float64))
+
+
+class ApproxKernelSVR(BaseEstimator, RegressorMixin):
+    """
+    RBF SVR on approximate kernel features (see RBFFeatures) with a linear epsilon-insensitive
+    SVR on top; fit time is linear in rows.
+
+    Args:
+        method (str): 'nystroem' or 'rff'.
+        n_components (int): Approximate feature dimension (the speed/accuracy knob).
+        C, epsilon, gamma: As in sklearn's SVR; the same objective is solved on the features.
+        solver (str): 'linear_svr' (liblinear dual coordinate descent, one variable per row),
+            'sgd' (averaged SGD, alpha = 1 / (C n)) or 'auto' (linear_svr while there are no
+            more rows than components; sgd above, where the dual needs many slow passes:
+            at 3k rows x 1000 components it took longer than the exact SVR).
+        tol (float): Stopping tolerance of linear_svr.
+        max_iter (int): Maximum SGD epochs. SGD runs about `max_updates` row updates (at
+            least 5 epochs), so small panels get every epoch and large ones a few.
+        batch_size (int): Rows transformed at a time when the feature matrix exceeds
+            ~400 MB and is streamed instead of materialized.
+    """
+    def __init__(self, method='nystroem', n_components=1000, C=10, epsilon=0.1, gamma='scale', solver='auto',
+                 max_iter=50, max_updates=1e6, tol=1e-3, batch_size=20000, random_state=42):
+        self.method = method
+        self.n_components = n_components
+        self.C = C
+        self.epsilon = epsilon
+        self.gamma = gamma
+        self.solver = solver
+        self.max_iter = max_iter
+        self.max_updates = max_updates
+        self.tol = tol
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64).ravel()
+        self.features_ = RBFFeatures(self.method, self.n_components, self.gamma, self.random_state).fit(X)
+        solver = self.solver
+        if solver == 'auto':
+            solver = 'linear_svr' if len(X) <= self.n_components else 'sgd'
+        if solver == 'linear_svr':
+            self.linear_ = LinearSVR(C=self.C, epsilon=self.epsilon, loss='epsilon_insensitive', dual=True,
+                                     tol=self.tol, max_iter=10000, random_state=self.random_state)
+            self.linear_.fit(self.features_.transform(X), y)
+        elif solver == 'sgd':
+            # Feature rows have ~unit norm, so one constant step size fits every dataset
+            self.linear_ = SGDRegressor(loss='epsilon_insensitive', epsilon=self.epsilon,
+                                        alpha=1.0 / (self.C * len(X)), learning_rate='constant', eta0=0.5,
+                                        average=True, random_state=self.random_state)
+            if len(X) * self.n_components <= 5e7:  # feature matrix below ~400 MB: transform once
+                features = self.features_.transform(X)
+                batch_size = len(X)
+            else:
+                features, batch_size = None, self.batch_size
+            self.n_epochs_ = int(min(self.max_iter, max(5, np.ceil(self.max_updates / len(X)))))
+            rng = np.random.default_rng(self.random_state)
+            for _ in range(self.n_epochs_):
+                order = rng.permutation(len(X))
+                for start in range(0, len(X), batch_size):
+                    rows = order[start:start + batch_size]
+                    block = features[rows] if features is not None else self.features_.transform(X[rows])
+                    self.linear_.partial_fit(block, y[rows])
+        else:
+            raise ValueError(f"solver must be 'auto', 'linear_svr' or 'sgd', got {self.solver!r}")
+        self.solver_ = solver
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return np.concatenate([self.linear_.predict(self.features_.transform(X[start:start + self.batch_size]))
+                               for start in range(0, len(X), self.batch_size)]) if len(X) else np.empty(0)
+
+
+def create_svr_model(mode='exact', n_components=1000, C=10, epsilon=0.1, gamma='scale', solver='auto',
+                     random_state=42):
+    """
+    RBF SVR on a standardized target (TransformedTargetRegressor + StandardScaler, as in
+    the notebooks), exact or kernel-approximated.
+
+    Args:
+        mode (str): 'exact' (sklearn SVR), 'nystroem' or 'rff' (ApproxKernelSVR).
+        n_components (int): Approximate feature dimension.
+        solver (str): Linear stage of the approximate modes (see ApproxKernelSVR).
+    """
+    if mode == 'exact':
+        regressor = SVR(kernel='rbf', C=C, epsilon=epsilon, gamma=gamma)
+    elif mode in SVR_MODES:
+        regressor = ApproxKernelSVR(mode, n_components, C, epsilon, gamma, solver, random_state=random_state)
+    else:
+        raise ValueError(f"mode must be one of {SVR_MODES}, got {mode!r}")
+    return TransformedTargetRegressor(regressor=regressor, transformer=StandardScaler())
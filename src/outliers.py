@@ -0,0 +1,184 @@
+"""
+Vectorized IQR outlier filtering, globally or per Entity.
+
+Both quartiles of every column are selected in one pass over a NumPy block (a single
+multi-kth np.partition, or one grouped sort in per-Entity mode), and the row mask is
+built directly on the array. OutlierFilter keeps the fitted bounds, so new batches are
+filtered without recomputing quantiles.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator
+
+from imputation import sort_by_group
+
+ENTITY_PREFIX = 'Entity_'
+
+
+def _lerp(a, b, t):
+    """Linear interpolation as in np.quantile(method='linear') (bit-identical results)."""
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def _quantile_ranks(counts, q):
+    """Lower rank, upper rank and interpolation weight of quantile q for `counts` values."""
+    pos = counts * q + (1 - q) - 1
+    lo = np.floor(pos).astype(np.intp)
+    return lo, np.minimum(lo + 1, counts - 1), pos - lo
+
+
+def column_quartiles(X):
+    """
+    NaN-ignoring Q1 and Q3 (linear interpolation) of every column of a 2D array.
+
+    The four order statistics needed per column are selected by one np.partition call.
+    Matches DataFrame.quantile([0.25, 0.75]).
+
+    Returns:
+        tuple: (q1, q3) arrays, NaN for empty columns.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    counts = (~np.isnan(X)).sum(axis=0)
+    q1 = np.full(X.shape[1], np.nan)
+    q3 = np.full(X.shape[1], np.nan)
+    has = counts > 0
+    if not has.any():
+        return q1, q3
+    ranks = [_quantile_ranks(counts[has], q) for q in (0.25, 0.75)]
+    kth = np.unique(np.concatenate([r for lo, hi, _ in ranks for r in (lo, hi)]))
+    part = np.partition(X[:, has], kth, axis=0)
+    cols = np.arange(part.shape[1])
+    for out, (lo, hi, t) in zip((q1, q3), ranks):
+        out[has] = _lerp(part[lo, cols], part[hi, cols], t)
+    return q1, q3
+
+
+def group_quartiles(X, codes, n_groups=None):
+    """
+    Q1 and Q3 of every column within every group, from one grouped sort (sort_by_group).
+
+    Returns:
+        tuple: (q1, q3, counts), each (n_groups x columns); NaN where a group has no value.
+    """
+    sorted_values, starts, counts = sort_by_group(X, codes, n_groups)
+    empty = counts == 0
+    cols = np.arange(sorted_values.shape[1])
+    quartiles = []
+    for q in (0.25, 0.75):
+        lo, hi, t = _quantile_ranks(np.maximum(counts, 1), q)
+        values = _lerp(sorted_values[starts[:, None] + lo, cols], sorted_values[starts[:, None] + hi, cols], t)
+        values[empty] = np.nan
+        quartiles.append(values)
+    return quartiles[0], quartiles[1], counts
+
+
+def entity_labels(df, group_col='Entity'):
+    """
+    Entity name of every row, from the Entity column or from one-hot `Entity_*` columns.
+
+    With drop_first one-hot encoding the reference entity has no column; its rows (all
+    indicators 0) are labelled None.
+    """
+    if group_col in df.columns:
+        return df[group_col].to_numpy(dtype=object)
+    indicators = [c for c in df.columns if str(c).startswith(ENTITY_PREFIX)]
+    if not indicators:
+        raise ValueError(f"No '{group_col}' or '{ENTITY_PREFIX}*' columns to resolve entities from")
+    block = df[indicators].to_numpy()
+    names = np.array([str(c)[len(ENTITY_PREFIX):] for c in indicators] + [None], dtype=object)
+    idx = np.where(block.any(axis=1), block.argmax(axis=1), len(indicators))
+    return names[idx]
+
+
+def whitelist_mask(df, whitelist_entities, group_col='Entity'):
+    """Rows belonging to whitelisted entities (by name or one-hot `Entity_<name>` columns)."""
+    if group_col in df.columns:
+        return df[group_col].isin(whitelist_entities).to_numpy()
+    mask = np.zeros(len(df), dtype=bool)
+    for name in whitelist_entities:
+        col = f'{ENTITY_PREFIX}{name}'
+        if col in df.columns:
+            mask |= df[col].to_numpy() == 1
+        else:
+            print(f"Whitelisted entity '{name}' not found (no '{group_col}' or '{col}' column)")
+    return mask
+
+
+def outlier_columns(df, exclude_cols=None):
+    """Numeric columns to check: excludes exclude_cols and one-hot Entity_* indicators."""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    exclude = set(exclude_cols or ())
+    return [c for c in numeric_cols if c not in exclude and not str(c).startswith(ENTITY_PREFIX)]
+
+
+class OutlierFilter(BaseEstimator):
+    """
+    IQR outlier filter with fitted bounds.
+
+    A row is an outlier if any checked column lies outside [Q1 - threshold*IQR,
+    Q3 + threshold*IQR]; columns with IQR = 0 are skipped. With by='Entity' the bounds are
+    computed per entity (resolved from the Entity column or from Entity_* indicators);
+    entities with fewer than min_group_size rows, or not seen in fit, use the global bounds.
+    Rows of whitelisted entities are never removed.
+
+    Example:
+        filt = OutlierFilter(threshold=3.0, whitelist_entities=['China']).fit(df_train)
+        df_new = filt.transform(df_new)  # same bounds, no quantiles recomputed
+    """
+    def __init__(self, threshold=1.5, exclude_cols=None, whitelist_entities=None, by=None,
+                 min_group_size=8, verbose=True):
+        self.threshold = threshold
+        self.exclude_cols = exclude_cols
+        self.whitelist_entities = whitelist_entities
+        self.by = by
+        self.min_group_size = min_group_size
+        self.verbose = verbose
+
+    def _bounds(self, q1, q3):
+        iqr = q3 - q1
+        valid = iqr > 0
+        lower = np.where(valid, q1 - self.threshold * iqr, -np.inf)
+        upper = np.where(valid, q3 + self.threshold * iqr, np.inf)
+        return lower, upper, valid
+
+    def fit(self, X, y=None):
+        self.columns_ = outlier_columns(X, self.exclude_cols)
+        values = X[self.columns_].to_numpy(dtype=np.float64)
+        self.lower_, self.upper_, valid = self._bounds(*column_quartiles(values))
+        self.skipped_ = [c for c, v in zip(self.columns_, valid) if not v]
+        if self.skipped_ and self.verbose:
+            print(f"Skipping outlier removal for {len(self.skipped_)} columns with IQR=0 (likely imputed): {self.skipped_}")
+
+        if self.by is not None:
+            codes, self.groups_ = pd.factorize(pd.Series(entity_labels(X, self.by)), use_na_sentinel=False)
+            q1, q3, counts = group_quartiles(values, codes, len(self.groups_))
+            lower, upper, _ = self._bounds(q1, q3)
+            small = counts < self.min_group_size
+            # Per-group bounds, global ones for small groups or columns without an IQR
+            self.group_lower_ = np.where(small, self.lower_, lower)
+            self.group_upper_ = np.where(small, self.upper_, upper)
+        return self
+
+    def outlier_mask(self, X):
+        """Boolean array, True for rows that would be removed."""
+        values = X[self.columns_].to_numpy(dtype=np.float64)
+        if self.by is None:
+            lower, upper = self.lower_, self.upper_
+        else:
+            idx = pd.Index(self.groups_).get_indexer(entity_labels(X, self.by))
+            seen = (idx >= 0)[:, None]
+            lower = np.where(seen, self.group_lower_[idx], self.lower_)
+            upper = np.where(seen, self.group_upper_[idx], self.upper_)
+        # NaNs compare False, so they never mark a row
+        is_outlier = ((values < lower) | (values > upper)).any(axis=1)
+        if self.whitelist_entities:
+            is_outlier &= ~whitelist_mask(X, self.whitelist_entities, self.by or 'Entity')
+        return is_outlier
+
+    def transform(self, X):
+        """Returns the rows of X that are not outliers."""
+        return X[~self.outlier_mask(X)]
+
+    def fit_transform(self, X, y=None):
+        return self.fit(X).transform(X)
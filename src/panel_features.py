@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+
+def panel_layout(df, group_col='Entity', time_col='Year'):
+    """
+    Sorts a panel once by (group, time) and computes its group boundaries.
+
+    Returns:
+        tuple: (order, codes, starts, pos) where `order` are the row positions of df in
+        sorted order, `codes` the sorted integer group codes, `starts` the first sorted
+        row of every group and `pos` the position of each sorted row inside its group.
+    """
+    codes, _ = pd.factorize(df[group_col], sort=True)
+    order = np.lexsort((df[time_col].to_numpy(), codes))
+    codes = codes[order]
+    n = len(codes)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if n else np.empty(0, dtype=np.int64)
+    lengths = np.diff(np.r_[starts, n])
+    pos = np.arange(n) - np.repeat(starts, lengths)
+    return order, codes, starts, pos
+
+
+def panel_feature_names(cols, lags=(1,), windows=(), deltas=()):
+    """Returns the output column names of build_panel_features, in block order."""
+    names = []
+    for col in cols:
+        names += [f'{col}_lag{k}' for k in lags]
+        names += [f'{col}_rollmean{w}' for w in windows]
+        names += [f'{col}_rollstd{w}' for w in windows]
+        names += [f'{col}_delta{k}' for k in deltas]
+    return names
+
+
+def build_panel_features(df, cols, lags=(1,), windows=(), deltas=(), group_col='Entity',
+                         time_col='Year', dtype=np.float32):
+    """
+    Builds lag, rolling and year-over-year features for many columns in one pass.
+
+    The panel is sorted once and processed as a contiguous (rows x columns) NumPy array;
+    every feature kind is computed for all columns at once and written into one
+    preallocated block. All features use only history strictly before the current row
+    (as a lag does), so they are safe to build for the target column:
+
+    - `{col}_lag{k}`: value k rows earlier within the group (groupby().shift(k)).
+    - `{col}_rollmean{w}` / `{col}_rollstd{w}`: mean / sample std of the previous w values.
+    - `{col}_delta{k}`: lag1 - lag(1+k), the last observed k-year change.
+
+    Rows without enough history get NaN, as with pandas shift/rolling.
+
+    Returns:
+        tuple: (block of shape (rows, features), feature names, sorted row order of df)
+    """
+    order, _, _, pos = panel_layout(df, group_col, time_col)
+    values = df[list(cols)].to_numpy(dtype=np.float64)[order]
+    n, n_cols = values.shape
+    names = panel_feature_names(cols, lags, windows, deltas)
+    if not n_cols:
+        return np.empty((n, 0), dtype=dtype), names, order
+    per_col = len(names) // n_cols
+    block = np.empty((n, len(names)), dtype=dtype)
+    slots = iter(range(per_col))
+
+    def fill(history, result):
+        # Next feature slot of every source column (a strided view into the block);
+        # `result` holds rows >= history, rows with less in-group history become NaN.
+        dst = block[:, next(slots)::per_col]
+        if history >= n:
+            dst[:] = np.nan
+            return
+        dst[:history] = np.nan
+        dst[history:] = result
+        dst[pos < history] = np.nan
+
+    # Row r's value k years back is values[r - k]: every feature below is built from
+    # shifted slices (views) of the sorted array instead of per-column groupby shifts.
+    for k in lags:
+        fill(k, values[:n - k])
+
+    window_stats = []
+    for w in windows:
+        if w >= n:
+            window_stats.append((w, None, None))
+            continue
+        win = [values[w - i:n - i] for i in range(1, w + 1)]
+        mean = sum(win) / w
+        var = sum((x - mean) ** 2 for x in win) / (w - 1) if w > 1 else np.full_like(mean, np.nan)
+        window_stats.append((w, mean, np.sqrt(var)))
+    for w, mean, _ in window_stats:
+        fill(w, mean)
+    for w, _, std in window_stats:
+        fill(w, std)
+
+    for k in deltas:
+        fill(1 + k, values[k:n - 1] - values[:n - 1 - k])
+
+    return block, names, order
@@ -0,0 +1,247 @@
+"""
+Compact (Entity, Year) panel with stable row IDs.
+
+A PanelFrame holds:
+- features: one contiguous float32 (rows x features) block;
+- entity: int32 codes into a dictionary of names shared by every frame derived from it;
+- year: int16;
+- row_id: int64, the row's ID in the dataset it came from. It is kept by every take,
+  filter and column replacement, so joining back to that dataset is an index lookup.
+
+Rows are kept sorted by (entity, year). An entity's rows are therefore one contiguous
+slice found from precomputed offsets, and a year's rows come from a year-sorted order
+with its own offsets. Both lookups are O(1).
+
+Row IDs come from a `Row_ID` column when the frame has one (processed CSVs written with
+`index_label=ROW_ID`), else from the DataFrame index. pandas cleaning and encoding steps
+(encode_features, remove_outliers, remove_high_vif, scaling) keep the index, so the IDs
+survive them.
+
+Example:
+    common = PanelFrame.from_frame(load_data('data/processed/common_preprocessed.csv'))
+    df_lr = pd.read_csv('data/processed/lr_final_prep.csv', index_col=ROW_ID)
+    keys = common.keys(df_lr.index)  # Entity and Year of every LR row
+    china = common.for_entity('China')
+"""
+import numpy as np
+import pandas as pd
+
+from data_store import ROW_ID, load_dataset, save_dataset
+from fixed_effects import entity_dummies
+from outliers import ENTITY_PREFIX
+
+
+def _codes(names, entities):
+    """int32 codes of names in the dictionary `entities`, extended (at the end) with unseen names."""
+    names = np.asarray(names, dtype=object)
+    if pd.isna(names).any():
+        raise ValueError("Entity has missing values")
+    if entities is None:
+        entities = np.array(sorted(set(names)), dtype=object)
+    codes = pd.Index(entities).get_indexer(names)
+    unseen = codes < 0
+    if unseen.any():
+        # Existing codes stay valid, so frames built on the old dictionary remain compatible
+        entities = np.concatenate([entities, np.array(sorted(set(names[unseen])), dtype=object)])
+        codes = pd.Index(entities).get_indexer(names)
+    return codes.astype(np.int32), entities
+
+
+def _years(values):
+    years = np.asarray(values, dtype=np.float64)
+    if np.isnan(years).any() or (years != np.round(years)).any():
+        raise ValueError("Year must be whole numbers without missing values")
+    if len(years) and (years.min() < np.iinfo(np.int16).min or years.max() > np.iinfo(np.int16).max):
+        raise ValueError("Year does not fit in int16")
+    return years.astype(np.int16)
+
+
+class PanelFrame:
+    """
+    Args:
+        values: (rows x features) feature block.
+        columns (list): Feature names.
+        entity (np.ndarray): int32 entity codes into `entities`.
+        year (np.ndarray): Years.
+        row_id (np.ndarray): Stable row IDs (non-negative, unique).
+        entities (np.ndarray): Entity names, indexed by code.
+    """
+    def __init__(self, values, columns, entity, year, row_id, entities):
+        entity = np.asarray(entity, dtype=np.int32)
+        year = np.asarray(year, dtype=np.int16)
+        order = np.lexsort((year, entity))
+        if np.all(order == np.arange(len(order))):
+            order = slice(None)
+        self._set(np.asarray(values, dtype=np.float32)[order], columns, entity[order], year[order],
+                  np.asarray(row_id, dtype=np.int64)[order], np.asarray(entities, dtype=object))
+
+    def _set(self, values, columns, entity, year, row_id, entities):
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.columns = list(columns)
+        if self.values.shape != (len(entity), len(self.columns)):
+            raise ValueError(f"values has shape {self.values.shape}, expected {(len(entity), len(self.columns))}")
+        self.entity = entity
+        self.year = year
+        self.row_id = row_id
+        self.entities = entities
+        self._column_index = {c: j for j, c in enumerate(self.columns)}
+        self._entity_index = {name: code for code, name in enumerate(entities)}
+
+        counts = np.bincount(entity, minlength=len(entities))
+        self.entity_offsets = np.r_[0, np.cumsum(counts)]
+        self.year_order = np.argsort(year, kind='stable')  # stable: entity order kept within a year
+        sorted_years = year[self.year_order]
+        self.years = np.unique(sorted_years)
+        self.year_offsets = np.r_[np.searchsorted(sorted_years, self.years), len(year)]
+
+        if len(row_id) and row_id.min() < 0:
+            raise ValueError("Row IDs must be non-negative")
+        self._position = np.full(int(row_id.max()) + 1 if len(row_id) else 0, -1, dtype=np.int64)
+        self._position[row_id] = np.arange(len(row_id))
+        if len(row_id) and (self._position >= 0).sum() != len(row_id):
+            raise ValueError("Row IDs must be unique")
+
+    @classmethod
+    def _sorted(cls, values, columns, entity, year, row_id, entities):
+        """Builds a frame from arrays already in (entity, year) order."""
+        frame = cls.__new__(cls)
+        frame._set(values, columns, entity, year, row_id, entities)
+        return frame
+
+    @classmethod
+    def from_frame(cls, df, feature_cols=None, entity_col='Entity', time_col='Year', entities=None):
+        """
+        Builds a PanelFrame from a DataFrame.
+
+        Args:
+            feature_cols (list): Feature columns (default: every numeric column except Year,
+                Row_ID and one-hot Entity_* columns, which the entity codes replace).
+            entities (np.ndarray): Entity dictionary to code against (e.g. another frame's
+                `entities`, so both share codes); unseen names are appended.
+        """
+        if feature_cols is None:
+            feature_cols = [c for c in df.select_dtypes(include=[np.number, 'bool']).columns
+                            if c not in (time_col, ROW_ID) and not str(c).startswith(ENTITY_PREFIX)]
+        row_id = df[ROW_ID].to_numpy() if ROW_ID in df.columns else df.index.to_numpy()
+        if not np.issubdtype(np.asarray(row_id).dtype, np.integer):
+            raise ValueError(f"Row IDs (index or '{ROW_ID}' column) must be integers")
+        entity, entities = _codes(df[entity_col].to_numpy(dtype=object), entities)
+        values = df[feature_cols].to_numpy(dtype=np.float32) if feature_cols else np.empty((len(df), 0), np.float32)
+        return cls(values, feature_cols, entity, _years(df[time_col]), row_id, entities)
+
+    def to_frame(self, row_id_col=None):
+        """
+        DataFrame with Entity (categorical on the shared dictionary), Year and the features,
+        indexed by row ID (or with a `row_id_col` column instead, for saving).
+        """
+        df = pd.DataFrame(self.values, columns=self.columns, copy=False)
+        df.insert(0, 'Year', self.year)
+        df.insert(0, 'Entity', pd.Categorical.from_codes(self.entity, categories=self.entities))
+        if row_id_col is not None:
+            df.insert(0, row_id_col, self.row_id)
+            return df
+        df.index = pd.Index(self.row_id, name=ROW_ID)
+        return df
+
+    def save(self, path):
+        """Saves the frame as a columnar store (see data_store) mirroring `path`."""
+        return save_dataset(self.to_frame(row_id_col=ROW_ID), path)
+
+    @classmethod
+    def load(cls, path, entities=None):
+        """Loads a frame saved with `save` (or from the CSV at `path` if there is no store)."""
+        df = load_dataset(path)
+        if df is None:
+            df = pd.read_csv(path)
+        return cls.from_frame(df, entities=entities)
+
+    def __len__(self):
+        return len(self.row_id)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def memory_usage(self):
+        """Bytes held by the data arrays."""
+        return self.values.nbytes + self.entity.nbytes + self.year.nbytes + self.row_id.nbytes
+
+    def __repr__(self):
+        return (f"PanelFrame({len(self)} rows x {len(self.columns)} features, "
+                f"{len(self.entities)} entities, {len(self.years)} years)")
+
+    def column(self, name):
+        """View of one feature column."""
+        return self.values[:, self._column_index[name]]
+
+    def entity_names(self):
+        """Entity name of every row."""
+        return self.entities[self.entity]
+
+    def entity_code(self, name):
+        if name not in self._entity_index:
+            raise KeyError(f"Unknown entity '{name}'")
+        return self._entity_index[name]
+
+    def entity_rows(self, name):
+        """Slice of the rows of one entity (contiguous, in year order)."""
+        code = self.entity_code(name)
+        return slice(int(self.entity_offsets[code]), int(self.entity_offsets[code + 1]))
+
+    def year_rows(self, year):
+        """Row positions of one year (in entity order)."""
+        i = np.searchsorted(self.years, year)
+        if i == len(self.years) or self.years[i] != year:
+            return self.year_order[:0]
+        return self.year_order[self.year_offsets[i]:self.year_offsets[i + 1]]
+
+    def for_entity(self, name):
+        """Frame of one entity; its arrays are views of this frame's."""
+        rows = self.entity_rows(name)
+        return self._sorted(self.values[rows], self.columns, self.entity[rows], self.year[rows],
+                            self.row_id[rows], self.entities)
+
+    def for_year(self, year):
+        return self.take(self.year_rows(year))
+
+    def take(self, positions):
+        """Frame of the rows at `positions` (kept in (entity, year) order), with their row IDs."""
+        positions = np.sort(np.asarray(positions, dtype=np.int64))
+        return self._sorted(self.values[positions], self.columns, self.entity[positions], self.year[positions],
+                            self.row_id[positions], self.entities)
+
+    def filter(self, mask):
+        return self.take(np.flatnonzero(mask))
+
+    def lookup(self, row_ids):
+        """Positions of the given row IDs; KeyError if any is not in this frame."""
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        inside = (row_ids >= 0) & (row_ids < len(self._position))
+        positions = np.full(len(row_ids), -1, dtype=np.int64)
+        positions[inside] = self._position[row_ids[inside]]
+        if (positions < 0).any():
+            raise KeyError(f"Row IDs not in frame: {row_ids[positions < 0][:10].tolist()}")
+        return positions
+
+    def loc(self, row_ids):
+        """Frame of the given row IDs."""
+        return self.take(self.lookup(row_ids))
+
+    def keys(self, row_ids=None):
+        """Entity and Year of the given row IDs (all rows by default), indexed by row ID, in the given order."""
+        positions = np.arange(len(self)) if row_ids is None else self.lookup(row_ids)
+        return pd.DataFrame({'Entity': self.entities[self.entity[positions]], 'Year': self.year[positions]},
+                            index=pd.Index(self.row_id[positions], name=ROW_ID))
+
+    def with_values(self, values, columns=None):
+        """Same rows and identity with a new feature block (e.g. scaled or with panel features added)."""
+        return self._sorted(values, self.columns if columns is None else columns, self.entity, self.year,
+                            self.row_id, self.entities)
+
+    def select(self, columns):
+        idx = [self._column_index[c] for c in columns]
+        return self.with_values(self.values[:, idx], columns)
+
+    def dummies(self, drop_first=True):
+        """Sparse one-hot Entity block (see fixed_effects.entity_dummies) on the shared dictionary."""
+        return entity_dummies(self.entity_names(), drop_first=drop_first, categories=self.entities)
@@ -2,6 +2,8 @@
 import pandas as pd
 import numpy as np
 import os
+from data_store import save_dataset
+from imputation import impute_medians
 
 def preprocess_data(input_path, output_path):
     print(f"Loading data from {input_path}...")
@@ -18,11 +20,9 @@ def preprocess_data(input_path, output_path):
     # Median Imputation for numeric columns
     print("\nPerforming Median Imputation...")
     numeric_columns = df.select_dtypes(include=[np.number]).columns
-    for col in numeric_columns:
-        if df[col].isnull().any():
-            median_val = df[col].median()
-            df[col].fillna(median_val, inplace=True)
-            print(f"Imputed {col} with median: {median_val}")
+    df, medians = impute_medians(df, numeric_columns)
+    for col, median_val in medians.items():
+        print(f"Imputed {col} with median: {median_val}")
 
     # Verify no missing values in numeric columns
     print("\nMissing values after imputation (numeric):")
@@ -32,6 +32,8 @@ def preprocess_data(input_path, output_path):
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     df.to_csv(output_path, index=False)
     print(f"\nProcessed data saved to {output_path}")
+    # Typed columnar copy so downstream stages skip CSV parsing (see load_data)
+    print(f"Columnar store saved to {save_dataset(df, output_path)}")
 
 if __name__ == "__main__":
     INPUT_PATH = 'data/raw/global-data-on-sustainable-energy.csv'
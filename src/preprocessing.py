@@ -4,12 +4,39 @@ from sklearn.pipeline import Pipeline
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler, RobustScaler, OrdinalEncoder, OneHotEncoder
+from vif import vif_elimination
+from panel_features import build_panel_features
+from data_store import ROW_ID, load_dataset, store_path
+from imputation import impute_medians
+from outliers import OutlierFilter
+
+# Large economies (G20+ and the main emitters) never removed as outliers (remove_outliers)
+WHITELIST = [
+    'China', 'United States', 'India', 'Russia', 'Japan', 'Germany',
+    'South Korea', 'Iran', 'Saudi Arabia', 'Indonesia', 'Canada',
+    'Mexico', 'South Africa', 'Brazil', 'Australia', 'Turkey',
+    'United Kingdom', 'France', 'Italy', 'Poland', 'Taiwan',
+    'Thailand', 'Spain', 'Malaysia', 'Egypt', 'Vietnam', 'Pakistan',
+    'Argentina', 'Venezuela', 'United Arab Emirates', 'Netherlands',
+    'Iraq', 'Philippines', 'Kazakhstan', 'Algeria', 'Kuwait',
+    'Belgium', 'Czechia', 'Morocco',
+]
 
 def load_data(path):
-    """Loads dataset from CSV."""
+    """
+    Loads dataset from its columnar store (memory-mapped) if present, else from CSV.
+
+    A Row_ID column (stable row identifiers, see panel_frame) becomes the index.
+    """
     try:
-        df = pd.read_csv(path)
-        print(f"Loaded data from {path}: {df.shape}")
+        df = load_dataset(path)
+        if df is not None:
+            print(f"Loaded data from {store_path(path)}: {df.shape}")
+        else:
+            df = pd.read_csv(path)
+            print(f"Loaded data from {path}: {df.shape}")
+        if ROW_ID in df.columns:
+            df = df.set_index(ROW_ID)
         return df
     except Exception as e:
         print(f"Error loading data: {e}")
@@ -26,16 +53,14 @@ def basic_cleaning(df):
                 pass
     return df_clean
 
-def handle_missing_values(df, strategy='median'):
-    """Imputes missing values."""
+def handle_missing_values(df, strategy='median', group_cols=None):
+    """Imputes missing values (group_cols, e.g. 'Entity', for per-group medians)."""
     df_imputed = df.copy()
     numeric_columns = df_imputed.select_dtypes(include=[np.number]).columns
     
     if strategy == 'median':
-        for col in numeric_columns:
-            if df_imputed[col].isnull().any():
-                median_val = df_imputed[col].median()
-                df_imputed[col].fillna(median_val, inplace=True)
+        # All medians in one pass, filled in one assignment (no chained inplace fillna)
+        df_imputed, _ = impute_medians(df_imputed, numeric_columns, group_cols)
     
     # Check for remaining NaNs
     remaining = df_imputed[numeric_columns].isnull().sum().sum()
@@ -44,12 +69,10 @@ def handle_missing_values(df, strategy='median'):
 
 def create_lag_features(df, target_col, lag_cols, shifts=[1]):
     """Generates lag features for time-series/panel analysis."""
-    df_lagged = df.copy()
-    df_lagged.sort_values(['Entity', 'Year'], inplace=True)
-    
-    for col in lag_cols:
-        for shift in shifts:
-            df_lagged[f'{col}_lag{shift}'] = df_lagged.groupby('Entity')[col].shift(shift)
+    # Sort once and build every lag in a single block (float64 keeps the source precision)
+    block, names, order = build_panel_features(df, lag_cols, lags=shifts, dtype=np.float64)
+    df_lagged = df.iloc[order].drop(columns=names, errors='ignore')
+    df_lagged = pd.concat([df_lagged, pd.DataFrame(block, index=df_lagged.index, columns=names)], axis=1)
             
     # Drop rows with NaNs caused by shifting
     original_len = len(df_lagged)
@@ -57,10 +80,16 @@ def create_lag_features(df, target_col, lag_cols, shifts=[1]):
     print(f"Dropped {original_len - len(df_lagged)} rows due to lags.")
     return df_lagged
 
-def encode_features(df, method='onehot'):
-    """Encodes categorical features (Entity)."""
+def encode_features(df, method='onehot', sparse=False, drop_first=True):
+    """
+    Encodes categorical features (Entity).
+
+    sparse=True keeps the one-hot Entity_* columns as pandas sparse columns; build the
+    model input with fixed_effects.design_matrix to keep them sparse through Ridge.
+    drop_first=False keeps a column for every entity (one-hot only).
+    """
     if method == 'onehot':
-        return pd.get_dummies(df, columns=['Entity'], drop_first=True)
+        return pd.get_dummies(df, columns=['Entity'], drop_first=drop_first, sparse=sparse)
     elif method == 'ordinal':
         df_encoded = df.copy()
         encoder = OrdinalEncoder()
@@ -69,70 +98,30 @@ def encode_features(df, method='onehot'):
     else:
         return df
 
-def remove_outliers(df, method='iqr', threshold=1.5, exclude_cols=None, whitelist_entities=None):
+def remove_outliers(df, method='iqr', threshold=1.5, exclude_cols=None, whitelist_entities=None, by=None):
     """
-    Removes outliers from numerical columns using IQR.
+    Removes outliers from numerical columns using IQR (see outliers.OutlierFilter).
     
     Args:
         whitelist_entities (list): List of Entity names to NEVER remove (e.g., USA, China).
+            Resolved from the Entity column or, once one-hot encoded, from Entity_<name>.
+        by (str): 'Entity' for per-entity IQR bounds instead of global ones.
     """
-    df_clean = df.copy()
-    numeric_cols = df_clean.select_dtypes(include=[np.number]).columns
-    
-    # Exclude columns (e.g., One-Hot encoded)
-    if exclude_cols:
-        numeric_cols = [c for c in numeric_cols if c not in exclude_cols and not c.startswith('Entity_')]
-    else:
-        # Auto-exclude likely One-Hot columns
-        numeric_cols = [c for c in numeric_cols if not c.startswith('Entity_')]
-
-    original_rows = len(df_clean)
+    original_rows = len(df)
+    df_clean = df
     
     if method == 'iqr':
-        Q1 = df_clean[numeric_cols].quantile(0.25)
-        Q3 = df_clean[numeric_cols].quantile(0.75)
-        IQR = Q3 - Q1
-        
-        # Identify valid columns (IQR > 0)
-        valid_cols = IQR[IQR > 0].index
-        if len(valid_cols) < len(numeric_cols):
-            print(f"Skipping outlier removal for {len(numeric_cols) - len(valid_cols)} columns with IQR=0 (likely imputed): {list(set(numeric_cols) - set(valid_cols))}")
-        
-        # Filter: Keep rows that are NOT outliers in ANY of the valid numeric columns
-        if len(valid_cols) > 0:
-            is_outlier = ((df_clean[valid_cols] < (Q1[valid_cols] - threshold * IQR[valid_cols])) | (df_clean[valid_cols] > (Q3[valid_cols] + threshold * IQR[valid_cols]))).any(axis=1)
-            
-            # PROTECT WHITELISTED ENTITIES
-            if whitelist_entities:
-                # If 'Entity' column is gone due to One-Hot, we can't filter by name easily unless we used OneHot on it.
-                # Assuming 'Entity' column might be dropped or encoded.
-                # However, our Preprocessing pipeline One-Hot Encodes AFTER loading.
-                # Check if 'Entity' column exists
-                if 'Entity' in df_clean.columns:
-                    is_whitelisted = df_clean['Entity'].isin(whitelist_entities)
-                    is_outlier = is_outlier & (~is_whitelisted) # Don't mark as outlier if whitelisted
-                
-                # If Entity is one-hot encoded (e.g. Entity_China), we can check those columns?
-                # No, easier to rely on the fact that we should apply outlier removal BEFORE dropping Entity column if possible,
-                # OR ensure Entity column is preserved.
-                # Looking at Notebook 2, Entity is One-Hot encoded, so original 'Entity' col is likely DROPPED.
-                # But wait, df_lr = encode_features(df, method='onehot') does pd.get_dummies(..., drop_first=True).
-                # This drops the original 'Entity' column.
-                # WE NEED TO FIX THIS in the notebook or logic.
-                
-                # Alternate strategy: if Entity is one-hot, we can reconstruct the mask
-                # But typically we want to whitelist based on the original name.
-                pass
-
-            df_clean = df_clean[~is_outlier]
+        # Auto-excludes one-hot Entity_* columns; both quartiles in one pass over the block
+        outlier_filter = OutlierFilter(threshold, exclude_cols, whitelist_entities, by=by)
+        df_clean = outlier_filter.fit_transform(df)
+    else:
+        df_clean = df.copy()
         
     print(f"Removed {original_rows - len(df_clean)} outlier rows (threshold={threshold}).")
     return df_clean
 
 def remove_high_vif(df, target_col, threshold=10, exclude_cols=None):
     """Iteratively removes features with VIF > threshold, excluding specified columns."""
-    from statsmodels.stats.outliers_influence import variance_inflation_factor
-    
     df_vif = df.copy()
     # Select numeric features only
     features = list(df_vif.select_dtypes(include=[np.number]).columns)
@@ -148,27 +137,16 @@ def remove_high_vif(df, target_col, threshold=10, exclude_cols=None):
         features = [f for f in features if not f.startswith('Entity_')]
 
     dropped_features = []
-    
-    while True:
-        # VIF requires no NaNs and no infinite values
-        X = df_vif[features].dropna()
-        
-        # Determine VIF
-        try:
-            vif_data = pd.DataFrame()
-            vif_data["feature"] = features
-            vif_data["VIF"] = [variance_inflation_factor(X.values, i) for i in range(len(features))]
-            
-            max_vif = vif_data["VIF"].max()
-            if max_vif > threshold:
-                feature_to_drop = vif_data.sort_values("VIF", ascending=False)["feature"].iloc[0]
-                features.remove(feature_to_drop)
-                dropped_features.append(feature_to_drop)
-            else:
-                break
-        except Exception as e:
-            print(f"Error calculating VIF: {e}")
-            break
+
+    # VIF requires no NaNs; rows with NaNs in the current features are skipped each round.
+    # All VIFs come from one inverse that is downdated after each drop.
+    try:
+        X = df_vif[features].to_numpy(dtype=np.float64)
+        _, dropped_idx = vif_elimination(X, threshold)
+        dropped_features = [features[i] for i in dropped_idx]
+        features = [f for f in features if f not in dropped_features]
+    except Exception as e:
+        print(f"Error calculating VIF: {e}")
             
     print(f"Dropped features due to VIF > {threshold}: {dropped_features}")
     # Return df with dropped features removed
@@ -5,11 +5,29 @@ from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer, make_column_selector
 from sklearn.preprocessing import OneHotEncoder, RobustScaler, OrdinalEncoder, FunctionTransformer
-from sklearn.impute import SimpleImputer
-from statsmodels.stats.outliers_influence import variance_inflation_factor
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vif import vif_elimination
+from panel_features import build_panel_features, panel_layout
+from imputation import MedianImputer
+from relevance import information_coefficient, mutual_information, target_correlations
 
 # --- Custom Transformers ---
 
+def _take_columns(X, support, names_in, names_out):
+    """
+    Fitted column selection: a positional take for arrays (no DataFrame wrapping), and for
+    DataFrames with the fitted column layout; other DataFrames are selected by name.
+    """
+    if isinstance(X, pd.DataFrame):
+        if len(X.columns) == len(names_in) and (X.columns == names_in).all():
+            return X.iloc[:, support]
+        return X[names_out]
+    return np.asarray(X)[:, support]
+
+
 class VIFSelector(BaseEstimator, TransformerMixin):
     """
     Removes features with Variance Inflation Factor (VIF) > threshold.
@@ -26,37 +44,24 @@ class VIFSelector(BaseEstimator, TransformerMixin):
         if not isinstance(X, pd.DataFrame):
             X = pd.DataFrame(X)
         
-        # Iteratively remove features with high VIF
-        X_temp = X.copy()
-        while True:
-            # Drop constant columns (VIF is inf) or NaN columns
-            X_temp = X_temp.dropna(axis=1) # Simple handle, strictly imputation should happen before
-            
-            # VIF needs numeric data
-            numeric_cols = X_temp.select_dtypes(include=[np.number]).columns
-            if len(numeric_cols) < 2:
-                break
-                
-            vifs = pd.Series(
-                [variance_inflation_factor(X_temp[numeric_cols].values, i) for i in range(len(numeric_cols))],
-                index=numeric_cols
-            )
-            
-            max_vif = vifs.max()
-            if max_vif > self.threshold:
-                drop_col = vifs.idxmax()
-                X_temp = X_temp.drop(columns=[drop_col])
-                # print(f"DEBUG: Dropped {drop_col} with VIF {max_vif:.2f}")
-            else:
-                break
-        
+        # Drop constant columns (VIF is inf) or NaN columns
+        X_temp = X.dropna(axis=1) # Simple handle, strictly imputation should happen before
+
+        # Iteratively remove features with high VIF (VIF needs numeric data).
+        # All VIFs come from one inverse that is downdated after each drop.
+        numeric_cols = X_temp.select_dtypes(include=[np.number]).columns
+        if len(numeric_cols) >= 2:
+            _, dropped = vif_elimination(X_temp[numeric_cols].values, self.threshold, min_features=1)
+            X_temp = X_temp.drop(columns=numeric_cols[dropped])
+
         self.feature_names_ = X_temp.columns.tolist()
+        # Frozen selection: positions of the kept columns, so transform is a column take
+        self.input_columns_ = X.columns.tolist()
+        self.support_ = X.columns.get_indexer(self.feature_names_)
         return self
 
     def transform(self, X):
-        if not isinstance(X, pd.DataFrame):
-            X = pd.DataFrame(X)
-        return X[self.feature_names_] 
+        return _take_columns(X, self.support_, self.input_columns_, self.feature_names_)
     
     def get_feature_names_out(self, input_features=None):
         return np.array(self.feature_names_)
@@ -66,66 +71,135 @@ class CorrelationSelector(BaseEstimator, TransformerMixin):
     """
     Keeps features with Pearson correlation > threshold with the target.
     ADDRESSES: Feature Selection for SVR to reduce noise (Distance-Based Optimization).
+
+    method: 'pearson' (default), 'spearman' (monotonic relevance) or 'mi' (histogram mutual
+    information for nonlinear relevance, on the |correlation| scale so the same threshold
+    applies). All columns are scored at once (see relevance.py); scores_ holds the scores.
     """
-    def __init__(self, threshold=0.1):
+    def __init__(self, threshold=0.1, method='pearson', bins=None):
         self.threshold = threshold
+        self.method = method
+        self.bins = bins
         self.selected_indices_ = []
 
     def fit(self, X, y):
         if y is None:
             raise ValueError("Target y is required for CorrelationSelector")
         
-        # Calculate correlations
-        if not isinstance(X, pd.DataFrame):
-            X_df = pd.DataFrame(X)
+        # Column names of DataFrames are kept; arrays get positional names
+        columns = X.columns if isinstance(X, pd.DataFrame) else pd.RangeIndex(np.shape(X)[1])
+        if self.method == 'mi':
+            scores = information_coefficient(mutual_information(X, y, self.bins))
         else:
-            X_df = X
-            
-        correlations = X_df.corrwith(pd.Series(y, index=X_df.index))
-        high_corr_features = correlations[abs(correlations) > self.threshold].index
+            scores = target_correlations(X, y, self.method)
         
-        # Get integer indices for transforming if likely to receive array later, 
-        # but sticking to column names is safer if pipeline preserves them.
-        self.feature_names_ = high_corr_features.tolist()
+        self.scores_ = pd.Series(scores, index=columns)
+        self.support_ = np.flatnonzero(np.abs(scores) > self.threshold)
+        self.selected_indices_ = self.support_.tolist()
+        self.feature_names_ = columns[self.support_].tolist()
+        self.input_columns_ = columns.tolist()
         return self
 
     def transform(self, X):
-        if not isinstance(X, pd.DataFrame):
-            X = pd.DataFrame(X)
-        return X[self.feature_names_]
+        return _take_columns(X, self.support_, self.input_columns_, self.feature_names_)
 
     def get_feature_names_out(self, input_features=None):
+        if input_features is not None:
+            return np.asarray(input_features, dtype=object)[self.support_]
         return np.array(self.feature_names_)
 
 
 class LagFeatureGenerator(BaseEstimator, TransformerMixin):
     """
-    Creates lag features (t-1) for specified columns grouped by Entity.
+    Creates lag features (t-1 by default) for specified columns grouped by Entity.
+    Optionally adds more lags, rolling means/stds over previous years and year-over-year deltas.
     ADDRESSES: Temporal dependency for XGBoost (Panel Data Approach).
+
+    fit keeps only the last few years per entity (as many as the deepest lag/window needs).
+    A later batch that starts the year right after an entity's fitted history (e.g. next
+    year's rows) takes its lags from that tail, so transforming a batch costs O(batch size),
+    not O(history), and the first forecast year gets real lags instead of NaN. Lags are
+    positional, so a batch that starts later (a gap after the history) gets no tail and its
+    first row has NaN lags. Batches that overlap the fitted years (e.g. the training data
+    itself) are lagged within themselves.
     """
-    def __init__(self, group_col='Entity', time_col='Year', lag_cols=['Value_co2_emissions_kt_by_country', 'gdp_growth']):
+    def __init__(self, group_col='Entity', time_col='Year', lag_cols=['Value_co2_emissions_kt_by_country', 'gdp_growth'],
+                 lags=[1], windows=[], deltas=[]):
         self.group_col = group_col
         self.time_col = time_col
         self.lag_cols = lag_cols
+        self.lags = lags
+        self.windows = windows
+        self.deltas = deltas
+
+    def _depth(self):
+        """Rows of history the deepest feature looks back."""
+        return max([*self.lags, *self.windows, *[1 + k for k in self.deltas], 1])
+
+    def _present(self, X):
+        lag_cols = []
+        for col in self.lag_cols:
+            if col in X.columns:
+                lag_cols.append(col)
+            else:
+                print(f"Warning: Column {col} not found for lagging.")
+        return lag_cols
 
     def fit(self, X, y=None):
-        # Lag generation is stateless in terms of fitting parameters, 
-        # but requires historical context which implies it acts on the dataset structure.
+        # Frozen history: the last `depth` rows of every entity (sorted by time)
+        self.lag_cols_ = self._present(X)
+        order, codes, starts, pos = panel_layout(X, self.group_col, self.time_col)
+        ends = np.r_[starts[1:], len(order)].astype(np.intp)
+        lengths = np.diff(np.r_[starts, len(order)])
+        keep = pos >= np.repeat(lengths, lengths) - self._depth()
+        rows = order[keep]
+        self.history_entities_ = X[self.group_col].to_numpy()[order[ends - 1]] if len(order) else np.empty(0, dtype=object)
+        self.history_last_year_ = X[self.time_col].to_numpy()[order[ends - 1]] if len(order) else np.empty(0)
+        self.history_codes_ = codes[keep]
+        self.history_years_ = X[self.time_col].to_numpy()[rows]
+        self.history_values_ = X[self.lag_cols_].to_numpy(dtype=np.float64)[rows]
         return self
 
+    def _tail(self, X):
+        """History rows of the entities whose batch starts the year after their fitted history."""
+        if not hasattr(self, 'history_codes_') or not len(X):
+            return None
+        codes = pd.Index(self.history_entities_).get_indexer(X[self.group_col])
+        first_year = pd.Series(X[self.time_col].to_numpy()).groupby(codes).min()
+        first_year = first_year[first_year.index >= 0]
+        # Only a contiguous continuation: after a gap the tail's last row is not lag1
+        eligible = first_year.index[first_year.to_numpy() == self.history_last_year_[first_year.index] + 1]
+        mask = np.isin(self.history_codes_, eligible)
+        if not mask.any():
+            return None
+        tail = pd.DataFrame(self.history_values_[mask], columns=self.lag_cols_)
+        tail[self.group_col] = self.history_entities_[self.history_codes_[mask]]
+        tail[self.time_col] = self.history_years_[mask]
+        return tail
+
     def transform(self, X):
         # X must contain Entity and Year to perform lagging correctly.
         # We assume X is the full DataFrame passed at the start of the pipeline.
-        X_out = X.copy()
-        
-        # Sort to ensure lags are correct
-        X_out = X_out.sort_values(by=[self.group_col, self.time_col])
-        
-        for col in self.lag_cols:
-            if col in X_out.columns:
-                X_out[f'{col}_lag1'] = X_out.groupby(self.group_col)[col].shift(1)
-            else:
-                print(f"Warning: Column {col} not found for lagging.")
+        if hasattr(self, 'lag_cols_'):
+            lag_cols = self.lag_cols_
+        else:
+            lag_cols = self._present(X)
+
+        # Only the key and lag columns (plus the history tail) enter the feature kernel;
+        # lag columns missing from a forecast batch (e.g. the target) are NaN there.
+        frame = X.reindex(columns=[self.group_col, self.time_col] + lag_cols)
+        tail = self._tail(X)
+        n_tail = 0 if tail is None else len(tail)
+        if n_tail:
+            frame = pd.concat([tail, frame], ignore_index=True)
+
+        # Sort once (lags must follow time order) and build all features in one block
+        block, names, order = build_panel_features(
+            frame, lag_cols, self.lags, self.windows, self.deltas, self.group_col, self.time_col, dtype=np.float64
+        )
+        batch = order >= n_tail
+        X_out = X.iloc[order[batch] - n_tail].drop(columns=names, errors='ignore')
+        X_out = pd.concat([X_out, pd.DataFrame(block[batch], index=X_out.index, columns=names)], axis=1)
         
         # Lags introduce NaNs for the first year of each group.
         # Strategy: Impute or drop. For XGBoost, it handles NaNs, but filling with 0 or specialized imputation is safer.
@@ -135,64 +209,74 @@ class LagFeatureGenerator(BaseEstimator, TransformerMixin):
 
 # --- Pipeline Construction Functions ---
 
-def create_linear_regression_pipeline(numerical_cols, categorical_cols=['Entity']):
+def create_linear_regression_pipeline(numerical_cols, categorical_cols=['Entity'], memory=None, sparse=False):
     """
     Pipeline 1: Linear Regression (Statistical Rigor)
     - Log transforms skewed features.
     - One-Hot Encodes Country.
     - VIF Selection to remove multicollinear features.
+    - memory: optional cache (path, joblib.Memory or StageCache) for the fitted preprocessor.
+    - sparse: opt in to a scipy CSR output so the country dummies are never densified
+      (fit with fixed_effects.SparseRidge); the default dense output supports pandas output.
     """
     
     # 1. Feature Engineering: Numerical Branch
     # Log transform -> Impute -> VIF Select
     numerical_transformer = Pipeline([
         ('log_trans', FunctionTransformer(np.log1p, validate=False)),
-        ('imputer', SimpleImputer(strategy='median')),
+        ('imputer', MedianImputer()),
         ('vif_selection', VIFSelector(threshold=10.0))
     ])
 
-    categorical_transformer = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+    categorical_transformer = OneHotEncoder(sparse_output=sparse, handle_unknown='ignore')
     
     preprocessor = ColumnTransformer(
         transformers=[
             ('num_trans', numerical_transformer, numerical_cols), 
             ('cat_trans', categorical_transformer, categorical_cols) # Fixed Effects
         ],
+        sparse_threshold=1.0 if sparse else 0.0,
         verbose_feature_names_out=False
     )
     
     pipeline = Pipeline([
-        ('preprocessor', preprocessor)
-        # Imputer and VIF are now handled within the numerical branch
-    ])
+        ('preprocessor', preprocessor),
+        # Imputer and VIF are now handled within the numerical branch.
+        # Pipelines never cache their last step, so the preprocessor (and its VIF fit)
+        # is followed by a no-op step to make it cacheable through `memory`.
+        ('output', 'passthrough')
+    ], memory=memory)
     
     return pipeline
 
 
-def create_svr_pipeline(numerical_cols):
+def create_svr_pipeline(numerical_cols, memory=None, selection='pearson'):
     """
     Pipeline 2: SVR (Distance-Based Optimization)
     - Robust Scaling to handle outliers.
     - Correlation Filter to select relevant features.
+    - memory: optional cache (path, joblib.Memory or StageCache) for the fitted steps.
+    - selection: relevance score of the filter ('pearson', 'spearman' or 'mi').
     """
     # Note: SVR pipeline doesn't use OneHotEncoded Entity usually due to dimensionality explosion,
     # relying instead on feature scaling and general indicators.
     
     pipeline = Pipeline([
-        ('imputer', SimpleImputer(strategy='median')),
+        ('imputer', MedianImputer()),
         ('scaler', RobustScaler()), # Handles variance between small/large nations
-        ('selector', CorrelationSelector(threshold=0.1)) # Filtering noise
-    ])
+        ('selector', CorrelationSelector(threshold=0.1, method=selection)) # Filtering noise
+    ], memory=memory)
     
     return pipeline
 
 
-def create_xgboost_pipeline(numerical_cols, categorical_cols=['Entity']):
+def create_xgboost_pipeline(numerical_cols, categorical_cols=['Entity'], memory=None):
     """
     Pipeline 3: XGBoost (Feature Engineering Focus)
     - Lag Features.
     - Ordinal Encoding for high-cardinality categorical variables.
     - Median Imputation.
+    - memory: optional cache (path, joblib.Memory or StageCache) for the fitted steps.
     """
     
     # Note: LagFeatureGenerator works on the full DataFrame structure before splitting into num/cat strictly.
@@ -209,7 +293,7 @@ def create_xgboost_pipeline(numerical_cols, categorical_cols=['Entity']):
         transformers=[
             # Tree-based models handle Ordinal (Integer) encoding well, easier splittable than OHE
             ('cat_trans', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1), categorical_cols),
-            ('num_trans', SimpleImputer(strategy='median'), numerical_cols) # Impute numeric (including lags)
+            ('num_trans', MedianImputer(), numerical_cols) # Impute numeric (including lags)
         ],
         remainder='passthrough',
         verbose_feature_names_out=False
@@ -218,7 +302,7 @@ def create_xgboost_pipeline(numerical_cols, categorical_cols=['Entity']):
     pipeline = Pipeline([
         ('feature_generation', feature_generation), # Create 'memory' of past emissions
         ('preprocessor', preprocessor)
-    ])
+    ], memory=memory)
     
     return pipeline
 
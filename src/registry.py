@@ -0,0 +1,125 @@
+"""
+Versioned on-disk registry of fitted models.
+
+Layout: <root>/<name>/<version>/model.joblib + meta.json, with versions 1, 2, ... Each
+artifact is written uncompressed, so `joblib.load(mmap_mode='r')` memory-maps its NumPy
+arrays (coefficients, Gram matrices, cluster centers) instead of copying them; processes
+serving the same version share those pages. `get` hot-loads: a request for the latest
+version picks up a newly registered one without restarting the server.
+
+Example:
+    registry = ModelRegistry('models')
+    registry.register('ridge', make_pipeline(lr_preprocessor, ridge), metadata={'features': cols})
+    model = registry.get('ridge')  # latest version, reloaded when a new one appears
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+import joblib
+
+MODEL_FILE = 'model.joblib'
+META_FILE = 'meta.json'
+
+
+class ModelRegistry:
+    """
+    Args:
+        root (str): Registry directory.
+        mmap_mode (str): joblib mmap mode for loaded arrays ('r'; None loads copies).
+        check_interval (float): Seconds between checks for a newer version in `get`.
+    """
+    def __init__(self, root='models', mmap_mode='r', check_interval=1.0):
+        self.root = root
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._loaded = {}  # (name, version) -> (model, metadata)
+        self._latest = {}  # name -> (version, checked at)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def names(self):
+        """Registered model names."""
+        return sorted(n for n in os.listdir(self.root) if self.versions(n))
+
+    def versions(self, name):
+        """Sorted versions of a model (complete artifacts only)."""
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return []
+        return sorted(int(v) for v in os.listdir(path)
+                      if v.isdigit() and os.path.exists(os.path.join(path, v, META_FILE)))
+
+    def latest(self, name):
+        versions = self.versions(name)
+        if not versions:
+            raise KeyError(f"No model registered under '{name}' in {self.root}")
+        return versions[-1]
+
+    def _dir(self, name, version):
+        return os.path.join(self.root, name, str(version))
+
+    def register(self, name, model, metadata=None):
+        """
+        Saves a fitted model (e.g. a Pipeline of a fitted create_*_pipeline preprocessor and
+        the estimator) as the next version.
+
+        metadata may hold 'features' (input columns, in order) and 'cluster_col' (for
+        models whose predict takes clusters, like ClusterEnsembleRegressor).
+
+        Returns:
+            int: The new version.
+        """
+        os.makedirs(os.path.join(self.root, name), exist_ok=True)
+        version = (self.versions(name) or [0])[-1] + 1
+        tmp = os.path.join(self.root, name, f'.tmp-{version}-{os.getpid()}')
+        os.makedirs(tmp, exist_ok=True)
+        joblib.dump(model, os.path.join(tmp, MODEL_FILE))
+        meta = {'name': name, 'version': version, 'model': type(model).__name__,
+                'registered_at': time.strftime('%Y-%m-%dT%H:%M:%S'), **(metadata or {})}
+        with open(os.path.join(tmp, META_FILE), 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+        # The version only becomes visible (meta.json present) once complete
+        os.replace(tmp, self._dir(name, version))
+        return version
+
+    def metadata(self, name, version=None):
+        version = self.latest(name) if version is None else version
+        with open(os.path.join(self._dir(name, version), META_FILE)) as f:
+            return json.load(f)
+
+    def load(self, name, version=None):
+        """Loads (model, metadata) from disk, arrays memory-mapped."""
+        version = self.latest(name) if version is None else version
+        model = joblib.load(os.path.join(self._dir(name, version), MODEL_FILE), mmap_mode=self.mmap_mode)
+        return model, self.metadata(name, version)
+
+    def get(self, name, version=None):
+        """
+        Cached (model, metadata); without a version, the latest one, re-checked at most every
+        check_interval seconds so new registrations are hot-loaded.
+        """
+        with self._lock:
+            if version is None:
+                cached, checked = self._latest.get(name, (None, 0.0))
+                now = time.monotonic()
+                if cached is None or now - checked >= self.check_interval:
+                    cached = self.latest(name)
+                    self._latest[name] = (cached, now)
+                version = cached
+            key = (name, version)
+            if key not in self._loaded:
+                self._loaded[key] = self.load(name, version)
+                # Older versions of this model are no longer served
+                for old in [k for k in self._loaded if k[0] == name and k[1] < version]:
+                    del self._loaded[old]
+            return self._loaded[key]
+
+    def remove(self, name, version):
+        """Deletes one version."""
+        with self._lock:
+            self._loaded.pop((name, version), None)
+            self._latest.pop(name, None)
+        shutil.rmtree(self._dir(name, version))
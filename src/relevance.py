@@ -0,0 +1,178 @@
+import numpy as np
+
+# Columns processed together; keeps every temporary at (rows x BLOCK)
+BLOCK = 256
+
+
+def _as_float(X, y):
+    """Float64 X (rows x features) and y, restricted to rows with a target."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64).ravel()
+    if X.ndim == 1:
+        X = X[:, None]
+    has_y = ~np.isnan(y)
+    if not has_y.all():
+        X, y = X[has_y], y[has_y]
+    return X, y
+
+
+def _blocks(n_cols):
+    for start in range(0, n_cols, BLOCK):
+        yield slice(start, min(start + BLOCK, n_cols))
+
+
+def average_ranks(X):
+    """
+    Average ranks (1-based, ties share their mean rank) of every column; NaN stays NaN.
+
+    Same result as scipy.stats.rankdata(X, axis=0, nan_policy='omit'), from one sort per
+    column: ties are found as runs in the sorted values and ranked all at once.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        return average_ranks(X[:, None])[:, 0]
+    n, p = X.shape
+    ranks = np.empty((n, p))
+    for sl in _blocks(p):
+        cols = np.ascontiguousarray(X[:, sl].T)  # one row per column
+        order = np.argsort(cols, axis=1, kind='stable')
+        xs = np.take_along_axis(cols, order, axis=1)
+        new_run = np.ones_like(xs, dtype=bool)
+        new_run[:, 1:] = xs[:, 1:] != xs[:, :-1]  # NaN != NaN: every NaN is its own run
+        run = np.cumsum(new_run.ravel()) - 1
+        run_length = np.bincount(run)
+        run_start = np.tile(np.arange(n), len(cols))[new_run.ravel()]
+        sorted_ranks = (run_start[run] + (run_length[run] + 1) / 2).reshape(xs.shape)
+        block = np.empty_like(cols)
+        np.put_along_axis(block, order, sorted_ranks, axis=1)
+        block[np.isnan(cols)] = np.nan
+        ranks[:, sl] = block.T
+    return ranks
+
+
+def _pearson(X, y):
+    """
+    Pearson correlation of every column with y (matrix-vector products per column block).
+
+    Missing values are dropped pairwise (per column), as DataFrame.corrwith does. Columns
+    are centered first, so the sums below do not cancel for large-valued features.
+    """
+    yc = y - y.mean()
+    r = np.empty(X.shape[1])
+    for sl in _blocks(X.shape[1]):
+        Xb = X[:, sl]
+        mask = ~np.isnan(Xb)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if mask.all():
+                Xc = Xb - Xb.mean(axis=0)
+                cov = Xc.T @ yc
+                var_x = np.einsum('ij,ij->j', Xc, Xc)
+                var_y = yc @ yc
+            else:
+                M = mask.astype(np.float64)
+                Xc = np.where(mask, Xb - np.nanmean(Xb, axis=0), 0.0)
+                n, sx, sy = M.sum(axis=0), Xc.sum(axis=0), M.T @ yc
+                cov = Xc.T @ yc - sx * sy / n
+                var_x = np.einsum('ij,ij->j', Xc, Xc) - sx ** 2 / n
+                var_y = M.T @ yc ** 2 - sy ** 2 / n
+            r[sl] = cov / np.sqrt(var_x * var_y)
+        # Constant columns have no correlation (centering leaves rounding noise, not zeros)
+        spread = np.nanmax(Xb, axis=0, initial=-np.inf) - np.nanmin(Xb, axis=0, initial=np.inf)
+        r[sl][~(spread > 0)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def _spearman(X, y):
+    """
+    Spearman correlation of every column with y over pairwise-complete rows (as corrwith).
+
+    Complete columns share the ranks of y. For a column with missing values y is re-ranked
+    over that column's rows only; a block of such columns is handled at once by ranking
+    copies of y masked like the block.
+    """
+    r = _pearson(average_ranks(X), average_ranks(y))
+    gaps = np.flatnonzero(np.isnan(X).any(axis=0))
+    for start in range(0, len(gaps), BLOCK):
+        cols = gaps[start:start + BLOCK]
+        xr = average_ranks(X[:, cols])
+        valid = ~np.isnan(xr)
+        yr = average_ranks(np.where(valid, y[:, None], np.nan))
+        n = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            xc = np.where(valid, xr - np.where(valid, xr, 0.0).sum(axis=0) / n, 0.0)
+            yc = np.where(valid, yr - np.where(valid, yr, 0.0).sum(axis=0) / n, 0.0)
+            rb = np.einsum('ij,ij->j', xc, yc) / np.sqrt(np.einsum('ij,ij->j', xc, xc) * np.einsum('ij,ij->j', yc, yc))
+        # Constant columns (all ranks tied) have no correlation
+        spread = np.nanmax(xr, axis=0, initial=-np.inf) - np.nanmin(xr, axis=0, initial=np.inf)
+        rb[~(spread > 0)] = np.nan
+        r[cols] = rb
+    return np.clip(r, -1.0, 1.0)
+
+
+def target_correlations(X, y, method='pearson'):
+    """
+    Correlation of every column of X with the target, computed for all columns at once.
+
+    Args:
+        method (str): 'pearson', or 'spearman' (Pearson on average ranks, taken over the
+            rows where both the column and y are present, as corrwith(method='spearman')).
+
+    Returns:
+        np.ndarray: One correlation per column (NaN for constant columns).
+    """
+    X, y = _as_float(X, y)
+    if method == 'spearman':
+        return _spearman(X, y)
+    if method != 'pearson':
+        raise ValueError(f"method must be 'pearson' or 'spearman', got {method!r}")
+    return _pearson(X, y)
+
+
+def _quantile_bins(X, bins):
+    """Equal-frequency bin (0..bins-1) of every value from its within-column rank; -1 for NaN."""
+    ranks = average_ranks(X)
+    n = np.sum(~np.isnan(X), axis=0)
+    with np.errstate(invalid='ignore'):
+        codes = np.floor((ranks - 1) * bins / np.maximum(n, 1))
+    return np.where(np.isnan(codes), -1, np.minimum(codes, bins - 1)).astype(np.intp)
+
+
+def mutual_information(X, y, bins=None):
+    """
+    Histogram estimate of the mutual information (nats) of every column with the target.
+
+    Every feature and the target are cut into `bins` equal-frequency bins (default
+    ~cbrt(n / 5), between 4 and 32). The joint histograms of a block of features are
+    filled by a single bincount over (column, feature bin, target bin) codes, so the cost
+    is one sort per column plus O(n p). The Miller-Madow bias (bins - 1)^2 / 2n is
+    subtracted, so independent features score ~0.
+
+    Returns:
+        np.ndarray: MI per column (>= 0).
+    """
+    X, y = _as_float(X, y)
+    n, p = X.shape
+    if bins is None:
+        bins = int(np.clip(np.cbrt(n / 5), 4, 32))
+    y_bins = _quantile_bins(y[:, None], bins)[:, 0]
+
+    mi = np.empty(p)
+    for sl in _blocks(p):
+        x_bins = _quantile_bins(X[:, sl], bins)
+        k = x_bins.shape[1]
+        valid = x_bins >= 0
+        codes = (np.arange(k) * bins * bins)[None, :] + x_bins * bins + y_bins[:, None]
+        joint = np.bincount(codes[valid], minlength=k * bins * bins).reshape(k, bins, bins).astype(np.float64)
+        totals = joint.sum(axis=(1, 2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pxy = joint / totals[:, None, None]
+            px = pxy.sum(axis=2, keepdims=True)
+            py = pxy.sum(axis=1, keepdims=True)
+            terms = np.where(pxy > 0, pxy * np.log(pxy / (px * py)), 0.0)
+        mi[sl] = terms.sum(axis=(1, 2)) - (bins - 1) ** 2 / (2 * np.maximum(totals, 1))
+    return np.maximum(mi, 0.0)
+
+
+def information_coefficient(mi):
+    """MI on the |correlation| scale: sqrt(1 - exp(-2 MI)), which equals |r| for Gaussian data."""
+    return np.sqrt(1 - np.exp(-2 * np.asarray(mi)))
@@ -0,0 +1,368 @@
+"""
+Local prediction service for registered models (see registry.py).
+
+Concurrent requests for the same model are micro-batched: a worker thread collects the
+requests that arrive within `max_wait_ms` (up to `max_batch` rows), builds one DataFrame,
+runs the model's preprocessing + predict once and hands every caller its slice. Latency
+(p50/p99) and throughput are recorded per model.
+
+The preprocessing must be row-wise (the fitted LR/SVR pipelines); XGBoost models are
+served on already-lagged features, since LagFeatureGenerator reorders rows.
+
+Usage (from the repository root):
+    python src/serving.py list
+    python src/serving.py register hybrid data/results/hybrid_tuned.joblib
+    python src/serving.py predict hybrid data/processed/lr_final_prep.csv predictions.csv
+    python src/serving.py serve --port 8000
+    python src/serving.py loadtest hybrid data/processed/lr_final_prep.csv --requests 2000 --concurrency 16
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from registry import ModelRegistry
+
+
+class LatencyStats:
+    """Thread-safe latency/throughput recorder over the last `window` requests."""
+    def __init__(self, window=10000):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def record(self, latency, n_rows):
+        with self._lock:
+            self._latencies.append(latency)
+            self.requests += 1
+            self.rows += n_rows
+
+    def summary(self):
+        """p50/p99 latency (ms), requests/s and rows/s since start, mean batch size."""
+        with self._lock:
+            latencies = np.array(self._latencies)
+            elapsed = time.perf_counter() - self.started
+            requests, rows, batches = self.requests, self.rows, self.batches
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if len(latencies) else (np.nan, np.nan)
+        return {
+            'requests': requests,
+            'p50_ms': float(p50),
+            'p99_ms': float(p99),
+            'requests_per_s': requests / elapsed if elapsed > 0 else 0.0,
+            'rows_per_s': rows / elapsed if elapsed > 0 else 0.0,
+            'mean_batch_requests': requests / batches if batches else 0.0,
+        }
+
+
+def _to_frame(payload):
+    return payload if isinstance(payload, pd.DataFrame) else pd.DataFrame(payload)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent predict requests into single vectorized calls.
+
+    Args:
+        predict_fn: Callable DataFrame -> predictions (one per row).
+        max_batch (int): Maximum rows per batch.
+        max_wait_ms (float): How long the first request of a batch waits for others.
+
+    When the batched call fails (e.g. one request lacks a feature), every request of the
+    batch is retried on its own, so the error only reaches the requests that cause it.
+    """
+    def __init__(self, predict_fn, max_batch=1024, max_wait_ms=2.0, stats=None):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.stats = stats or LatencyStats()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, payload):
+        """Queues a DataFrame or list of records; returns a Future of its predictions."""
+        future = Future()
+        self._queue.put((payload, future, time.perf_counter()))
+        return future
+
+    def predict(self, payload, timeout=None):
+        return self.submit(payload).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while rows < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _predict(self, payloads):
+        """Predictions for the payloads' rows, concatenated, from one predict_fn call."""
+        if all(isinstance(p, list) for p in payloads):
+            frame = pd.DataFrame([record for p in payloads for record in p])
+        else:
+            frame = pd.concat([_to_frame(p) for p in payloads], ignore_index=True)
+        preds = np.asarray(self.predict_fn(frame), dtype=np.float64)
+        self.stats.batches += 1
+        return preds
+
+    def _serve(self, batch):
+        try:
+            preds = self._predict([payload for payload, _, _ in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+            else:  # retry each request alone, so only the bad ones get an error
+                for item in batch:
+                    self._serve([item])
+            return
+        start = 0
+        done = time.perf_counter()
+        for payload, future, submitted in batch:
+            end = start + len(payload)
+            future.set_result(preds[start:end])
+            self.stats.record(done - submitted, end - start)
+            start = end
+
+    def _run(self):
+        while True:
+            self._serve(self._collect())
+
+
+def predict_frame(model, metadata, frame):
+    """Runs a registered model on a DataFrame (feature order and cluster routing from its metadata)."""
+    cluster_col = metadata.get('cluster_col')
+    clusters = frame[cluster_col] if cluster_col else None
+    if metadata.get('features'):
+        frame = frame[metadata['features']]
+    if cluster_col:
+        return model.predict(frame, clusters=clusters)
+    return model.predict(frame)
+
+
+class PredictionService:
+    """
+    Micro-batched predictions for every model in a registry (latest versions, hot-loaded).
+
+    Example:
+        service = PredictionService(ModelRegistry('models'))
+        service.predict('ridge', [{'Entity': 'Vietnam', 'gdp_per_capita': 3500.0, ...}])
+        service.stats()
+    """
+    def __init__(self, registry, max_batch=1024, max_wait_ms=2.0):
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def _batcher(self, name):
+        with self._lock:
+            if name not in self._batchers:
+                self.registry.get(name)  # fail fast on unknown models
+
+                def predict_fn(frame, name=name):
+                    model, metadata = self.registry.get(name)
+                    return predict_frame(model, metadata, frame)
+                self._batchers[name] = MicroBatcher(predict_fn, self.max_batch, self.max_wait_ms)
+            return self._batchers[name]
+
+    def predict(self, name, payload, timeout=30.0):
+        return self._batcher(name).predict(payload, timeout)
+
+    def models(self):
+        return {name: self.registry.metadata(name) for name in self.registry.names()}
+
+    def stats(self):
+        return {name: batcher.stats.summary() for name, batcher in self._batchers.items()}
+
+
+class LocalClient:
+    """In-process stand-in for HTTPClient (same interface, no network)."""
+    def __init__(self, service):
+        self.service = service
+
+    def predict(self, name, records):
+        return self.service.predict(name, records)
+
+
+class HTTPClient:
+    """Client of `serving.py serve`."""
+    def __init__(self, url='http://127.0.0.1:8000', timeout=30.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def predict(self, name, records):
+        body = json.dumps({'records': records}).encode()
+        request = urllib.request.Request(f'{self.url}/predict/{name}', data=body,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return np.asarray(json.loads(response.read())['predictions'], dtype=np.float64)
+
+
+def make_server(service, host='127.0.0.1', port=8000):
+    """
+    Threaded HTTP server: POST /predict/<name> {"records": [...]}, GET /models, GET /stats.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/models':
+                self._send(200, service.models())
+            elif self.path == '/stats':
+                self._send(200, service.stats())
+            else:
+                self._send(404, {'error': f'unknown path {self.path}'})
+
+        def do_POST(self):
+            if not self.path.startswith('/predict/'):
+                return self._send(404, {'error': f'unknown path {self.path}'})
+            name = self.path[len('/predict/'):]
+            # The name becomes a registry path that is unpickled: only registered names pass
+            unsafe = '/' in name or '\\' in name or os.sep in name or '..' in name
+            if unsafe or name not in service.registry.names():
+                return self._send(404, {'error': f'unknown model {name}'})
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                records = json.loads(self.rfile.read(length))['records']
+                preds = service.predict(name, records)
+            except Exception as exc:
+                return self._send(400, {'error': f'{type(exc).__name__}: {exc}'})
+            self._send(200, {'model': name, 'predictions': preds.tolist()})
+
+        def log_message(self, format, *args):
+            pass  # one line per request would dominate the load test
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def load_test(client, name, records, n_requests=1000, concurrency=16, rows_per_request=1, seed=0):
+    """
+    Fires n_requests predict calls from `concurrency` threads, each with rows_per_request
+    records sampled from `records`.
+
+    Returns:
+        dict: Client-side p50/p99 latency (ms) and throughput.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(len(records), size=(n_requests, rows_per_request))
+    stats = LatencyStats(window=n_requests)
+
+    def call(rows):
+        payload = [records[i] for i in rows]
+        start = time.perf_counter()
+        client.predict(name, payload)
+        stats.record(time.perf_counter() - start, len(payload))
+
+    stats.started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, picks))
+    summary = stats.summary()
+    del summary['mean_batch_requests']
+    print(f"Load test '{name}': {n_requests} requests x {rows_per_request} rows, concurrency {concurrency}: "
+          f"p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms, "
+          f"{summary['requests_per_s']:.0f} req/s ({summary['rows_per_s']:.0f} rows/s)")
+    return summary
+
+
+def _records(path, n=None):
+    """JSON-safe records of a CSV (NaN -> None)."""
+    df = pd.read_csv(path, nrows=n)
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve registered models.')
+    parser.add_argument('--registry', default='models')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('list')
+    p = sub.add_parser('register')
+    p.add_argument('name')
+    p.add_argument('artifact', help='joblib file of a fitted model or pipeline')
+    p.add_argument('--features', help='comma-separated input columns')
+    p.add_argument('--cluster-col')
+    p = sub.add_parser('predict')
+    p.add_argument('name')
+    p.add_argument('input')
+    p.add_argument('output')
+    p = sub.add_parser('serve')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8000)
+    p.add_argument('--max-batch', type=int, default=1024)
+    p.add_argument('--max-wait-ms', type=float, default=2.0)
+    p = sub.add_parser('loadtest')
+    p.add_argument('name')
+    p.add_argument('input', help='CSV with request rows')
+    p.add_argument('--url', help='test a running server instead of an in-process service')
+    p.add_argument('--requests', type=int, default=1000)
+    p.add_argument('--concurrency', type=int, default=16)
+    p.add_argument('--rows', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry)
+    if args.command == 'list':
+        for name in registry.names():
+            meta = registry.metadata(name)
+            print(f"{name}: v{meta['version']} ({meta['model']}, {meta['registered_at']}), versions {registry.versions(name)}")
+    elif args.command == 'register':
+        metadata = {}
+        if args.features:
+            metadata['features'] = args.features.split(',')
+        if args.cluster_col:
+            metadata['cluster_col'] = args.cluster_col
+        version = registry.register(args.name, joblib.load(args.artifact), metadata)
+        print(f"Registered {args.name} v{version}")
+    elif args.command == 'predict':
+        model, metadata = registry.load(args.name)
+        df = pd.read_csv(args.input)
+        df['Prediction'] = predict_frame(model, metadata, df)
+        df.to_csv(args.output, index=False)
+        print(f"Wrote {len(df)} predictions to {args.output}")
+    elif args.command == 'serve':
+        service = PredictionService(registry, args.max_batch, args.max_wait_ms)
+        server = make_server(service, args.host, args.port)
+        print(f"Serving {registry.names()} on http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(json.dumps(service.stats(), indent=2))
+    elif args.command == 'loadtest':
+        if args.url:
+            client = HTTPClient(args.url)
+        else:
+            service = PredictionService(registry)
+            client = LocalClient(service)
+        load_test(client, args.name, _records(args.input), args.requests, args.concurrency, args.rows)
+        if not args.url:
+            print(json.dumps(service.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
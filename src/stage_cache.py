@@ -0,0 +1,175 @@
+import functools
+import hashlib
+import inspect
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+
+def _update_hash(digest, obj):
+    """Feeds obj into digest; DataFrames and arrays are hashed from their data, not pickled."""
+    if isinstance(obj, pd.DataFrame):
+        digest.update(b'DataFrame')
+        digest.update(repr((list(obj.columns), [str(t) for t in obj.dtypes])).encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+        except TypeError:  # unhashable cells (lists, dicts)
+            digest.update(joblib.hash(obj).encode())
+    elif isinstance(obj, pd.Series):
+        digest.update(b'Series')
+        digest.update(repr((obj.name, str(obj.dtype))).encode())
+        _update_hash(digest, obj.to_frame())
+    elif isinstance(obj, np.ndarray) and obj.dtype != object:
+        digest.update(b'ndarray')
+        digest.update(repr((obj.shape, str(obj.dtype))).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        digest.update(type(obj).__name__.encode())
+        for item in obj:
+            _update_hash(digest, item)
+    elif isinstance(obj, dict):
+        digest.update(b'dict')
+        for key in sorted(obj, key=repr):
+            digest.update(repr(key).encode())
+            _update_hash(digest, obj[key])
+    else:
+        # Estimators, scalars, strings...: joblib hashes their pickled state
+        digest.update(joblib.hash(obj).encode())
+
+
+def _code_token(code):
+    """Bytecode and constants of a code object (nested functions included, no addresses)."""
+    consts = [_code_token(c) if inspect.iscode(c) else repr(c) for c in code.co_consts]
+    return code.co_code.hex() + repr(consts)
+
+
+def _func_token(func):
+    """Identifies a function by name and bytecode, so editing a stage invalidates its entries."""
+    code = getattr(func, '__code__', None)
+    token = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+    if code is not None:
+        token += _code_token(code)
+    return token
+
+
+class StageCache:
+    """
+    Content-addressed, size-capped disk cache for preprocessing stages.
+
+    Results are keyed by a hash of the stage function, its input data and its parameters,
+    and evicted least-recently-used once the cache exceeds `max_bytes`. It also has the
+    joblib.Memory `cache` interface, so it can be passed as `Pipeline(memory=...)`
+    (see the create_*_pipeline functions).
+
+    Example:
+        cache = StageCache('data/cache')
+        df = cache.run(remove_high_vif, df, TARGET, threshold=10)
+        cache.report()
+    """
+    def __init__(self, location='data/cache', max_bytes=2 * 1024 ** 3, verbose=False):
+        self.location = location
+        self.max_bytes = max_bytes
+        self.verbose = verbose
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(location, exist_ok=True)
+
+    def _key(self, func, args, kwargs, ignore=()):
+        try:
+            bound = inspect.signature(func).bind(*args, **kwargs)
+            bound.apply_defaults()
+            items = [(k, v) for k, v in bound.arguments.items() if k not in ignore]
+        except (TypeError, ValueError):  # builtins without a signature
+            items = [('args', args), ('kwargs', kwargs)]
+        digest = hashlib.sha256(_func_token(func).encode())
+        for name, value in items:
+            digest.update(name.encode())
+            _update_hash(digest, value)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.location, f'{key}.pkl')
+
+    def run(self, func, *args, _ignore=(), **kwargs):
+        """Returns func(*args, **kwargs), from disk if this exact call was cached before."""
+        key = self._key(func, args, kwargs, _ignore)
+        path = self._path(key)
+        name = getattr(func, '__name__', repr(func))
+        if os.path.exists(path):
+            try:
+                result = joblib.load(path)
+            except Exception:
+                pass  # corrupted or incompatible entry, recompute
+            else:
+                os.utime(path)  # mark as recently used
+                self.hits += 1
+                if self.verbose:
+                    print(f"[StageCache] hit  {name} ({key[:12]})")
+                return result
+
+        self.misses += 1
+        if self.verbose:
+            print(f"[StageCache] miss {name} ({key[:12]})")
+        result = func(*args, **kwargs)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        joblib.dump(result, tmp)
+        os.replace(tmp, path)
+        self.evict()
+        return result
+
+    def cache(self, func=None, ignore=None, **_):
+        """joblib.Memory-compatible decorator: `cache.cache(func)(*args)` memoizes func."""
+        if func is None:
+            return functools.partial(self.cache, ignore=ignore)
+        ignore = tuple(ignore or ())
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(func, *args, _ignore=ignore, **kwargs)
+        return wrapper
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.location):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.location, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return sorted(entries)
+
+    def size(self):
+        """Total bytes currently cached."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Deletes least-recently-used entries until the cache fits in max_bytes."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.location, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Removes every cached entry and resets the statistics."""
+        for _, _, name in self._entries():
+            os.remove(os.path.join(self.location, name))
+        self.hits = self.misses = 0
+
+    def report(self):
+        """Prints and returns hit/miss statistics."""
+        entries = self._entries()
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
+        print(f"StageCache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024 ** 2:.1f} MB)")
+        return stats
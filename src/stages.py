@@ -0,0 +1,213 @@
+"""
+Stages of the project workflow, for the DAG runner in workflow.py.
+
+    raw --+-- clean (global-data-imputed)
+          +-- common --+-- prep_lr --+-- eval_lr ------+
+                       |             +-- eval_hybrid --+
+                       +-- prep_svr ---- eval_svr -----+-- compare (model_comparison.csv)
+                       +-- prep_xgb ---- eval_xgb -----+
+                       +-------------- eval_pipelines -+
+
+The preparation stages reproduce notebooks_new/02_Data_Preprocessing (the files in
+data/processed, lr_final_prep.csv indexed by Row_ID as there); the evaluation stages fit
+the phase 1-4 models on the same time split (train < 2015, test >= 2015) and write their
+metrics as JSON.
+
+Every stage function takes its input / output paths as keyword arguments and must stay at
+module level (it is pickled to the worker processes).
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import RobustScaler, StandardScaler
+from xgboost import XGBRegressor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preprocessing'))
+from data_store import ROW_ID, save_dataset
+from evaluation import panel_metrics
+from fixed_effects import SparseRidge
+from hybrid import HybridResidualRegressor
+from incremental import PanelUpdater, read_raw
+from kernel_svr import create_svr_model
+from outliers import entity_labels
+from preprocess import preprocess_data
+from preprocessing import WHITELIST, encode_features, load_data, remove_outliers
+from workflow import Stage
+
+TARGET = 'Value_co2_emissions_kt_by_country'
+SPLIT_YEAR = 2015
+SKEWED_COLS = ['Financial flows to developing countries (US $)', 'Electricity from fossil fuels (TWh)',
+               'Electricity from nuclear (TWh)', 'Electricity from renewables (TWh)']
+
+
+# --- Preparation stages ---
+
+def clean_raw(raw, out):
+    preprocess_data(raw, out)
+
+
+def build_common(raw, out, state):
+    """Median imputation + lags (see incremental.PanelUpdater); saves the update state too."""
+    updater = PanelUpdater()
+    df = updater.fit(read_raw(raw))
+    df.to_csv(out, index=False)
+    save_dataset(df, out)
+    updater.save(state)
+
+
+def _drop_2020_log_outliers(df):
+    """Shared LR / SVR steps: drop 2020, log1p the skewed columns, target IQR filter with whitelist."""
+    df = df[df['Year'] != 2020].copy()
+    for col in SKEWED_COLS:
+        if col in df.columns:
+            df[col] = np.log1p(df[col].clip(lower=0))
+    others = [c for c in df.columns if c != TARGET]
+    return remove_outliers(df, threshold=1.5, exclude_cols=others, whitelist_entities=WHITELIST)
+
+
+def _encode_entity(df):
+    """Entity -> Entity_Encoded (ordinal codes, sorted by name), as the last column."""
+    df = encode_features(df, method='ordinal')
+    df['Entity_Encoded'] = df.pop('Entity').astype(np.int64)
+    return df
+
+
+def _save(df, out, **to_csv):
+    df.to_csv(out, **{'index': False, **to_csv})
+    save_dataset(pd.read_csv(out), out)
+
+
+def prepare_lr(common, out):
+    """One-hot Entity + StandardScaler; Row_ID is the row of common_preprocessed."""
+    df = _drop_2020_log_outliers(load_data(common))
+    df = encode_features(df, method='onehot', drop_first=False)
+    scale_cols = [c for c in df.columns if c not in [TARGET, 'Year'] and not c.startswith('Entity_')]
+    df[scale_cols] = StandardScaler().fit_transform(df[scale_cols])
+    _save(df, out, index=True, index_label=ROW_ID)
+
+
+def prepare_svr(common, out):
+    """Ordinal Entity + RobustScaler."""
+    df = _encode_entity(_drop_2020_log_outliers(load_data(common)))
+    scale_cols = [c for c in df.columns if c not in [TARGET, 'Year', 'Entity_Encoded']]
+    df[scale_cols] = RobustScaler().fit_transform(df[scale_cols])
+    _save(df, out)
+
+
+def prepare_xgb(common, out):
+    """Ordinal Entity, no scaling or outlier removal."""
+    _save(_encode_entity(load_data(common)), out)
+
+
+# --- Evaluation stages ---
+
+def _split(df, entity_col):
+    """Train / test features, targets and test entities for the time split."""
+    features = [c for c in df.columns if c not in (TARGET, 'Year', 'Entity')]
+    train, test = df['Year'] < SPLIT_YEAR, df['Year'] >= SPLIT_YEAR
+    entities = entity_labels(df) if entity_col is None else df[entity_col].to_numpy()
+    return (df.loc[train, features].to_numpy(dtype=np.float64), df.loc[train, TARGET].to_numpy(),
+            df.loc[test, features].to_numpy(dtype=np.float64), df.loc[test, TARGET].to_numpy(), entities[test.to_numpy()])
+
+
+def _write_metrics(model, y_test, y_pred, entities, out):
+    row = panel_metrics(y_test, y_pred, entities, names=[model]).reset_index().iloc[0]
+    with open(out, 'w') as f:
+        json.dump({k: (v.item() if hasattr(v, 'item') else v) for k, v in row.items()}, f, indent=2)
+    print(f"{model}: R2 {row['R2']:.4f}, Median MAPE {row['Median MAPE']:.2f}")
+
+
+def evaluate_lr(data, out, alpha=10.0):
+    X_train, y_train, X_test, y_test, entities = _split(load_data(data), None)
+    model = Ridge(alpha=alpha).fit(X_train, y_train)
+    _write_metrics('Ridge', y_test, model.predict(X_test), entities, out)
+
+
+def evaluate_svr(data, out, mode='exact', C=10, epsilon=0.1):
+    X_train, y_train, X_test, y_test, entities = _split(load_data(data), 'Entity_Encoded')
+    model = create_svr_model(mode, C=C, epsilon=epsilon).fit(X_train, y_train)
+    _write_metrics('SVR', y_test, model.predict(X_test), entities, out)
+
+
+def evaluate_xgb(data, out, n_estimators=100, max_depth=6, learning_rate=0.1):
+    X_train, y_train, X_test, y_test, entities = _split(load_data(data), 'Entity_Encoded')
+    model = XGBRegressor(n_estimators=n_estimators, max_depth=max_depth, learning_rate=learning_rate,
+                         random_state=42, n_jobs=1).fit(X_train, y_train)
+    _write_metrics('XGBoost', y_test, model.predict(X_test), entities, out)
+
+
+def evaluate_hybrid(data, params, out):
+    """Ridge + XGBoost on residuals with the tuned parameters (best_hyperparameters.json)."""
+    with open(params) as f:
+        best = json.load(f)
+    X_train, y_train, X_test, y_test, entities = _split(load_data(data), None)
+    model = HybridResidualRegressor(alpha=best['Ridge']['alpha'],
+                                    xgb_params={**best['XGBoost'], 'random_state': 42, 'n_jobs': 1})
+    model.fit(X_train, y_train)
+    _write_metrics('Hybrid', y_test, model.predict(X_test), entities, out)
+
+
+def evaluate_pipelines(common, out):
+    """The sklearn pipelines of preprocessing/pipelines.py, fit on train only (no leakage)."""
+    from pipelines import create_linear_regression_pipeline, create_svr_pipeline
+
+    df = load_data(common)
+    numerical = [c for c in df.select_dtypes(include=[np.number]).columns if c not in (TARGET, 'Year')]
+    train, test = df[df['Year'] < SPLIT_YEAR], df[df['Year'] >= SPLIT_YEAR]
+    results = {}
+    lr_prep = create_linear_regression_pipeline(numerical, sparse=True)
+    lr = SparseRidge(alpha=10.0).fit(lr_prep.fit_transform(train), train[TARGET].to_numpy())
+    results['LR pipeline'] = lr.predict(lr_prep.transform(test))
+    svr_prep = create_svr_pipeline(numerical)
+    svr = create_svr_model('exact').fit(svr_prep.fit_transform(train[numerical], train[TARGET]), train[TARGET])
+    results['SVR pipeline'] = svr.predict(svr_prep.transform(test[numerical]))
+    scores = panel_metrics(test[TARGET].to_numpy(), np.column_stack(list(results.values())),
+                           test['Entity'].to_numpy(), names=list(results))
+    scores.reset_index().to_json(out, orient='records', indent=2)
+    print(scores.to_string())
+
+
+def compare(metrics, out):
+    """Collects the metrics files into one table, best R2 first."""
+    rows = []
+    for path in metrics:
+        with open(path) as f:
+            data = json.load(f)
+        rows.extend(data if isinstance(data, list) else [data])
+    table = pd.DataFrame(rows).sort_values('R2', ascending=False)
+    table.to_csv(out, index=False)
+    print(table.to_string(index=False))
+
+
+def build_stages(data_dir='data'):
+    """The workflow's stages, with every path under data_dir."""
+    raw = os.path.join(data_dir, 'raw', 'global-data-on-sustainable-energy.csv')
+
+    def processed(name):
+        return os.path.join(data_dir, 'processed', name)
+
+    def results(name):
+        return os.path.join(data_dir, 'results', name)
+
+    common, lr, svr, xgb = (processed(f) for f in ('common_preprocessed.csv', 'lr_final_prep.csv',
+                                                    'svr_final_prep.csv', 'xgb_final_prep.csv'))
+    metrics = {name: results(f'metrics_{name}.json') for name in ('lr', 'svr', 'xgb', 'hybrid', 'pipelines')}
+    return [
+        Stage('clean', clean_raw, {'raw': raw}, {'out': processed('global-data-imputed.csv')}),
+        Stage('common', build_common, {'raw': raw},
+              {'out': common, 'state': processed('common_update_state.joblib')}),
+        Stage('prep_lr', prepare_lr, {'common': common}, {'out': lr}),
+        Stage('prep_svr', prepare_svr, {'common': common}, {'out': svr}),
+        Stage('prep_xgb', prepare_xgb, {'common': common}, {'out': xgb}),
+        Stage('eval_lr', evaluate_lr, {'data': lr}, {'out': metrics['lr']}, {'alpha': 10.0}),
+        Stage('eval_svr', evaluate_svr, {'data': svr}, {'out': metrics['svr']}, {'mode': 'exact'}),
+        Stage('eval_xgb', evaluate_xgb, {'data': xgb}, {'out': metrics['xgb']}),
+        Stage('eval_hybrid', evaluate_hybrid, {'data': lr, 'params': results('best_hyperparameters.json')},
+              {'out': metrics['hybrid']}),
+        Stage('eval_pipelines', evaluate_pipelines, {'common': common}, {'out': metrics['pipelines']}),
+        Stage('compare', compare, {'metrics': list(metrics.values())}, {'out': results('model_comparison.csv')}),
+    ]
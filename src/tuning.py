@@ -0,0 +1,149 @@
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.metrics import r2_score
+from sklearn.model_selection import TimeSeriesSplit
+from xgboost import XGBRegressor
+
+
+def cpu_budget(n_tasks, n_jobs=None):
+    """
+    Splits a CPU budget between outer (parallel fits) and inner (XGBoost threads) parallelism.
+
+    Using n_jobs=-1 on both GridSearchCV and XGBRegressor starts cores x cores threads;
+    here outer_jobs * inner_threads never exceeds the budget.
+
+    Returns:
+        tuple: (outer_jobs, inner_threads)
+    """
+    budget = os.cpu_count() or 1
+    if n_jobs is not None and n_jobs > 0:
+        budget = min(n_jobs, budget)
+    outer = max(1, min(n_tasks, budget))
+    return outer, max(1, budget // outer)
+
+
+def _fit_prefix_scores(params, n_estimators_list, X, y, train_idx, test_idx, base_params, n_threads):
+    """Fits once with the largest n_estimators and scores every boosted-round prefix."""
+    model = XGBRegressor(**base_params, **params, n_estimators=max(n_estimators_list), n_jobs=n_threads)
+    model.fit(X[train_idx], y[train_idx])
+    return {
+        n: r2_score(y[test_idx], model.predict(X[test_idx], iteration_range=(0, n)))
+        for n in n_estimators_list
+    }
+
+
+def tune_xgboost(X, y, param_grid, cv=None, base_params=None, pruning='halving', eta=3, n_jobs=None, verbose=True):
+    """
+    Grid search for XGBRegressor with fold-wise pruning and boosted-round reuse.
+
+    Folds are evaluated in order (earliest TimeSeriesSplit fold first). After each fold but
+    the last, weak candidates are pruned:
+    - 'halving': successive halving, keep the best 1/eta of candidates by mean score so far.
+    - 'median': median stopping, drop candidates whose mean score is below the median.
+    - None: no pruning (same candidates and scores as GridSearchCV, scoring='r2').
+    For the n_estimators axis each configuration is trained once to the largest value and
+    the prefixes are scored with `iteration_range`.
+
+    Args:
+        X, y: Training data (sorted by time when cv is a TimeSeriesSplit).
+        param_grid (dict): Lists of values per XGBRegressor parameter.
+        cv: Splitter (default TimeSeriesSplit(3)).
+        base_params (dict): Fixed XGBRegressor parameters (e.g. subsample, random_state).
+            An n_jobs entry caps the CPU budget like the n_jobs argument.
+        n_jobs (int): Total CPU budget shared by parallel fits and XGBoost threads.
+
+    Returns:
+        dict: {'best_params', 'best_score', 'results'} where results is a DataFrame with the
+        per-fold scores of every candidate and the fold at which it was pruned.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float64)
+    cv = cv if cv is not None else TimeSeriesSplit(n_splits=3)
+    base_params = dict(base_params or {})
+    folds = list(cv.split(X, y))
+
+    grid = dict(param_grid)
+    default_n_estimators = base_params.pop('n_estimators', 100)
+    # XGBoost threads are set per fit from the budget; a fixed n_jobs only lowers the budget
+    base_n_jobs = base_params.pop('n_jobs', None)
+    if base_n_jobs is not None and base_n_jobs > 0:
+        n_jobs = base_n_jobs if n_jobs is None or n_jobs <= 0 else min(n_jobs, base_n_jobs)
+    n_estimators_values = sorted(grid.pop('n_estimators', [default_n_estimators]))
+    keys = sorted(grid)
+    configs = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+    # One candidate per (config, n_estimators); scores[c][fold] filled as folds are evaluated
+    candidates = [(i, n) for i in range(len(configs)) for n in n_estimators_values]
+    scores = {cand: [] for cand in candidates}
+    pruned_at = {}
+    alive = list(candidates)
+
+    for fold_no, (train_idx, test_idx) in enumerate(folds):
+        # Train each configuration once, up to the largest n_estimators still alive for it
+        needed = {}
+        for i, n in alive:
+            needed.setdefault(i, []).append(n)
+        outer, inner = cpu_budget(len(needed), n_jobs)
+        fold_scores = Parallel(n_jobs=outer)(
+            delayed(_fit_prefix_scores)(configs[i], ns, X, y, train_idx, test_idx, base_params, inner)
+            for i, ns in needed.items()
+        )
+        for (i, ns), prefix_scores in zip(needed.items(), fold_scores):
+            for n in ns:
+                scores[(i, n)].append(prefix_scores[n])
+
+        if verbose:
+            print(f"Fold {fold_no + 1}/{len(folds)}: {len(alive)} candidates, {len(needed)} fits "
+                  f"({outer} workers x {inner} threads)")
+
+        if fold_no == len(folds) - 1 or pruning is None or len(alive) <= 1:
+            continue
+        means = np.array([np.mean(scores[c]) for c in alive])
+        if pruning == 'halving':
+            n_keep = max(1, math.ceil(len(alive) / eta))
+            keep = set(np.argsort(-means, kind='stable')[:n_keep])
+        elif pruning == 'median':
+            keep = set(np.flatnonzero(means >= np.median(means)))
+        else:
+            raise ValueError(f"Unknown pruning strategy: {pruning}")
+        for pos, cand in enumerate(alive):
+            if pos not in keep:
+                pruned_at[cand] = fold_no + 1
+        alive = [cand for pos, cand in enumerate(alive) if pos in keep]
+
+    rows = []
+    for cand in candidates:
+        i, n = cand
+        row = {**configs[i], 'n_estimators': n}
+        for f, s in enumerate(scores[cand]):
+            row[f'split{f}_test_score'] = s
+        row['mean_test_score'] = np.mean(scores[cand]) if len(scores[cand]) == len(folds) else np.nan
+        row['pruned_at_fold'] = pruned_at.get(cand)
+        rows.append(row)
+    results = pd.DataFrame(rows)
+
+    best = results['mean_test_score'].idxmax()
+    best_params = {k: _to_builtin(results.loc[best, k]) for k in sorted(keys + ['n_estimators'])}
+    return {'best_params': best_params, 'best_score': float(results.loc[best, 'mean_test_score']), 'results': results}
+
+
+def _to_builtin(value):
+    """NumPy scalars -> Python scalars so the parameters are JSON serializable."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def save_best_params(path, model_name, params):
+    """Writes params under model_name in best_hyperparameters.json, keeping the other models."""
+    data = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    data[model_name] = {k: _to_builtin(v) for k, v in sorted(params.items())}
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
@@ -0,0 +1,134 @@
+import numpy as np
+
+# statsmodels clips R^2 at 1 - 1e-15, so perfectly collinear columns tie at this VIF
+MAX_VIF = 1e15
+
+
+def _correlation(X):
+    """
+    Returns the correlation matrix of the non-constant columns of X.
+
+    Also returns the mask of non-constant columns and the VIF assigned to constant ones
+    (1 for a non-zero constant, NaN for an all-zero column), as statsmodels does.
+    """
+    means = X.mean(axis=0)
+    stds = X.std(axis=0)
+    varying = stds > 1e-10
+    const_vif = np.where(np.abs(means) > 0, 1.0, np.nan)
+
+    Z = (X[:, varying] - means[varying]) / stds[varying]
+    return (Z.T @ Z) / len(X), varying, const_vif
+
+
+def _inverse(corr):
+    """Inverts a correlation matrix, returning None when it is (numerically) singular."""
+    try:
+        inv = np.linalg.inv(corr)
+    except np.linalg.LinAlgError:
+        return None
+    diag = np.diag(inv)
+    if not np.all(np.isfinite(diag)) or np.any(diag < 1 - 1e-8):
+        return None
+    return inv
+
+
+def _vif_lstsq(Z):
+    """Slow path: one least-squares fit per standardized column (singular matrices only)."""
+    n_cols = Z.shape[1]
+    vifs = np.empty(n_cols)
+    for i in range(n_cols):
+        z_i = Z[:, i]
+        others = np.delete(Z, i, axis=1)
+        tss = z_i @ z_i
+        if others.shape[1] == 0:
+            r_sq = 0.0
+        else:
+            coef = np.linalg.lstsq(others, z_i, rcond=None)[0]
+            resid = z_i - others @ coef
+            r_sq = 1.0 - (resid @ resid) / tss
+        vifs[i] = 1.0 / (1.0 - np.clip(r_sq, 0.0, 1.0 - 1e-15))
+    return vifs
+
+
+def _round_vifs(X, inv, varying, const_vif):
+    """Assembles the VIF of every column from the inverse (or the slow path)."""
+    vifs = const_vif.copy()
+    if inv is not None:
+        vifs[varying] = np.minimum(np.diag(inv), MAX_VIF)
+    elif varying.any():
+        Z = X[:, varying]
+        Z = (Z - Z.mean(axis=0)) / Z.std(axis=0)
+        vifs[varying] = _vif_lstsq(Z)
+    return vifs
+
+
+def compute_vif(X):
+    """
+    Computes the VIF of every column of X at once.
+
+    VIF_i is the i-th diagonal entry of the inverse correlation matrix. This matches
+    statsmodels' variance_inflation_factor with its default standardize=True.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.shape[1] == 0:
+        return np.empty(0)
+    corr, varying, const_vif = _correlation(X)
+    return _round_vifs(X, _inverse(corr), varying, const_vif)
+
+
+def vif_elimination(X, threshold=10.0, min_features=1):
+    """
+    Iteratively drops the column with the highest VIF while it exceeds threshold.
+
+    Every VIF is read off the inverse correlation matrix. After a drop the inverse is
+    downdated with a rank-one update (Schur complement of the dropped column) instead of
+    being recomputed. Rows with NaNs are excluded per round like `df[features].dropna()`;
+    when a drop changes that row set the inverse is rebuilt from scratch.
+
+    Args:
+        X (array-like): 2D numeric matrix (rows x features).
+        threshold (float): Maximum accepted VIF.
+        min_features (int): Stop once this many columns remain.
+
+    Returns:
+        tuple: (kept column indices, dropped column indices in drop order)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    kept = list(range(X.shape[1]))
+    dropped = []
+    nan_rows = np.isnan(X)
+    row_mask = None
+    inv = None
+
+    while len(kept) > min_features:
+        current_mask = ~nan_rows[:, kept].any(axis=1)
+        if inv is None or not np.array_equal(current_mask, row_mask):
+            row_mask = current_mask
+            X_k = X[np.ix_(row_mask, kept)]
+            corr, varying, const_vif = _correlation(X_k)
+            inv = _inverse(corr)
+        vifs = _round_vifs(X_k, inv, varying, const_vif)
+
+        if np.all(np.isnan(vifs)):
+            break
+        # np.nanargmax returns the first maximum, matching pandas idxmax / sort order on ties
+        j = int(np.nanargmax(vifs))
+        if not vifs[j] > threshold:
+            break
+
+        dropped.append(kept.pop(j))
+        if inv is None:
+            continue  # singular this round, rebuild next round
+
+        if varying[j]:
+            # Position of the dropped column inside the inverse (constant columns are not in it)
+            p = int(varying[:j].sum())
+            inv = inv - np.outer(inv[:, p], inv[p, :]) / inv[p, p]
+            inv = np.delete(np.delete(inv, p, axis=0), p, axis=1)
+        varying = np.delete(varying, j)
+        const_vif = np.delete(const_vif, j)
+        diag = np.diag(inv)
+        if not np.all(np.isfinite(diag)) or np.any(diag < 1 - 1e-8):
+            inv = None  # numerical breakdown, rebuild next round
+
+    return kept, dropped
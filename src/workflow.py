@@ -0,0 +1,418 @@
+"""
+Declarative DAG runner for the preprocessing / modelling workflow.
+
+A Stage declares a function with its input and output files and parameters. The runner:
+- infers dependencies from the files (a stage depends on the stages producing its inputs);
+- runs stages whose dependencies are done in a process pool, so independent branches (the
+  LR / SVR / XGBoost preparations, the model evaluations) run concurrently;
+- skips a stage when its fingerprint is unchanged and its outputs are still the ones it
+  wrote. The fingerprint combines the function's bytecode, the parameters, the SHA-256
+  of every input file and the code the stage depends on: the bytecode of the helpers
+  and the value of the constants it uses from its own module, and the source of every
+  project module it reaches (see `stage_dependencies`). An upstream stage that reruns but
+  writes identical files does not invalidate what follows;
+- records the wall-clock time of every stage.
+
+State (fingerprints, file hashes, timings) is kept in a JSON file; file hashes are reused
+while a file's size and mtime are unchanged.
+
+The project's stages are declared in stages.py.
+
+Usage (from the repository root):
+    python src/workflow.py list
+    python src/workflow.py run                      # everything, skipping up-to-date stages
+    python src/workflow.py run eval_hybrid --jobs 4 # one target and what it needs
+    python src/workflow.py run prep_svr --force     # rerun prep_svr even if up to date
+    python src/workflow.py times
+"""
+import argparse
+import dis
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from data_store import file_hash
+from stage_cache import _func_token, _update_hash
+
+STATE_PATH = 'data/cache/workflow_state.json'
+
+
+def _as_list(paths):
+    if paths is None:
+        return []
+    return list(paths) if isinstance(paths, (list, tuple)) else [paths]
+
+
+class Stage:
+    """
+    Args:
+        name (str): Stage name (CLI target).
+        func: Module-level function, called as func(**inputs, **outputs, **params).
+        inputs (dict): Argument name -> input path (or list of paths).
+        outputs (dict): Argument name -> output path (or list of paths).
+        params (dict): Other keyword arguments (part of the fingerprint).
+    """
+    def __init__(self, name, func, inputs=None, outputs=None, params=None):
+        self.name = name
+        self.func = func
+        self.inputs = dict(inputs or {})
+        self.outputs = dict(outputs or {})
+        self.params = dict(params or {})
+
+    def input_paths(self):
+        return [p for paths in self.inputs.values() for p in _as_list(paths)]
+
+    def output_paths(self):
+        return [p for paths in self.outputs.values() for p in _as_list(paths)]
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, {self.func.__name__})"
+
+
+def _code_names(code):
+    """Global names and imported module names used by a code object (nested functions included)."""
+    names = set(code.co_names)
+    imports = {ins.argval for ins in dis.get_instructions(code) if ins.opname == 'IMPORT_NAME'}
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            more_names, more_imports = _code_names(const)
+            names |= more_names
+            imports |= more_imports
+    return names, imports
+
+
+def stage_dependencies(func, root=None):
+    """
+    Code a stage function depends on, for its fingerprint.
+
+    Helpers of the function's own module are followed through the globals they use (so
+    editing one helper only invalidates the stages calling it); any other module under
+    root (by default the directory of the function's module) that is reached, directly or
+    through a function-level import, counts with its whole source and, transitively, the
+    project modules it imports.
+
+    Returns:
+        tuple: (same-module helper functions, same-module constants {name: value},
+            sorted paths of the project source files)
+    """
+    home = sys.modules.get(func.__module__)
+    home_file = getattr(home, '__file__', None)
+    root = os.path.abspath(root or os.path.dirname(os.path.abspath(home_file or '.')))
+    helpers, constants, files = {}, {}, set()
+
+    def project_file(module):
+        path = getattr(module, '__file__', None)
+        path = os.path.abspath(path) if path else None
+        if path and path.startswith(root + os.sep) and path != (home_file and os.path.abspath(home_file)):
+            return path
+        return None
+
+    def add_import(name):
+        try:
+            add_module(importlib.import_module(name))
+        except ImportError:
+            pass
+
+    def add_module(module):
+        path = project_file(module)
+        if path is None or path in files:
+            return
+        files.add(path)
+        for value in list(vars(module).values()):
+            if inspect.ismodule(value):
+                add_module(value)
+            else:
+                add_module(sys.modules.get(getattr(value, '__module__', None) or ''))
+            if inspect.isfunction(value) and value.__module__ == module.__name__:
+                for name in _code_names(value.__code__)[1]:
+                    add_import(name)
+
+    stack = [func]
+    while stack:
+        f = stack.pop()
+        if f.__qualname__ in helpers:
+            continue
+        helpers[f.__qualname__] = f
+        names, imports = _code_names(f.__code__)
+        for name in imports:
+            add_import(name)
+        for name in names:
+            if name not in f.__globals__:
+                continue
+            value = f.__globals__[name]
+            if inspect.ismodule(value):
+                add_module(value)
+            elif inspect.isfunction(value) and value.__module__ == func.__module__:
+                stack.append(value)
+            elif getattr(value, '__module__', None) == func.__module__ and home is not None:
+                # classes (or instances) defined next to the stage: the module source decides
+                files.add(os.path.abspath(home_file))
+            elif isinstance(value, (str, int, float, bool, list, tuple, dict, set, frozenset)):
+                constants[name] = value
+            else:
+                add_module(sys.modules.get(getattr(value, '__module__', None) or ''))
+    del helpers[func.__qualname__]
+    return [helpers[k] for k in sorted(helpers)], constants, sorted(files)
+
+
+def _run_stage(func, kwargs):
+    """Pool worker: runs one stage, returns its wall-clock seconds."""
+    start = time.perf_counter()
+    func(**kwargs)
+    return time.perf_counter() - start
+
+
+class Workflow:
+    """
+    Args:
+        stages (list): Stage objects (any order).
+        state_path (str): JSON file with fingerprints, file hashes and timings.
+    """
+    def __init__(self, stages, state_path=STATE_PATH):
+        self.stages = {}
+        self.producer = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name '{stage.name}'")
+            self.stages[stage.name] = stage
+            for path in stage.output_paths():
+                if path in self.producer:
+                    raise ValueError(f"'{path}' is produced by both '{self.producer[path]}' and '{stage.name}'")
+                self.producer[path] = stage.name
+        self.deps = {name: sorted({self.producer[p] for p in stage.input_paths() if p in self.producer})
+                     for name, stage in self.stages.items()}
+        self.order = self._topological_order()
+        self.state_path = state_path
+        self.state = self._load_state()
+        self._dependencies = {}
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name, path):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle between stages: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dep in self.deps[name]:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {'files': {}, 'stages': {}}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp = f'{self.state_path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def _file_digest(self, path):
+        """SHA-256 of a file, reused from the state while its size and mtime are unchanged."""
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        known = self.state['files'].get(path)
+        if known and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime:
+            return known['sha256']
+        digest = file_hash(path)
+        self.state['files'][path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': digest}
+        return digest
+
+    def fingerprint(self, name):
+        stage = self.stages[name]
+        if name not in self._dependencies:
+            self._dependencies[name] = stage_dependencies(stage.func)
+        helpers, constants, sources = self._dependencies[name]
+        digest = hashlib.sha256(_func_token(stage.func).encode())
+        _update_hash(digest, stage.params)
+        for helper in helpers:
+            digest.update(_func_token(helper).encode())
+        _update_hash(digest, constants)
+        for path in sources:
+            digest.update(os.path.basename(path).encode())
+            digest.update((self._file_digest(path) or 'missing').encode())
+        for path in sorted(stage.input_paths()):
+            digest.update(path.encode())
+            digest.update((self._file_digest(path) or 'missing').encode())
+        return digest.hexdigest()
+
+    def is_fresh(self, name):
+        """True if the stage's inputs, code and parameters are unchanged and its outputs intact."""
+        record = self.state['stages'].get(name)
+        if not record or record.get('fingerprint') != self.fingerprint(name):
+            return False
+        outputs = record.get('outputs', {})
+        return all(outputs.get(p) is not None and self._file_digest(p) == outputs[p]
+                   for p in self.stages[name].output_paths())
+
+    def select(self, targets=None):
+        """Stage names needed for the targets (all stages by default), in dependency order."""
+        if not targets:
+            return list(self.order)
+        unknown = [t for t in targets if t not in self.stages]
+        if unknown:
+            raise KeyError(f"Unknown stages: {unknown}; available: {self.order}")
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.deps[name])
+        return [name for name in self.order if name in needed]
+
+    def run(self, targets=None, n_jobs=None, force=False):
+        """
+        Runs the targets and their dependencies, independent stages in parallel.
+
+        Args:
+            n_jobs (int): Worker processes (default: CPU count; 1 runs in this process).
+            force (bool): Rerun the targets (every stage without targets) even if up to date.
+
+        Returns:
+            pd.DataFrame: Stage, Status (ran / skipped / failed / blocked), Seconds, Started.
+        """
+        names = self.select(targets)
+        forced = set(targets or names) if force else set()
+        for name in names:
+            for path in self.stages[name].input_paths():
+                if path not in self.producer and not os.path.exists(path):
+                    raise FileNotFoundError(f"Stage '{name}' needs '{path}', which no stage produces")
+
+        n_jobs = n_jobs or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+        run_start = time.perf_counter()
+        status, seconds, started, running = {}, {}, {}, {}
+        pending = list(names)
+        try:
+            while pending or running:
+                for name in list(pending):
+                    deps = [d for d in self.deps[name] if d in names]
+                    if any(status.get(d) in ('failed', 'blocked') for d in deps):
+                        status[name] = 'blocked'
+                        pending.remove(name)
+                        print(f"[workflow] {name}: blocked (a dependency failed)")
+                    elif all(status.get(d) in ('ran', 'skipped') for d in deps):
+                        pending.remove(name)
+                        if name not in forced and self.is_fresh(name):
+                            status[name], seconds[name] = 'skipped', 0.0
+                            print(f"[workflow] {name}: up to date")
+                            continue
+                        stage = self.stages[name]
+                        for path in stage.output_paths():
+                            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                        kwargs = {**stage.inputs, **stage.outputs, **stage.params}
+                        fingerprint = self.fingerprint(name)
+                        started[name] = time.perf_counter() - run_start
+                        print(f"[workflow] {name}: running")
+                        if pool is None:
+                            future = _Done(_run_stage, stage.func, kwargs)
+                        else:
+                            future = pool.submit(_run_stage, stage.func, kwargs)
+                        running[future] = (name, fingerprint)
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED) if pool else (list(running), None)
+                for future in done:
+                    name, fingerprint = running.pop(future)
+                    try:
+                        seconds[name] = future.result()
+                    except Exception as e:
+                        status[name] = 'failed'
+                        seconds[name] = time.perf_counter() - run_start - started[name]
+                        print(f"[workflow] {name}: FAILED ({type(e).__name__}: {e})")
+                        continue
+                    status[name] = 'ran'
+                    self.state['stages'][name] = {
+                        'fingerprint': fingerprint,
+                        'outputs': {p: self._file_digest(p) for p in self.stages[name].output_paths()},
+                        'seconds': round(seconds[name], 3),
+                        'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    }
+                    self._save_state()
+                    print(f"[workflow] {name}: done in {seconds[name]:.2f}s")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            self._save_state()
+
+        report = pd.DataFrame({
+            'Stage': names,
+            'Status': [status.get(n, 'blocked') for n in names],
+            'Seconds': [round(seconds.get(n, 0.0), 3) for n in names],
+            'Started': [round(started[n], 3) if n in started else None for n in names],
+        })
+        print(report.to_string(index=False))
+        print(f"Wall-clock: {time.perf_counter() - run_start:.2f}s "
+              f"(sum of stage times {report['Seconds'].sum():.2f}s, {n_jobs} workers)")
+        return report
+
+
+class _Done:
+    """Completed-future stand-in for stages run in this process (n_jobs=1)."""
+    def __init__(self, fn, *args):
+        try:
+            self._result, self._error = fn(*args), None
+        except Exception as e:
+            self._result, self._error = None, e
+
+    def result(self):
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def main(argv=None, stages=None):
+    parser = argparse.ArgumentParser(description='Run the workflow DAG.')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--state', default=STATE_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('run')
+    p.add_argument('targets', nargs='*')
+    p.add_argument('--jobs', type=int)
+    p.add_argument('--force', action='store_true', help='rerun the targets even if up to date')
+    sub.add_parser('list')
+    sub.add_parser('times')
+    args = parser.parse_args(argv)
+
+    if stages is None:
+        from stages import build_stages
+        stages = build_stages(args.data_dir)
+    workflow = Workflow(stages, args.state)
+    if args.command == 'run':
+        report = workflow.run(args.targets, args.jobs, args.force)
+        if report['Status'].isin(['failed', 'blocked']).any():
+            sys.exit(1)
+    elif args.command == 'list':
+        for name in workflow.order:
+            stage = workflow.stages[name]
+            state = 'up to date' if workflow.is_fresh(name) else 'stale'
+            deps = ', '.join(workflow.deps[name]) or '-'
+            print(f"{name:<16} {state:<11} after: {deps:<30} -> {', '.join(stage.output_paths())}")
+    elif args.command == 'times':
+        records = workflow.state['stages']
+        for name in workflow.order:
+            if name in records:
+                print(f"{name:<16} {records[name]['seconds']:>8.2f}s  ({records[name]['finished_at']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Shared fixtures. The modules under src/ are flat and imported by name, as the notebooks
+and scripts do (src and src/preprocessing on sys.path).
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(os.path.join(ROOT, 'src', 'preprocessing'))
+
+TARGET = 'Value_co2_emissions_kt_by_country'
+
+
+def make_panel(n_entities=12, n_years=11, n_cols=3, missing=0.1, gaps=0.1, seed=0, start_year=2000):
+    """
+    Long (Entity, Year) panel in shuffled row order: random walks per entity, some
+    entity-years dropped (gaps) and some values set to NaN.
+
+    Returns:
+        pd.DataFrame: Entity, Year, x0..x{n_cols-1}.
+    """
+    rng = np.random.default_rng(seed)
+    entity = np.repeat([f'E{i:02d}' for i in range(n_entities)], n_years)
+    year = np.tile(np.arange(start_year, start_year + n_years), n_entities)
+    steps = rng.normal(size=(n_entities, n_years, n_cols))
+    values = (100 + 10 * steps.cumsum(axis=1)).reshape(-1, n_cols)
+    values[rng.random(values.shape) < missing] = np.nan
+    df = pd.DataFrame(values, columns=[f'x{j}' for j in range(n_cols)])
+    df.insert(0, 'Entity', entity)
+    df.insert(1, 'Year', year)
+    df = df[rng.random(len(df)) >= gaps]
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+@pytest.fixture
+def panel():
+    return make_panel()
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.tree import DecisionTreeRegressor
+
+from backtest import RollingBacktest, rolling_backtest
+from conftest import make_panel
+from fixed_effects import SparseRidge
+
+
+@pytest.fixture
+def panel():
+    df = make_panel(n_entities=20, n_years=12, missing=0.0)
+    rng = np.random.default_rng(0)
+    df['x3'] = rng.normal(size=len(df)) * 1e5 + 1e6  # large-valued feature
+    df['y'] = 2 * df['x0'] - 3 * df['x1'] + 1e-5 * df['x3'] + rng.normal(size=len(df))
+    return df
+
+
+FEATURES = ['x0', 'x1', 'x2', 'x3']
+
+
+def refit(df, estimator, origins, window=None):
+    """Reference: clone-and-fit on the years before every origin."""
+    preds = {}
+    for origin in origins:
+        train = (df['Year'] < origin) & ((df['Year'] >= origin - window) if window else True)
+        test = df['Year'] == origin
+        model = estimator.fit(df.loc[train, FEATURES], df.loc[train, 'y'])
+        preds[origin] = pd.Series(model.predict(df.loc[test, FEATURES]), index=df.index[test])
+    return preds
+
+
+@pytest.mark.parametrize('window', [None, 3])
+@pytest.mark.parametrize('estimator', [Ridge(alpha=5.0), Ridge(alpha=0.5, fit_intercept=False), SparseRidge(alpha=5.0)])
+def test_incremental_ridge_matches_refitting_sklearn(panel, estimator, window):
+    origins = range(2003, 2011)
+    bt = RollingBacktest(panel, FEATURES, 'y')
+    bt.run({'Ridge': estimator}, origins, window=window, verbose=False)
+    reference = Ridge(alpha=estimator.alpha, fit_intercept=estimator.fit_intercept, solver='cholesky')
+    for origin, expected in refit(panel, reference, origins, window).items():
+        got = bt.predictions_.loc[expected.index, 'Ridge']
+        np.testing.assert_allclose(got, expected, rtol=1e-8)
+
+
+def test_positive_ridge_is_refit_with_its_constraint(panel):
+    panel['y'] = -panel['x0'] + panel['x1']  # unconstrained solution has a negative coefficient
+    origins = [2008, 2010]
+    results = rolling_backtest(panel, FEATURES, 'y', {'Ridge+': Ridge(alpha=1.0, positive=True)}, origins,
+                               n_jobs=1, verbose=False)
+    assert list(results['Year']) == origins
+    preds = RollingBacktest(panel, FEATURES, 'y')
+    preds.run({'Ridge+': Ridge(alpha=1.0, positive=True)}, origins, n_jobs=1, verbose=False)
+    for origin, expected in refit(panel, Ridge(alpha=1.0, positive=True), origins).items():
+        np.testing.assert_allclose(preds.predictions_.loc[expected.index, 'Ridge+'], expected)
+
+
+def test_other_estimators_are_refit_per_origin(panel):
+    tree = DecisionTreeRegressor(max_depth=3, random_state=0)
+    bt = RollingBacktest(panel, FEATURES, 'y')
+    results = bt.run({'Tree': tree}, [2005, 2009], n_jobs=1, verbose=False)
+    for origin, expected in refit(panel, tree, [2005, 2009]).items():
+        np.testing.assert_array_equal(bt.predictions_.loc[expected.index, 'Tree'], expected)
+        row = results[results['Year'] == origin].iloc[0]
+        assert row['n_test'] == len(expected)
+        assert row['n_train'] == (panel['Year'] < origin).sum()
+
+
+def test_origins_without_data_are_skipped(panel):
+    bt = RollingBacktest(panel, FEATURES, 'y')
+    assert [s[0] for s in bt.splits([1990, 2000, 2004, 2050])] == [2004]
@@ -0,0 +1,31 @@
+import numpy as np
+
+from bootstrap import RowQuantileSketch, entity_blocks
+
+
+def test_row_sketch_exact_below_k():
+    values = np.random.default_rng(0).normal(size=(5, 300))
+    sketch = RowQuantileSketch(5, k=512)
+    for batch in np.array_split(values, 4, axis=1):
+        sketch.update(batch)
+    np.testing.assert_array_equal(sketch.quantile(0.9), np.quantile(values, 0.9, axis=1))
+
+
+def test_merged_row_sketches_stay_within_rank_error():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(size=(3, 2000)) for _ in range(4)]
+    sketch = RowQuantileSketch(3, k=128)
+    for part in parts:
+        sketch.merge(RowQuantileSketch(3, k=128, seed=len(sketch.levels)).update(part))
+    values = np.sort(np.hstack(parts), axis=1)
+    assert sketch.count == values.shape[1]
+    for q in (0.05, 0.5, 0.95):
+        est = sketch.quantile(q)
+        ranks = np.array([np.searchsorted(v, e) for v, e in zip(values, est)]) / values.shape[1]
+        assert np.abs(ranks - q).max() < 0.03
+
+
+def test_entity_blocks():
+    order, starts, counts = entity_blocks(np.array(['b', 'a', 'b', 'c', 'a']))
+    assert list(order) == [1, 4, 0, 2, 3]
+    assert list(starts) == [0, 2, 4] and list(counts) == [2, 2, 1]
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, Ridge
+
+from cluster_ensemble import ClusterEnsembleRegressor, _with_threads, cluster_offsets
+from hybrid import HybridResidualRegressor
+
+
+def clustered(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 3)), columns=['a', 'b', 'c'], index=rng.permutation(n) + 1000)
+    clusters = pd.Series(rng.choice([2, 0, 1, 5], size=n, p=[0.4, 0.3, 0.25, 0.05]), index=X.index)
+    slopes = np.array([[1, 2, 3], [-1, 0, 2], [4, -2, 1], [0, 0, 9]], dtype=float)
+    y = pd.Series(np.einsum('ij,ij->i', X.to_numpy(), slopes[pd.factorize(clusters, sort=True)[0]]), index=X.index)
+    return X, y, clusters
+
+
+def test_cluster_offsets_group_rows_stably():
+    clusters = np.array([3, 1, 3, 2, 1, 3])
+    labels, order, starts, ends = cluster_offsets(clusters)
+    assert labels.tolist() == [1, 2, 3]
+    groups = [order[s:e].tolist() for s, e in zip(starts, ends)]
+    assert groups == [[1, 4], [3], [0, 2, 5]]
+
+
+def test_matches_one_model_per_cluster_in_row_order():
+    X, y, clusters = clustered()
+    ens = ClusterEnsembleRegressor(Ridge(alpha=1.0), min_samples=20, n_jobs=1, verbose=False)
+    ens.fit(X, y, clusters=clusters)
+    small = clusters.value_counts().loc[lambda c: c < 20].index.tolist()
+    assert small == [5]
+    assert sorted(ens.models_) == [0, 1, 2]
+
+    preds = ens.predict(X, clusters=clusters)
+    for label in [0, 1, 2]:
+        mask = (clusters == label).to_numpy()
+        expected = Ridge(alpha=1.0).fit(X[mask], y[mask]).predict(X[mask])
+        np.testing.assert_allclose(preds[mask], expected, rtol=1e-12)
+    assert np.isnan(preds[(clusters == 5).to_numpy()]).all()
+
+    # arrays, and clusters without a model
+    arrays = ClusterEnsembleRegressor(Ridge(alpha=1.0), n_jobs=1, verbose=False)
+    arrays = arrays.fit(X.to_numpy(), y.to_numpy(), clusters.to_numpy())
+    unseen = arrays.predict(X.to_numpy(), clusters=np.where(clusters == 0, 9, clusters))
+    assert np.isnan(unseen[(clusters == 0).to_numpy()]).all()
+    np.testing.assert_allclose(unseen[(clusters == 1).to_numpy()], preds[(clusters == 1).to_numpy()])
+
+
+def test_parallel_fit_matches_serial_fit():
+    X, y, clusters = clustered()
+    serial = ClusterEnsembleRegressor(Ridge(), n_jobs=1, verbose=False).fit(X, y, clusters)
+    parallel = ClusterEnsembleRegressor(Ridge(), n_jobs=2, verbose=False).fit(X, y, clusters)
+    np.testing.assert_allclose(parallel.predict(X, clusters), serial.predict(X, clusters), equal_nan=True)
+
+
+def test_thread_budget_reaches_the_cluster_models():
+    hybrid = _with_threads(HybridResidualRegressor(xgb_params={'max_depth': 2, 'n_jobs': -1}), 3)
+    assert hybrid.xgb_params == {'max_depth': 2, 'n_jobs': 3}
+    assert _with_threads(LinearRegression(n_jobs=-1), 2).n_jobs == 2
+    assert _with_threads(Ridge(), 2).get_params() == Ridge().get_params()
+
+    X, y, clusters = clustered()
+    ens = ClusterEnsembleRegressor(LinearRegression(n_jobs=-1), n_jobs=1, verbose=False).fit(X, y, clusters)
+    assert all(model.n_jobs == 1 for model in ens.models_.values())
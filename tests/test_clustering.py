@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.datasets import make_blobs
+from sklearn.metrics import silhouette_score
+from sklearn.metrics.pairwise import euclidean_distances
+
+from clustering import country_profiles, kmeans_sweep, silhouette_from_distances
+from conftest import make_panel
+
+
+def test_country_profiles_use_the_years_before_the_split():
+    df = make_panel(n_entities=6, missing=0.0)
+    df.loc[df['Entity'] == 'E0', 'x1'] = np.nan  # all-NaN mean: dropped
+    profile, X, scaler = country_profiles(df, ['x0', 'x1', 'missing'], end_year=2005)
+    expected = df[df['Year'] < 2005].groupby('Entity')[['x0', 'x1']].mean().dropna()
+    pd.testing.assert_frame_equal(profile, expected)
+    np.testing.assert_allclose(X, scaler.transform(expected))
+    np.testing.assert_allclose(X.mean(axis=0), 0, atol=1e-12)
+
+
+def test_silhouette_matches_sklearn():
+    X, _ = make_blobs(n_samples=120, centers=4, random_state=0)
+    D = euclidean_distances(X)
+    labels = KMeans(n_clusters=4, n_init=1, random_state=0).fit_predict(X)
+    labels[0] = 4  # a singleton cluster scores 0
+    expected = silhouette_score(D, labels, metric='precomputed')
+    assert np.isclose(silhouette_from_distances(D, labels, 5), expected, rtol=1e-12)
+
+
+def test_warm_started_sweep_matches_cold_fits():
+    X, _ = make_blobs(n_samples=300, centers=5, cluster_std=0.6, random_state=1)
+    results, models = kmeans_sweep(X, k_values=range(2, 9), verbose=False)
+    assert results['k'].tolist() == list(range(2, 9)) and sorted(models) == list(range(2, 9))
+    assert results.loc[results['silhouette'].idxmax(), 'k'] == 5
+    for k, row in results.set_index('k').iterrows():
+        cold = KMeans(n_clusters=k, n_init=10, random_state=0).fit(X)
+        assert row['inertia'] <= cold.inertia_ * 1.05
+        assert np.isclose(row['silhouette'], silhouette_score(X, models[k].labels_), rtol=1e-10)
+
+    # warm starts alone get stuck with two blobs under one center at k=5
+    warm_only, _ = kmeans_sweep(X, k_values=range(2, 9), cold_starts=0, verbose=False)
+    assert warm_only['warm'].iloc[1:].all()
+    assert (results['inertia'] <= warm_only['inertia'] + 1e-9).all()
+    assert warm_only.loc[warm_only['k'] == 5, 'inertia'].item() > 2 * results.loc[results['k'] == 5, 'inertia'].item()
+
+
+def test_minibatch_and_sampled_silhouette():
+    X, _ = make_blobs(n_samples=3000, centers=4, cluster_std=0.5, center_box=(-20, 20), random_state=2)
+    results, models = kmeans_sweep(X, k_values=[2, 3, 4, 5], batch_size=512, silhouette_sample=500, verbose=False)
+    assert type(models[4]).__name__ == 'MiniBatchKMeans'
+    assert results.loc[results['silhouette'].idxmax(), 'k'] == 4
+    # k above the number of rows stops the sweep
+    results, _ = kmeans_sweep(X[:4], k_values=[2, 3, 4, 6], verbose=False)
+    assert results['k'].tolist() == [2, 3, 4]
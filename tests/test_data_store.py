@@ -0,0 +1,94 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import MANIFEST, ROW_ID, load_dataset, save_dataset, store_path
+from preprocessing import load_data
+
+
+def frame():
+    return pd.DataFrame({
+        'Entity': pd.Series(['A', 'B', None, 'A'], dtype=object),
+        'Year': np.array([2000, 2000, 2001, 2001], dtype=np.int64),
+        'x': [1.5, np.nan, -2.0, 4.25],
+        'flag': [True, False, True, True],
+        'kind': pd.Categorical(['low', 'high', 'low', 'high'], categories=['low', 'high']),
+    })
+
+
+def write(df, path):
+    df.to_csv(path, index=False)
+    return save_dataset(df, path)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    df = frame()
+    assert write(df, path) == store_path(path) == str(tmp_path / 'data.store')
+    loaded = load_dataset(path)
+    assert loaded.columns.tolist() == df.columns.tolist()
+    assert loaded['Entity'].tolist()[:2] == ['A', 'B'] and pd.isna(loaded['Entity'][2])
+    for col in ['Year', 'x', 'flag']:
+        assert loaded[col].dtype == df[col].dtype
+        np.testing.assert_array_equal(loaded[col].to_numpy(), df[col].to_numpy())
+    pd.testing.assert_series_equal(loaded['kind'], df['kind'])
+
+
+def test_numeric_columns_are_copy_on_write_maps(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    write(frame(), path)
+    loaded = load_dataset(path)
+    values = loaded['x'].to_numpy()
+    assert isinstance(values.base, np.memmap) or isinstance(getattr(values.base, 'base', None), np.memmap)
+    loaded.loc[0, 'x'] = 99.0
+    assert load_dataset(path)['x'][0] == 1.5
+
+
+def test_stale_or_missing_stores_are_ignored(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    assert load_dataset(path) is None
+    write(frame(), path)
+
+    # same content, new mtime: still fresh (hash check)
+    os.utime(path, (1e9, 1e9))
+    assert load_dataset(path) is not None
+
+    frame().assign(x=0.0).to_csv(path, index=False)
+    assert load_dataset(path) is None
+
+    # store-only dataset: no CSV to compare against
+    os.remove(path)
+    assert load_dataset(path) is not None
+
+    with open(os.path.join(store_path(path), MANIFEST)) as f:
+        manifest = json.load(f)
+    manifest['version'] = -1
+    with open(os.path.join(store_path(path), MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+    assert load_dataset(path) is None
+
+
+def test_feather_falls_back_or_round_trips(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    df = frame().drop(columns=['kind'])
+    df.to_csv(path, index=False)
+    save_dataset(df, path, fmt='feather')
+    loaded = load_dataset(path)
+    np.testing.assert_array_equal(loaded['x'].to_numpy(), df['x'].to_numpy())
+    assert loaded['Entity'].tolist()[:2] == ['A', 'B']
+
+
+def test_load_data_restores_row_id_from_store_and_csv(tmp_path):
+    path = str(tmp_path / 'lr_final_prep.csv')
+    df = frame().drop(columns=['kind'])
+    df.index = pd.Index([7, 3, 12, 5], name=ROW_ID)
+    df.to_csv(path, index_label=ROW_ID)
+    from_csv = load_data(path)
+    save_dataset(pd.read_csv(path), path)
+    from_store = load_data(path)
+    for loaded in (from_csv, from_store):
+        assert loaded.index.name == ROW_ID
+        assert loaded.index.tolist() == [7, 3, 12, 5]
+        np.testing.assert_array_equal(loaded['x'].to_numpy(), df['x'].to_numpy())
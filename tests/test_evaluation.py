@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from evaluation import PanelScorer, calculate_metrics, panel_metrics
+
+
+def predictions(seed=0):
+    rng = np.random.default_rng(seed)
+    entities = np.repeat([f'E{i}' for i in range(15)], 8)
+    y = rng.lognormal(5, 2, size=len(entities))
+    y[3] = 0.0  # zero actual: skipped by MAPE
+    preds = {'a': y * rng.normal(1, 0.1, len(y)), 'b': y + rng.normal(0, 50, len(y))}
+    return y, preds, entities
+
+
+def notebook_median_mape(y, pred, entities):
+    df = pd.DataFrame({'Entity': entities, 'y': y, 'p': pred})
+    df = df[df['y'] != 0]
+    df['APE'] = np.abs(df['y'] - df['p']) / np.abs(df['y']) * 100
+    return df.groupby('Entity')['APE'].mean().median()
+
+
+def test_metrics_match_sklearn_and_groupby():
+    y, preds, entities = predictions()
+    scores = panel_metrics(y, preds, entities)
+    for name, pred in preds.items():
+        row = scores.loc[name]
+        np.testing.assert_allclose(row['RMSE'], np.sqrt(mean_squared_error(y, pred)), rtol=1e-12)
+        np.testing.assert_allclose(row['MAE'], mean_absolute_error(y, pred), rtol=1e-12)
+        np.testing.assert_allclose(row['R2'], r2_score(y, pred), rtol=1e-12)
+        np.testing.assert_allclose(row['Median MAPE'], notebook_median_mape(y, pred, entities), rtol=1e-12)
+
+
+def test_entity_mape_skips_nan_predictions():
+    y, preds, entities = predictions()
+    pred = preds['a'].copy()
+    pred[entities == 'E1'] = np.nan
+    pred[np.flatnonzero(entities == 'E2')[0]] = np.nan
+    mape = PanelScorer(y, entities).entity_mape(pred)['Model']
+    assert np.isnan(mape['E1'])
+    e2 = entities == 'E2'
+    np.testing.assert_allclose(mape['E2'], notebook_median_mape(y[e2][1:], pred[e2][1:], entities[e2][1:]))
+    r2, median_mape = calculate_metrics(y, preds['b'], entities)
+    assert r2 == r2_score(y, preds['b'])
+    np.testing.assert_allclose(median_mape, notebook_median_mape(y, preds['b'], entities), rtol=1e-12)
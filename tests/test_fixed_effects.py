@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.linear_model import LinearRegression, Ridge
+
+from conftest import make_panel
+from fixed_effects import SparseRidge, WithinRegressor, design_matrix, entity_dummies
+
+
+def panel_with_dummies():
+    df = make_panel(n_entities=15, missing=0.0)
+    dummies = pd.get_dummies(df['Entity'], prefix='Entity', drop_first=True, dtype=float)
+    df = pd.concat([df, dummies], axis=1)
+    y = 3 * df['x0'] - 2 * df['x1'] + 50 * df['Entity'].str[1:].astype(int) + 1e4
+    return df, list(dummies.columns), y.to_numpy()
+
+
+def test_entity_dummies_match_get_dummies():
+    df, dummy_cols, _ = panel_with_dummies()
+    block, names, _ = entity_dummies(df['Entity'])
+    assert names == dummy_cols
+    np.testing.assert_array_equal(block.toarray(), df[dummy_cols].to_numpy())
+
+
+def test_sparse_ridge_matches_cholesky_ridge():
+    df, dummy_cols, y = panel_with_dummies()
+    cols = ['x0', 'x1', 'x2'] + dummy_cols
+    dense = df[cols].to_numpy()
+    expected = Ridge(alpha=10.0, solver='cholesky').fit(dense, y)
+    for X in (dense, design_matrix(df, cols)):
+        model = SparseRidge(alpha=10.0).fit(X, y)
+        np.testing.assert_allclose(model.coef_, expected.coef_, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(model.intercept_, expected.intercept_, rtol=1e-10)
+        np.testing.assert_allclose(model.predict(X), expected.predict(dense), rtol=1e-10)
+    assert sp.issparse(design_matrix(df, cols))
+
+
+def test_within_slopes_match_ols_on_dummies():
+    df, dummy_cols, y = panel_with_dummies()
+    y = y + np.random.default_rng(0).normal(size=len(y))
+    ols = LinearRegression().fit(df[['x0', 'x1', 'x2'] + dummy_cols], y)
+    within = WithinRegressor().fit(df[['Entity', 'x0', 'x1', 'x2']], y)
+    np.testing.assert_allclose(within.coef_, ols.coef_[:3], rtol=1e-9)
+    np.testing.assert_allclose(within.predict(df[['Entity', 'x0', 'x1', 'x2']]),
+                               ols.predict(df[['x0', 'x1', 'x2'] + dummy_cols]), rtol=1e-9)
+
+
+def test_lr_pipeline_is_dense_by_default_and_sparse_on_request():
+    from pipelines import create_linear_regression_pipeline
+
+    df = make_panel(n_entities=15, missing=0.0)
+    df[['x0', 'x1', 'x2']] = df[['x0', 'x1', 'x2']].abs()
+    numerical = ['x0', 'x1', 'x2']
+    dense = create_linear_regression_pipeline(numerical).fit_transform(df)
+    assert isinstance(dense, np.ndarray)
+    frame = create_linear_regression_pipeline(numerical).set_output(transform='pandas').fit_transform(df)
+    assert isinstance(frame, pd.DataFrame) and frame.shape == dense.shape
+
+    sparse = create_linear_regression_pipeline(numerical, sparse=True).fit_transform(df)
+    assert sp.issparse(sparse) and sparse.format == 'csr'
+    np.testing.assert_array_equal(sparse.toarray(), dense)
@@ -0,0 +1,47 @@
+import numpy as np
+from sklearn.linear_model import Ridge
+
+from conftest import make_panel
+from forecasting import panel_to_frame, recursive_forecast, to_panel_array
+
+
+def naive_forecast(model, panel, horizon, slot, start, transform):
+    """Reference: one entity and year at a time, feeding each prediction into the next lag."""
+    present = ~np.isnan(panel).all(axis=-1)
+    panel = panel.copy()
+    out = np.full(panel.shape[:1] + (horizon,), np.nan)
+    for e in range(panel.shape[0]):
+        for h in range(horizon):
+            if not present[e, start + h]:
+                continue
+            out[e, h] = max(model.predict(panel[e, start + h][None])[0], 0.0)
+            if h + 1 < horizon:
+                panel[e, start + h + 1, slot] = transform(out[e, h])
+    return out
+
+
+def test_recursive_forecast_matches_loop():
+    df = make_panel(n_entities=8, missing=0.0, gaps=0.1)
+    features = ['x0', 'x1', 'x2']
+    panel, present, entities, years = to_panel_array(df, features)
+    rng = np.random.default_rng(0)
+    model = Ridge().fit(rng.normal(size=(50, 3)), rng.normal(size=50) + 100)
+
+    def transform(p):
+        return (p - 100) / 10
+
+    got = recursive_forecast(model, panel, horizon=5, lag_slot=1, start=4, lag_transform=transform)
+    np.testing.assert_allclose(got, naive_forecast(model, panel, 5, 1, 4, transform), rtol=1e-12)
+    assert np.isnan(got[~present[:, 4:9]]).all()
+
+    long = panel_to_frame(got, entities, years[4:9])
+    assert len(long) == present[:, 4:9].sum()
+
+
+def test_scenarios_share_one_call_per_year():
+    df = make_panel(n_entities=4, missing=0.0, gaps=0.0)
+    panel, _, _, _ = to_panel_array(df, ['x0', 'x1'])
+    model = Ridge().fit(np.random.default_rng(1).normal(size=(20, 2)), np.arange(20.0))
+    scenarios = np.stack([panel, panel * 1.1])
+    got = recursive_forecast(model, scenarios, horizon=3, lag_slot=0)
+    np.testing.assert_allclose(got[1], recursive_forecast(model, panel * 1.1, horizon=3, lag_slot=0))
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from hybrid import HybridResidualRegressor
+
+pytest.importorskip('xgboost')
+
+
+def data(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(400, 5)).astype(np.float32)
+    y = X @ rng.normal(size=5) + np.sin(3 * X[:, 0]) + 0.1 * rng.normal(size=400)
+    return X, y
+
+
+def test_refit_residual_with_new_max_bin_matches_fresh_fit():
+    X, y = data()
+    params = {'n_estimators': 20, 'max_depth': 3, 'random_state': 0, 'n_jobs': 1}
+    hybrid = HybridResidualRegressor(alpha=1.0, xgb_params=params).fit(X, y)
+    hybrid.refit_residual(max_bin=32)
+    fresh = HybridResidualRegressor(alpha=1.0, xgb_params={**params, 'max_bin': 32}).fit(X, y)
+    np.testing.assert_array_equal(hybrid.predict(X), fresh.predict(X))
+
+
+def test_prediction_is_backbone_plus_residual(tmp_path):
+    X, y = data(1)
+    hybrid = HybridResidualRegressor(xgb_params={'n_estimators': 10, 'n_jobs': 1}).fit(X, y)
+    base, residual = hybrid.predict_components(X)
+    np.testing.assert_allclose(hybrid.predict(X), base + residual)
+    loaded = HybridResidualRegressor.load(hybrid.save(tmp_path / 'hybrid.joblib'))
+    np.testing.assert_array_equal(loaded.predict(X), hybrid.predict(X))
+    with pytest.raises(ValueError):
+        loaded.refit_residual()
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.linear_model import Ridge
+
+from conftest import TARGET, make_panel
+from incremental import IncrementalRidge, PanelUpdater
+
+
+def raw_panel(missing=0.1):
+    """Raw-like panel, ordered by year so the last year's rows come last (as an appended file)."""
+    df = make_panel(n_entities=10, missing=missing, gaps=0.0).rename(columns={'x0': TARGET, 'x1': 'gdp'})
+    return df.sort_values(['Year', 'Entity'], kind='stable').reset_index(drop=True)
+
+
+def test_append_matches_full_run_for_new_rows():
+    # No missing values: the history's imputation medians differ between the two runs
+    raw = raw_panel(missing=0.0)
+    last = raw['Year'] == raw['Year'].max()
+    full = PanelUpdater(lag_cols=[TARGET, 'gdp']).fit(raw)
+
+    updater = PanelUpdater(lag_cols=[TARGET, 'gdp'])
+    updater.fit(raw[~last])
+    appended = updater.append(raw[last])
+    expected = full.loc[appended.index, appended.columns]
+    pd.testing.assert_frame_equal(appended, expected, check_dtype=False)
+
+
+def test_append_skips_years_already_seen():
+    raw = raw_panel()
+    updater = PanelUpdater(lag_cols=[TARGET])
+    updater.fit(raw)
+    assert updater.append(raw[raw['Year'] == raw['Year'].max()]).empty
+
+
+def test_incremental_ridge_matches_ridge():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 6)) * [1, 10, 1e3, 1e5, 1, 1] + [0, 0, 1e6, 0, 0, 5]
+    y = X @ rng.normal(size=6) + rng.normal(size=500)
+    for fit_intercept in (True, False):
+        expected = Ridge(alpha=2.0, fit_intercept=fit_intercept, solver='cholesky').fit(X, y)
+        model = IncrementalRidge(alpha=2.0, fit_intercept=fit_intercept)
+        for batch in np.array_split(np.arange(500), 7):
+            model.partial_fit(X[batch], y[batch])
+        np.testing.assert_allclose(model.coef_, expected.coef_, rtol=1e-8)
+        np.testing.assert_allclose(model.predict(X), expected.predict(X), rtol=1e-10)
+
+
+def test_incremental_ridge_on_sparse_batches():
+    rng = np.random.default_rng(1)
+    X = sp.random(300, 20, density=0.2, random_state=1, format='csr')
+    y = rng.normal(size=300)
+    expected = Ridge(alpha=1.0, solver='cholesky').fit(X.toarray(), y)
+    model = IncrementalRidge(alpha=1.0).fit(X[:100], y[:100]).partial_fit(X[100:], y[100:])
+    np.testing.assert_allclose(model.coef_, expected.coef_, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(model.intercept_, expected.intercept_, rtol=1e-9)
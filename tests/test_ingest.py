@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from ingest import QuantileSketch, compute_median_sketches
+
+
+def test_sketch_is_exact_up_to_k_values():
+    values = np.random.default_rng(0).lognormal(size=1000)
+    sketch = QuantileSketch(k=1024).update(values[:600]).update(values[600:])
+    for q in (0.1, 0.5, 0.9):
+        assert sketch.quantile(q) == np.quantile(values, q)
+
+
+def test_merged_sketches_stay_within_rank_error():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(size=50_000) for _ in range(4)]
+    sketch = QuantileSketch(k=512)
+    for part in parts:
+        sketch.merge(QuantileSketch(k=512).update(part))
+    values = np.sort(np.concatenate(parts))
+    assert sketch.count == len(values)
+    for q in (0.05, 0.5, 0.95):
+        rank = np.searchsorted(values, sketch.quantile(q)) / len(values)
+        assert abs(rank - q) < 0.01
+
+
+def test_nans_are_ignored():
+    sketch = QuantileSketch().update([1.0, np.nan, 3.0])
+    assert sketch.count == 2 and sketch.quantile(0.5) == 2.0
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_median_sketches_of_a_csv(tmp_path):
+    df = pd.DataFrame({'Entity': ['a'] * 5 + ['b'] * 5, 'Year': range(10),
+                       'v': [1.0, np.nan, 3.0, 8.0, 2.0, 7.0, np.nan, 4.0, 9.0, 5.0]})
+    path = tmp_path / 'raw.csv'
+    df.to_csv(path, index=False)
+    sketches, missing = compute_median_sketches(path, chunksize=3, dtypes={'Entity': str})
+    assert missing['v'] == 2
+    assert sketches['v'].quantile(0.5) == df['v'].median()
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+import preprocessing
+from conftest import make_panel
+from instrumentation import Tracer, main, read_trace, summarize
+from preprocessing import remove_outliers
+
+ORIGINALS = (preprocessing.remove_outliers, Ridge.__dict__['fit'], StandardScaler.__dict__['transform'])
+
+
+def spans_named(tracer, name):
+    return [s for s in tracer.spans if s['name'] == name]
+
+
+def test_stages_and_estimators_are_traced_then_restored(tmp_path):
+    df = make_panel(missing=0.0)
+    X, y = df[['x0', 'x1', 'x2']], df['x0'] * 2
+    path = str(tmp_path / 'trace.jsonl')
+    with Tracer(path, stages=('preprocessing.remove_outliers',), classes=[Ridge, StandardScaler]) as tracer:
+        assert remove_outliers is not ORIGINALS[0]  # the `from preprocessing import` copy too
+        kept = remove_outliers(df, threshold=1.5)
+        preprocessing.remove_outliers(df, threshold=1.5)
+        with tracer.span('model') as block:
+            make_pipeline(StandardScaler(), Ridge()).fit(X, y).predict(X.head(10))
+            block['rows_out'] = 10
+
+    assert remove_outliers is ORIGINALS[0] and preprocessing.remove_outliers is ORIGINALS[0]
+    assert (Ridge.__dict__['fit'], StandardScaler.__dict__['transform']) == ORIGINALS[1:]
+
+    (first, _) = spans_named(tracer, 'remove_outliers')
+    assert first['kind'] == 'stage'
+    assert (first['rows_in'], first['cols_in']) == df.shape
+    assert (first['rows_out'], first['cols_out']) == kept.shape
+
+    (fit,) = spans_named(tracer, 'Ridge.fit')
+    (predict,) = spans_named(tracer, 'Ridge.predict')
+    (model,) = spans_named(tracer, 'model')
+    assert fit['parent_id'] == predict['parent_id'] == model['span_id'] and model['parent_id'] is None
+    assert (predict['rows_in'], predict['rows_out'], predict['cols_out']) == (10, 10, None)
+    assert model['rows_out'] == 10
+    children = sum(s['seconds'] for s in tracer.spans if s['parent_id'] == model['span_id'])
+    assert np.isclose(model['self_seconds'], model['seconds'] - children)
+    assert all(s['self_seconds'] >= 0 and s['peak_rss'] for s in tracer.spans)
+
+    # the file holds the same spans, in the order they finished
+    assert [s['span_id'] for s in read_trace(path)] == [s['span_id'] for s in tracer.spans]
+
+
+def test_errors_are_recorded_and_raised():
+    tracer = Tracer(None, classes=[])
+    with pytest.raises(ValueError):
+        with tracer.span('failing'):
+            raise ValueError('bad input')
+    assert tracer.spans[0]['error'] == 'ValueError: bad input'
+    assert summarize(tracer.spans).loc[0, 'Errors'] == 1
+
+
+def test_memory_and_profile_options(tmp_path):
+    path = str(tmp_path / 'trace.jsonl')
+    with Tracer(path, memory=True, profile=['alloc'], classes=[], stages=()) as tracer:
+        with tracer.span('outer'):
+            with tracer.span('alloc'):
+                block = np.ones(2 ** 20)  # 8 MB
+            del block
+    alloc, outer = tracer.spans
+    assert alloc['alloc_peak'] >= 8 * 2 ** 20 and alloc['alloc_bytes'] >= 8 * 2 ** 20
+    assert outer['alloc_peak'] >= alloc['alloc_peak'] and outer['alloc_bytes'] < 2 ** 20
+    assert os.path.exists(alloc['profile']) and alloc['hotspots']
+    assert os.path.dirname(alloc['profile']) == str(tmp_path / 'profiles')
+    assert 'profile' not in outer
+
+
+def test_summary_from_the_trace_file(tmp_path, capsys):
+    path = str(tmp_path / 'trace.jsonl')
+    with Tracer(path, classes=[], stages=()) as tracer:
+        for _ in range(3):
+            with tracer.span('fast'):
+                pass
+        with tracer.span('slow', rows_in=5):
+            sum(range(200_000))
+    table = summarize(read_trace(path))
+    assert table['Span'].tolist() == ['slow', 'fast']
+    assert table.set_index('Span')['Calls'].to_dict() == {'slow': 1, 'fast': 3}
+    assert table.loc[0, 'Max rows in'] == 5
+
+    csv_path = str(tmp_path / 'summary.csv')
+    main(['summary', path, '--summary', csv_path])
+    assert 'slow' in capsys.readouterr().out
+    assert pd.read_csv(csv_path)['Span'].tolist() == ['slow', 'fast']
@@ -0,0 +1,56 @@
+import warnings
+
+import numpy as np
+import pytest
+from sklearn.metrics import r2_score
+from sklearn.metrics.pairwise import rbf_kernel
+
+from kernel_svr import ApproxKernelSVR, RBFFeatures, create_svr_model
+
+
+def nonlinear(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 6))
+    y = 3 * np.sin(X[:, 0]) + X[:, 1] ** 2 + X[:, 2] * X[:, 3] + 0.3 * rng.normal(size=n_rows)
+    split = int(0.8 * n_rows)
+    return X[:split], y[:split], X[split:], y[split:]
+
+
+def test_nystroem_with_every_row_reproduces_the_rbf_kernel():
+    X = np.random.default_rng(0).normal(size=(150, 4)) * 3 + 1
+    features = RBFFeatures('nystroem', n_components=150).fit(X)
+    assert features.gamma_ == pytest.approx(1 / (X.shape[1] * X.var()))  # SVR's gamma='scale'
+    F = features.transform(X)
+    np.testing.assert_allclose(F @ F.T, rbf_kernel(X, gamma=features.gamma_), atol=1e-8)
+
+
+def test_auto_solver_follows_the_shape():
+    X_train, y_train, _, _ = nonlinear(1000)
+    assert ApproxKernelSVR(n_components=1000).fit(X_train, y_train).solver_ == 'linear_svr'
+    model = ApproxKernelSVR(n_components=300).fit(X_train, y_train)
+    assert model.solver_ == 'sgd'
+    assert model.n_epochs_ == 50
+
+
+@pytest.mark.parametrize('mode, n_components, n_rows', [
+    ('nystroem', 1000, 1000),  # dual coordinate descent
+    ('nystroem', 500, 3000),   # SGD
+    ('rff', 1000, 3000),
+])
+def test_approximate_fit_converges_and_tracks_exact(mode, n_components, n_rows):
+    X_train, y_train, X_test, y_test = nonlinear(n_rows)
+    exact = r2_score(y_test, create_svr_model('exact').fit(X_train, y_train).predict(X_test))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')  # no ConvergenceWarning
+        model = create_svr_model(mode, n_components=n_components).fit(X_train, y_train)
+    assert r2_score(y_test, model.predict(X_test)) > exact - 0.05
+
+
+def test_invalid_options():
+    X_train, y_train, _, _ = nonlinear(100)
+    with pytest.raises(ValueError):
+        create_svr_model('linear')
+    with pytest.raises(ValueError):
+        ApproxKernelSVR(solver='newton').fit(X_train, y_train)
+    with pytest.raises(ValueError):
+        RBFFeatures('poly').fit(X_train)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_panel
+from outliers import OutlierFilter, column_quartiles, entity_labels, group_quartiles
+
+
+def test_column_quartiles_match_pandas():
+    df = make_panel(n_entities=40, missing=0.2)
+    cols = ['x0', 'x1', 'x2']
+    q1, q3 = column_quartiles(df[cols])
+    expected = df[cols].quantile([0.25, 0.75])
+    np.testing.assert_array_equal(q1, expected.loc[0.25].to_numpy())
+    np.testing.assert_array_equal(q3, expected.loc[0.75].to_numpy())
+
+
+def test_group_quartiles_match_groupby():
+    df = make_panel(n_entities=20, missing=0.2)
+    codes, groups = pd.factorize(df['Entity'])
+    q1, q3, _ = group_quartiles(df[['x0', 'x1']], codes, len(groups))
+    expected = df.groupby('Entity')[['x0', 'x1']].quantile([0.25, 0.75])
+    np.testing.assert_allclose(q1, expected.xs(0.25, level=1).reindex(groups).to_numpy(), rtol=1e-15)
+    np.testing.assert_allclose(q3, expected.xs(0.75, level=1).reindex(groups).to_numpy(), rtol=1e-15)
+
+
+def test_filter_matches_pandas_iqr_rule():
+    df = make_panel(n_entities=40, missing=0.1)
+    df.loc[df.index[:5], 'x1'] = 1e6
+    cols = ['x0', 'x1', 'x2']
+    q1, q3 = df[cols].quantile(0.25), df[cols].quantile(0.75)
+    iqr = q3 - q1
+    outside = ((df[cols] < q1 - 1.5 * iqr) | (df[cols] > q3 + 1.5 * iqr)).any(axis=1)
+    filt = OutlierFilter(threshold=1.5, exclude_cols=['Year'], verbose=False).fit(df)
+    np.testing.assert_array_equal(filt.outlier_mask(df), outside.to_numpy())
+
+
+def test_whitelisted_entities_are_kept():
+    df = make_panel(n_entities=40, missing=0.0)
+    df.loc[df['Entity'] == 'E01', 'x0'] = 1e6
+    kept = OutlierFilter(whitelist_entities=['E01'], verbose=False).fit_transform(df)
+    assert (kept['Entity'] == 'E01').sum() == (df['Entity'] == 'E01').sum()
+
+
+def test_entity_labels_from_one_hot_columns():
+    df = pd.DataFrame({'Entity_B': [0, 1, 0], 'Entity_C': [0, 0, 1]})
+    assert list(entity_labels(df)) == [None, 'B', 'C']
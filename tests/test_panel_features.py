@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_panel
+from panel_features import build_panel_features, panel_feature_names
+
+
+def in_row_order(block, order):
+    """Feature block (sorted panel order) back in the frame's row order."""
+    out = np.empty_like(block)
+    out[order] = block
+    return out
+
+
+def test_features_match_groupby(panel):
+    cols = ['x0', 'x1']
+    block, names, order = build_panel_features(panel, cols, lags=(1, 2), windows=(3,), deltas=(1,),
+                                               dtype=np.float64)
+    got = pd.DataFrame(in_row_order(block, order), columns=names)
+
+    g = panel.sort_values(['Entity', 'Year']).groupby('Entity')
+    for col in cols:
+        expected = pd.DataFrame({
+            f'{col}_lag1': g[col].shift(1),
+            f'{col}_lag2': g[col].shift(2),
+            f'{col}_rollmean3': g[col].transform(lambda s: s.shift(1).rolling(3).mean()),
+            f'{col}_rollstd3': g[col].transform(lambda s: s.shift(1).rolling(3).std()),
+            f'{col}_delta1': g[col].shift(1) - g[col].shift(2),
+        }).reindex(panel.index)
+        for name in expected.columns:
+            np.testing.assert_allclose(got[name], expected[name], rtol=1e-12, atol=1e-9, err_msg=name)
+
+
+def test_feature_names_are_grouped_by_column():
+    assert panel_feature_names(['a', 'b'], lags=(1,), windows=(2,)) == [
+        'a_lag1', 'a_rollmean2', 'a_rollstd2', 'b_lag1', 'b_rollmean2', 'b_rollstd2']
+
+
+def test_history_longer_than_panel_is_nan():
+    df = make_panel(n_entities=2, n_years=3, gaps=0.0, missing=0.0)
+    block, _, _ = build_panel_features(df, ['x0'], lags=(5,), windows=(4,))
+    assert block.dtype == np.float32
+    assert np.isnan(block).all()
+
+
+def test_no_columns_gives_empty_block(panel):
+    block, names, order = build_panel_features(panel, [])
+    assert block.shape == (len(panel), 0)
+    assert names == []
+    assert sorted(order) == list(range(len(panel)))
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from conftest import make_panel
+from panel_frame import PanelFrame
+
+
+@pytest.fixture
+def frame_and_df():
+    df = make_panel(missing=0.0)
+    df.index = np.random.default_rng(0).permutation(1000)[:len(df)]  # sparse, unordered row IDs
+    return PanelFrame.from_frame(df), df
+
+
+def test_round_trip_keeps_rows_and_ids(frame_and_df):
+    frame, df = frame_and_df
+    out = frame.to_frame()
+    expected = df.sort_values(['Entity', 'Year'])
+    assert list(out.index) == list(expected.index)
+    assert list(out['Entity'].astype(str)) == list(expected['Entity'])
+    np.testing.assert_array_equal(out['Year'], expected['Year'])
+    np.testing.assert_allclose(out[['x0', 'x1', 'x2']], expected[['x0', 'x1', 'x2']].astype(np.float32))
+
+
+def test_keys_and_lookup(frame_and_df):
+    frame, df = frame_and_df
+    ids = df.index[::7]
+    keys = frame.keys(ids)
+    assert list(keys.index) == list(ids)
+    assert list(keys['Entity']) == list(df.loc[ids, 'Entity'])
+    np.testing.assert_array_equal(frame.row_id[frame.lookup(ids)], ids)
+    with pytest.raises(KeyError):
+        frame.lookup([1001])
+
+
+def test_entity_and_year_slices(frame_and_df):
+    frame, df = frame_and_df
+    one = frame.for_entity('E03')
+    expected = df[df['Entity'] == 'E03'].sort_values('Year')
+    assert list(one.row_id) == list(expected.index)
+    year = frame.for_year(2005)
+    assert sorted(year.row_id) == sorted(df.index[df['Year'] == 2005])
+    assert len(frame.for_year(1900)) == 0
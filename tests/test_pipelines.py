@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_panel
+from pipelines import LagFeatureGenerator
+
+
+def lagger():
+    return LagFeatureGenerator(lag_cols=['x0', 'x1'], lags=[1, 2], windows=[2], deltas=[1])
+
+
+def test_batch_after_history_matches_full_transform():
+    df = make_panel(gaps=0.0)
+    train, test = df[df['Year'] < 2006], df[df['Year'] >= 2006]
+    full = lagger().fit(df).transform(df)
+    batch = lagger().fit(train).transform(test)
+    expected = full.loc[batch.index]
+    pd.testing.assert_frame_equal(batch, expected)
+
+
+def test_single_row_batch_uses_history_tail():
+    df = make_panel(gaps=0.0, missing=0.0)
+    gen = lagger().fit(df[df['Year'] < 2006])
+    row = df[(df['Entity'] == 'E03') & (df['Year'] == 2006)]
+    out = gen.transform(row)
+    previous = df[(df['Entity'] == 'E03') & (df['Year'] == 2005)]['x0'].item()
+    assert out['x0_lag1'].item() == previous
+
+
+def test_gap_after_history_gives_nan_lags():
+    # Lags are positional: a batch starting years after the history must not reuse its tail
+    df = make_panel(gaps=0.0, missing=0.0)
+    gen = lagger().fit(df[df['Year'] < 2006])
+    out = gen.transform(df[(df['Entity'] == 'E03') & (df['Year'] == 2009)])
+    assert np.isnan(out['x0_lag1'].item())
+
+
+def test_missing_lag_column_warns_and_returns_input(capsys):
+    df = make_panel()
+    out = LagFeatureGenerator(lag_cols=['missing_col']).fit(df).transform(df)
+    assert 'missing_col not found' in capsys.readouterr().out
+    pd.testing.assert_frame_equal(out.sort_index(), df)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+from registry import ModelRegistry
+
+
+def ridge(slope):
+    X = pd.DataFrame({'a': np.arange(10.0), 'b': np.ones(10)})
+    return Ridge(alpha=1e-9).fit(X, slope * X['a'])
+
+
+def test_register_versions(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.register('ridge', ridge(1.0), {'features': ['a', 'b']}) == 1
+    assert registry.register('ridge', ridge(2.0)) == 2
+    assert registry.names() == ['ridge'] and registry.versions('ridge') == [1, 2]
+    assert registry.metadata('ridge')['version'] == 2
+    assert registry.metadata('ridge', 1)['features'] == ['a', 'b']
+    with pytest.raises(KeyError):
+        registry.latest('missing')
+
+
+def test_incomplete_versions_are_invisible(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.register('ridge', ridge(1.0))
+    (tmp_path / 'ridge' / '.tmp-2-123').mkdir()
+    (tmp_path / 'ridge' / '2').mkdir()  # no meta.json: still being written
+    assert registry.versions('ridge') == [1]
+
+
+def test_get_hot_loads_new_versions(tmp_path):
+    registry = ModelRegistry(str(tmp_path), check_interval=0.0)
+    X = pd.DataFrame({'a': [3.0], 'b': [1.0]})
+    registry.register('ridge', ridge(1.0))
+    model, meta = registry.get('ridge')
+    np.testing.assert_allclose(model.predict(X), [3.0])
+    assert registry.get('ridge')[0] is model  # cached
+
+    registry.register('ridge', ridge(2.0))
+    model, meta = registry.get('ridge')
+    assert meta['version'] == 2
+    np.testing.assert_allclose(model.predict(X), [6.0])
+    assert list(registry._loaded) == [('ridge', 2)]  # the old version is dropped
+
+    registry.remove('ridge', 2)
+    assert registry.get('ridge')[1]['version'] == 1
+
+
+def test_get_rechecks_only_after_interval(tmp_path):
+    registry = ModelRegistry(str(tmp_path), check_interval=3600.0)
+    registry.register('ridge', ridge(1.0))
+    registry.get('ridge')
+    registry.register('ridge', ridge(2.0))
+    assert registry.get('ridge')[1]['version'] == 1
+    assert registry.get('ridge', 2)[1]['version'] == 2
+
+
+def test_arrays_are_memory_mapped(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.register('ridge', Ridge().fit(np.random.default_rng(0).normal(size=(50, 2000)), np.arange(50.0)))
+    model, _ = registry.load('ridge')
+    assert isinstance(model.coef_, np.memmap)
@@ -0,0 +1,54 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import rankdata
+
+from relevance import average_ranks, information_coefficient, mutual_information, target_correlations
+
+
+def features_and_target(n=300, p=40, missing=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, p)) * rng.uniform(1, 1e6, p) + rng.uniform(-1e6, 1e6, p)
+    y = X[:, :5] @ rng.normal(size=5) + rng.normal(size=n) * 1e6
+    X[:, 6] = np.round(X[:, 6] / 1e6)  # many ties
+    X[:, 7] = 3.0  # constant
+    X[rng.random(X.shape) < missing] = np.nan
+    y[rng.random(n) < missing / 2] = np.nan
+    return X, y
+
+
+def corrwith(X, y, method):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # constant columns
+        return pd.DataFrame(X).corrwith(pd.Series(y), method=method).to_numpy()
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+@pytest.mark.parametrize('missing', [0.0, 0.2])
+def test_correlations_match_corrwith(method, missing):
+    X, y = features_and_target(missing=missing)
+    expected = corrwith(X, y, method)
+    got = target_correlations(X, y, method=method)
+    np.testing.assert_array_equal(np.isnan(got), np.isnan(expected))
+    np.testing.assert_allclose(got, expected, atol=1e-12, equal_nan=True)
+
+
+def test_average_ranks_match_scipy():
+    X, _ = features_and_target(missing=0.2)
+    np.testing.assert_allclose(average_ranks(X), rankdata(X, axis=0, nan_policy='omit'), equal_nan=True)
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        target_correlations(np.ones((3, 1)), np.arange(3), method='kendall')
+
+
+def test_mutual_information_separates_signal_from_noise():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=5000)
+    X = np.column_stack([x, rng.normal(size=5000)])
+    mi = mutual_information(X, x ** 2 + 0.1 * rng.normal(size=5000))
+    assert mi[0] > 0.5 and mi[1] < 0.01
+    np.testing.assert_allclose(information_coefficient(-0.5 * np.log(1 - 0.3 ** 2)), 0.3)
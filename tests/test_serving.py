@@ -0,0 +1,84 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+from registry import ModelRegistry
+from serving import MicroBatcher, PredictionService, make_server
+
+
+def fitted():
+    X = pd.DataFrame({'a': np.arange(10.0), 'b': np.arange(10.0) % 3})
+    return Ridge(alpha=1e-9).fit(X, 2 * X['a'] - X['b'])
+
+
+class Recorder:
+    """predict_fn that records the size of every call."""
+    def __init__(self, model):
+        self.model = model
+        self.calls = []
+
+    def __call__(self, frame):
+        self.calls.append(len(frame))
+        return self.model.predict(frame[['a', 'b']])
+
+
+def test_concurrent_requests_share_one_call():
+    predict = Recorder(fitted())
+    batcher = MicroBatcher(predict, max_wait_ms=200)
+    payloads = [[{'a': float(i), 'b': 1.0}] * (i + 1) for i in range(5)]
+    futures = [batcher.submit(p) for p in payloads]
+    for i, future in enumerate(futures):
+        np.testing.assert_allclose(future.result(5), [2 * i - 1.0] * (i + 1), atol=1e-6)
+    assert predict.calls == [15]
+    assert batcher.stats.summary()['requests'] == 5
+
+
+def test_bad_request_fails_alone():
+    predict = Recorder(fitted())
+    batcher = MicroBatcher(predict, max_wait_ms=200)
+    good = batcher.submit([{'a': 1, 'b': 1}])
+    bad = batcher.submit([{'a': 1}])  # b missing: NaN in the batched frame
+    other = batcher.submit(pd.DataFrame({'a': [2.0], 'b': [0.0]}))
+    np.testing.assert_allclose(good.result(5), [1.0], atol=1e-6)
+    np.testing.assert_allclose(other.result(5), [4.0], atol=1e-6)
+    with pytest.raises(KeyError):  # alone, the missing column is reported
+        bad.result(5)
+    assert predict.calls == [3, 1, 1, 1]
+
+
+@pytest.fixture
+def server(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'models'))
+    registry.register('ridge', fitted(), {'features': ['a', 'b']})
+    server = make_server(PredictionService(registry, max_wait_ms=1.0), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, path, records):
+    request = urllib.request.Request(url + path, data=json.dumps({'records': records}).encode())
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as err:
+        return err.code, json.loads(err.read())
+
+
+def test_http_predict(server):
+    status, body = post(server, '/predict/ridge', [{'a': 3, 'b': 1}, {'a': 0, 'b': 0}])
+    assert status == 200
+    np.testing.assert_allclose(body['predictions'], [5.0, 0.0], atol=1e-6)
+    assert post(server, '/predict/ridge', [{'a': 3}])[0] == 400
+
+
+@pytest.mark.parametrize('name', ['missing', '..', '..%2Fmodels', 'ridge/../ridge'])
+def test_http_rejects_unregistered_names(server, name):
+    assert post(server, f'/predict/{name}', [{'a': 1, 'b': 1}])[0] == 404
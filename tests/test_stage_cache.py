@@ -0,0 +1,102 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from conftest import make_panel
+from preprocessing import remove_high_vif, remove_outliers
+from stage_cache import StageCache
+
+
+def scale(df, factor=2.0):
+    return df * factor
+
+
+def scale_again(df, factor=2.0):
+    return df * factor + 0
+
+
+def test_hits_and_misses(tmp_path):
+    cache = StageCache(str(tmp_path))
+    df = pd.DataFrame({'a': np.arange(5.0), 'b': np.ones(5)})
+    first = cache.run(scale, df, factor=3.0)
+    pd.testing.assert_frame_equal(first, df * 3.0)
+    pd.testing.assert_frame_equal(cache.run(scale, df, factor=3.0), first)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.run(scale, df, 3.0)              # same call, positional
+    cache.run(scale, df.copy(), factor=3.0)  # same content, new object
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    cache.run(scale, df, factor=4.0)        # new parameter
+    cache.run(scale, df.assign(b=2.0), factor=3.0)  # new data
+    cache.run(scale, df.set_axis(list('vwxyz')), factor=3.0)  # new index
+    cache.run(scale_again, df, factor=3.0)  # other function
+    assert (cache.hits, cache.misses) == (3, 5)
+    assert cache.report() == {'hits': 3, 'misses': 5, 'entries': 5, 'bytes': cache.size()}
+
+    # a new cache on the same directory reuses the entries
+    assert StageCache(str(tmp_path)).run(scale, df, factor=3.0).equals(first)
+    cache.clear()
+    assert cache.report()['entries'] == 0 and cache.hits == 0
+
+
+def test_cached_preprocessing_stages_match_direct_calls(tmp_path):
+    df = make_panel(n_entities=20, n_years=15, n_cols=4, missing=0.0)
+    df['Value_co2_emissions_kt_by_country'] = df['x0'] * 3 + df['x1']
+    df['x3'] = df['x0'] + 1e-3 * df['x2']  # collinear with x0
+    cache = StageCache(str(tmp_path))
+    for _ in range(2):
+        outliers = cache.run(remove_outliers, df, method='iqr', threshold=1.5)
+        vif = cache.run(remove_high_vif, df, 'Value_co2_emissions_kt_by_country', threshold=10)
+    pd.testing.assert_frame_equal(outliers, remove_outliers(df, method='iqr', threshold=1.5))
+    pd.testing.assert_frame_equal(vif, remove_high_vif(df, 'Value_co2_emissions_kt_by_country', threshold=10))
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = StageCache(str(tmp_path))
+    arrays = [np.full(10_000, float(i)) for i in range(3)]
+    for array in arrays:
+        cache.run(np.sqrt, array)
+    entry = cache.size() // 3
+    paths = sorted(os.path.join(str(tmp_path), name) for name in os.listdir(str(tmp_path)))
+    # spread the mtimes: entry 0 oldest, then 1, then 2; then use entry 0 again
+    for age, path in enumerate(reversed(sorted(paths, key=os.path.getmtime))):
+        os.utime(path, (time.time() - 100 * (age + 1),) * 2)
+    cache.run(np.sqrt, arrays[0])
+    assert cache.hits == 1
+
+    cache.max_bytes = 2 * entry + entry // 2
+    cache.evict()
+    assert len(os.listdir(str(tmp_path))) == 2
+    cache.run(np.sqrt, arrays[0])  # recently used: kept
+    cache.run(np.sqrt, arrays[2])  # newest: kept
+    assert (cache.hits, cache.misses) == (3, 3)
+    cache.run(np.sqrt, arrays[1])  # the oldest one was evicted; recomputing it evicts another
+    assert cache.misses == 4
+    assert cache.size() <= cache.max_bytes
+
+
+def test_corrupted_entry_is_recomputed(tmp_path):
+    cache = StageCache(str(tmp_path))
+    df = pd.DataFrame({'a': [1.0, 2.0]})
+    cache.run(scale, df)
+    (path,) = [os.path.join(str(tmp_path), name) for name in os.listdir(str(tmp_path))]
+    with open(path, 'wb') as f:
+        f.write(b'not a pickle')
+    pd.testing.assert_frame_equal(cache.run(scale, df), df * 2.0)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_pipeline_memory_reuses_fitted_steps(tmp_path):
+    X = make_panel(missing=0.0)[['x0', 'x1', 'x2']]
+    y = X['x0'] * 2
+    cache = StageCache(str(tmp_path))
+    for alpha in (1.0, 10.0):
+        Pipeline([('scale', StandardScaler()), ('ridge', Ridge(alpha=alpha))], memory=cache).fit(X, y)
+    assert (cache.hits, cache.misses) == (1, 1)
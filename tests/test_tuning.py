@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import GridSearchCV, TimeSeriesSplit
+
+from tuning import cpu_budget, save_best_params, tune_xgboost
+
+xgboost = pytest.importorskip('xgboost')
+
+
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(240, 4)).astype(np.float32)
+    return X, X[:, 0] * 2 + np.sin(X[:, 1]) + 0.1 * rng.normal(size=240)
+
+
+def test_without_pruning_matches_grid_search():
+    X, y = data()
+    grid = {'max_depth': [2, 4], 'learning_rate': [0.1, 0.3], 'n_estimators': [10, 30]}
+    base = {'random_state': 0, 'n_jobs': 1}
+    got = tune_xgboost(X, y, grid, base_params=base, pruning=None, verbose=False)
+    search = GridSearchCV(xgboost.XGBRegressor(**base), grid, cv=TimeSeriesSplit(3), scoring='r2').fit(X, y)
+    expected = pd.DataFrame(search.cv_results_['params']).assign(score=search.cv_results_['mean_test_score'])
+    merged = got['results'].merge(expected, on=['max_depth', 'learning_rate', 'n_estimators'])
+    assert len(merged) == 8
+    np.testing.assert_allclose(merged['mean_test_score'], merged['score'], rtol=1e-5)
+    assert got['best_params'] == search.best_params_
+
+
+def test_halving_keeps_the_best_candidate():
+    X, y = data()
+    grid = {'max_depth': [1, 3], 'n_estimators': [5, 40]}
+    got = tune_xgboost(X, y, grid, base_params={'random_state': 0}, pruning='halving', eta=2, verbose=False)
+    results = got['results']
+    assert results['pruned_at_fold'].notna().sum() == 3
+    best = results.loc[results['mean_test_score'].idxmax()]
+    assert pd.isna(best['pruned_at_fold'])
+    assert got['best_params'] == {'max_depth': best['max_depth'], 'n_estimators': best['n_estimators']}
+
+
+def test_base_params_n_jobs_caps_the_budget():
+    X, y = data()
+    # Used to fail with "got multiple values for keyword argument 'n_jobs'"
+    got = tune_xgboost(X, y, {'max_depth': [2]}, base_params={'n_jobs': 1, 'n_estimators': 5}, verbose=False)
+    assert got['best_params'] == {'max_depth': 2, 'n_estimators': 5}
+    assert cpu_budget(4, n_jobs=1) == (1, 1)
+
+
+def test_best_params_keep_the_json_format(tmp_path):
+    path = str(tmp_path / 'best_hyperparameters.json')
+    X, y = data()
+    result = tune_xgboost(X, y, {'n_estimators': [10, 20], 'max_depth': [2, 3]}, cv=TimeSeriesSplit(3),
+                          base_params=dict(random_state=0), n_jobs=1, verbose=False)
+    save_best_params(path, 'Ridge', {'alpha': np.float64(10.0)})
+    save_best_params(path, 'XGBoost', {**result['best_params'], 'subsample': 0.7})
+    with open(path) as f:
+        saved = json.load(f)
+    assert saved == {'Ridge': {'alpha': 10.0},
+                     'XGBoost': {**result['best_params'], 'subsample': 0.7}}
+    assert list(saved['XGBoost']) == ['max_depth', 'n_estimators', 'subsample']
+
+    save_best_params(path, 'Ridge', {'alpha': 1.0})  # the other models are kept
+    with open(path) as f:
+        assert json.load(f)['XGBoost'] == saved['XGBoost']
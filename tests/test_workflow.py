@@ -0,0 +1,206 @@
+import importlib
+import os
+import sys
+import textwrap
+
+import pytest
+
+from workflow import Stage, Workflow, stage_dependencies
+
+SCALE = 3
+
+
+def read_number(path):
+    with open(path) as f:
+        return float(f.read())
+
+
+def write_number(path, value):
+    with open(path, 'w') as f:
+        f.write(repr(float(value)))
+
+
+def scaled(x):
+    return SCALE * x
+
+
+def triple(src, out):
+    write_number(out, scaled(read_number(src)))
+
+
+def add(src, out, offset=1.0):
+    write_number(out, read_number(src) + offset)
+
+
+def sign(src, out):
+    write_number(out, 1.0 if read_number(src) >= 0 else -1.0)
+
+
+def total(parts, out):
+    write_number(out, sum(read_number(p) for p in parts))
+
+
+def explode(src, out):
+    raise RuntimeError('boom')
+
+
+def statuses(report):
+    return dict(zip(report['Stage'], report['Status']))
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = {name: str(tmp_path / f'{name}.txt') for name in ['raw', 'tripled', 'signed', 'added', 'total']}
+    write_number(paths['raw'], 2)
+    paths['state'] = str(tmp_path / 'cache' / 'state.json')
+    return paths
+
+
+def make_workflow(files, offset=1.0):
+    #   raw --+-- triple -- add --+-- total
+    #         +-- sign -----------+
+    stages = [
+        Stage('total', total, {'parts': [files['added'], files['signed']]}, {'out': files['total']}),
+        Stage('add', add, {'src': files['tripled']}, {'out': files['added']}, {'offset': offset}),
+        Stage('triple', triple, {'src': files['raw']}, {'out': files['tripled']}),
+        Stage('sign', sign, {'src': files['raw']}, {'out': files['signed']}),
+    ]
+    return Workflow(stages, files['state'])
+
+
+def test_runs_in_dependency_order_then_skips_everything(files):
+    workflow = make_workflow(files)
+    assert workflow.order.index('triple') < workflow.order.index('add') < workflow.order.index('total')
+    assert workflow.deps['total'] == ['add', 'sign']
+
+    report = workflow.run(n_jobs=1)
+    assert set(report['Status']) == {'ran'}
+    assert read_number(files['total']) == 2 * 3 + 1 + 1
+
+    # a new runner reads the recorded state: nothing to do
+    report = make_workflow(files).run(n_jobs=1)
+    assert set(report['Status']) == {'skipped'}
+    assert all(make_workflow(files).is_fresh(name) for name in ['triple', 'sign', 'add', 'total'])
+
+
+def test_process_pool_gives_the_same_results(files):
+    report = make_workflow(files).run(n_jobs=2)
+    assert set(report['Status']) == {'ran'}
+    assert read_number(files['total']) == 8
+    assert set(make_workflow(files).run(n_jobs=2)['Status']) == {'skipped'}
+
+
+def test_changes_only_rerun_what_depends_on_them(files):
+    make_workflow(files).run(n_jobs=1)
+
+    # new parameter: the stage and what reads its output
+    report = make_workflow(files, offset=5.0).run(n_jobs=1)
+    assert statuses(report) == {'triple': 'skipped', 'sign': 'skipped', 'add': 'ran', 'total': 'ran'}
+    assert read_number(files['total']) == 6 + 5 + 1
+
+    # new input: everything downstream of raw reruns
+    write_number(files['raw'], 4)
+    report = make_workflow(files, offset=5.0).run(n_jobs=1)
+    assert set(report['Status']) == {'ran'}
+    assert read_number(files['total']) == 12 + 5 + 1
+
+
+def test_identical_upstream_output_keeps_downstream_fresh(files):
+    stages = [
+        Stage('sign', sign, {'src': files['raw']}, {'out': files['signed']}),
+        Stage('add', add, {'src': files['signed']}, {'out': files['added']}),
+    ]
+    Workflow(stages, files['state']).run(n_jobs=1)
+    write_number(files['raw'], 7)  # sign(7) == sign(2)
+    report = Workflow(stages, files['state']).run(n_jobs=1)
+    assert statuses(report) == {'sign': 'ran', 'add': 'skipped'}
+
+
+def test_modified_or_missing_output_reruns_its_stage(files):
+    make_workflow(files).run(n_jobs=1)
+    write_number(files['tripled'], 0)
+    os.remove(files['signed'])
+    report = make_workflow(files).run(n_jobs=1)
+    assert statuses(report) == {'triple': 'ran', 'sign': 'ran', 'add': 'skipped', 'total': 'skipped'}
+    assert read_number(files['tripled']) == 6
+
+
+def test_force_reruns_only_the_targets(files):
+    make_workflow(files).run(n_jobs=1)
+    report = make_workflow(files).run(['add'], n_jobs=1, force=True)
+    assert statuses(report) == {'triple': 'skipped', 'add': 'ran'}
+
+
+def test_failure_blocks_dependents_and_is_not_recorded(files):
+    stages = [
+        Stage('triple', explode, {'src': files['raw']}, {'out': files['tripled']}),
+        Stage('add', add, {'src': files['tripled']}, {'out': files['added']}),
+        Stage('sign', sign, {'src': files['raw']}, {'out': files['signed']}),
+    ]
+    workflow = Workflow(stages, files['state'])
+    report = workflow.run(n_jobs=1)
+    assert statuses(report) == {'triple': 'failed', 'add': 'blocked', 'sign': 'ran'}
+    assert 'triple' not in workflow.state['stages']
+
+
+def test_invalid_graphs_are_rejected(files):
+    with pytest.raises(ValueError, match='produced by both'):
+        Workflow([Stage('a', sign, {'src': files['raw']}, {'out': files['signed']}),
+                  Stage('b', sign, {'src': files['raw']}, {'out': files['signed']})], files['state'])
+    with pytest.raises(ValueError, match='Cycle'):
+        Workflow([Stage('a', add, {'src': files['added']}, {'out': files['tripled']}),
+                  Stage('b', add, {'src': files['tripled']}, {'out': files['added']})], files['state'])
+    with pytest.raises(FileNotFoundError):
+        Workflow([Stage('a', add, {'src': files['total']}, {'out': files['added']})], files['state']).run(n_jobs=1)
+    with pytest.raises(KeyError):
+        make_workflow(files).select(['nope'])
+
+
+def test_stage_dependencies_follow_helpers_and_constants():
+    helpers, constants, _ = stage_dependencies(triple)
+    assert [h.__name__ for h in helpers] == ['read_number', 'scaled', 'write_number']
+    assert constants == {'SCALE': SCALE}
+    helpers, constants, _ = stage_dependencies(sign)
+    assert [h.__name__ for h in helpers] == ['read_number', 'write_number']
+    assert constants == {}
+
+
+def test_editing_a_project_module_invalidates_only_its_users(tmp_path, monkeypatch):
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'flow_helpers.py').write_text('def scale(x):\n    return 2 * x\n')
+    (project / 'flow_stages.py').write_text(textwrap.dedent('''
+        import flow_helpers
+
+
+        def scaled(src, out):
+            with open(src) as f:
+                value = float(f.read())
+            with open(out, 'w') as f:
+                f.write(repr(flow_helpers.scale(value)))
+
+
+        def copied(src, out):
+            with open(src) as f, open(out, 'w') as g:
+                g.write(f.read())
+    '''))
+    monkeypatch.syspath_prepend(str(project))
+    for name in ['flow_helpers', 'flow_stages']:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    flow_stages = importlib.import_module('flow_stages')
+
+    raw = str(tmp_path / 'raw.txt')
+    write_number(raw, 2)
+
+    def workflow():
+        return Workflow([
+            Stage('scaled', flow_stages.scaled, {'src': raw}, {'out': str(tmp_path / 'scaled.txt')}),
+            Stage('copied', flow_stages.copied, {'src': raw}, {'out': str(tmp_path / 'copied.txt')}),
+        ], str(tmp_path / 'state.json'))
+
+    assert stage_dependencies(flow_stages.scaled)[2] == [str(project / 'flow_helpers.py')]
+    assert stage_dependencies(flow_stages.copied)[2] == []
+    assert set(workflow().run(n_jobs=1)['Status']) == {'ran'}
+
+    (project / 'flow_helpers.py').write_text('def scale(x):\n    return 20 * x\n')
+    assert statuses(workflow().run(n_jobs=1)) == {'scaled': 'ran', 'copied': 'skipped'}